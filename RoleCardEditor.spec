@@ -8,7 +8,7 @@ a = Analysis(
         (r'C:\ProgramData\anaconda3\Library\bin\tcl86t.dll', '.'),
         (r'C:\ProgramData\anaconda3\Library\bin\tk86t.dll', '.')
     ],
-    datas=[('ARC_setting', 'ARC_setting'), ('codeFile/template.html', '.')],
+    datas=[('ARC_setting', 'ARC_setting'), ('codeFile/template.html', '.'), ('codeFile/themes', 'themes')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
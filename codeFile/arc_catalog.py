@@ -0,0 +1,343 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+
+# Determine paths based on run environment (Frozen/Dev)
+if getattr(sys, 'frozen', False):
+    APP_DIR = os.path.dirname(sys.executable)
+    PROJECT_ROOT = os.path.dirname(APP_DIR)
+
+    # Try to use external ARC_setting first for user customizability
+    external_setting = os.path.join(PROJECT_ROOT, "ARC_setting")
+    if os.path.exists(os.path.join(external_setting, "Anomaly.json")):
+        SETTING_DIR = external_setting
+    else:
+        # Fallback to bundled resources if external files are missing
+        SETTING_DIR = os.path.join(sys._MEIPASS, "ARC_setting")
+else:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    PROJECT_ROOT = os.path.dirname(BASE_DIR)
+    SETTING_DIR = os.path.join(PROJECT_ROOT, "ARC_setting")
+
+CATALOG_FILES = {
+    "anomaly": "Anomaly.json",
+    "competency": "Competency.json",
+    "reality": "Reality.json",
+}
+
+# The text fields of a card JSON, in template order. json_to_html adds the 字号:<field>
+# style placeholders to these; modules without a renderer import the list from here.
+CARD_FIELDS = [
+    "姓名", "人称代词", "机构头衔", "机构评级", "异常体",
+    "现实", "职能", "现实触发器", "过载解除", "首要指令",
+    "许可行为1", "许可行为2", "许可行为3", "许可行为4", "许可行为奖励", "初始物品", "职能格言",
+    "问题0A", "问题0B", "问题1", "问题2", "问题3", "问题4", "问题5", "问题6", "问题7", "补充说明",
+    "专注MAX", "欺瞒MAX", "活力MAX", "共情MAX", "主动MAX",
+    "坚毅MAX", "气场MAX", "专业MAX", "诡秘MAX",
+]
+
+
+def safe_filename_part(value: str, fallback: str, max_len: int = 50) -> str:
+    """A card field (usually 姓名) made safe to use as a file or folder name."""
+    v = (value or "").strip() or fallback
+    v = "".join("_" if (c in '<>:"/\\|?*' or ord(c) < 32) else c for c in v)
+    v = "_".join(v.split())
+    v = v.strip("._ ")
+    if not v:
+        v = fallback
+    return v[:max_len]
+
+
+def card_hash(data: dict) -> str:
+    """Stable content hash of a card (key order does not matter)."""
+    blob = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+    except Exception:
+        return {}
+    return obj if isinstance(obj, dict) else {}
+
+
+def normalize_anomaly(raw: dict) -> dict[str, list[dict]]:
+    """Anomaly.json -> {异常体: [ability, ...]} in the shape stored in card JSON."""
+    anomalies: dict[str, list[dict]] = {}
+    for key, items in raw.items():
+        if not isinstance(items, list):
+            continue
+        abilities = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            outcomes = item.get("outcomes", {})
+            interaction = _normalize_interaction(item.get("interactions"))
+            abilities.append({
+                "title": item.get("title", ""),
+                "trigger": item.get("description", ""),
+                "success": outcomes.get("success", ""),
+                "failure": outcomes.get("failure", ""),
+                "special": outcomes.get("specially", ""),
+                "question": interaction["question"],
+                "options": interaction["options"],
+            })
+        anomalies[str(key)] = abilities
+    return anomalies
+
+
+def _normalize_interaction(item) -> dict:
+    """{"question", "options": [{"answer", "code"}]}, the same shape in every ARC file."""
+    if not isinstance(item, dict):
+        item = {}
+    return {
+        "question": item.get("question", ""),
+        "options": [
+            {"answer": opt.get("answer", ""), "code": opt.get("code", "")}
+            for opt in item.get("options", [])
+            if isinstance(opt, dict)
+        ],
+    }
+
+
+def _title_text(title: str, description: str) -> str:
+    if title and description:
+        return f"{title}：{description}"
+    return title or description
+
+
+def normalize_competency(raw: dict) -> dict[str, dict]:
+    """
+    Competency.json (职能) -> {职能: record}. The record carries every field of the
+    entry plus "fields", the card fields it fills in, computed once per load.
+    If a role lists several entries, lists (permitted actions, interactions) are merged.
+    """
+    roles: dict[str, dict] = {}
+    for name, arr in raw.items():
+        if isinstance(arr, dict):
+            arr = [arr]
+        entries = [e for e in arr if isinstance(e, dict)] if isinstance(arr, list) else []
+        if not entries:
+            continue
+        first = entries[0]
+        main = str(first.get("MAIN") or "")
+        main_desc = str(first.get("MAIN_description") or "")
+        permitted: list[str] = []
+        permitted_desc = ""
+        bonus = ""
+        interactions: list[dict] = []
+        initial_item = {"title": "", "description": ""}
+        quote = ""
+        for entry in entries:
+            pa = entry.get("permitted_actions")
+            if isinstance(pa, dict):
+                lst = pa.get("list")
+                if isinstance(lst, list):
+                    for item in lst:
+                        if isinstance(item, str) and item:
+                            permitted.append(item)
+                permitted_desc = permitted_desc or str(pa.get("description") or "")
+                bonus = bonus or str(pa.get("bonus") or "")
+            if isinstance(entry.get("interactions"), list):
+                interactions += [_normalize_interaction(q) for q in entry["interactions"]]
+            item = entry.get("initial_item")
+            if isinstance(item, dict) and not initial_item["title"]:
+                initial_item = {
+                    "title": str(item.get("title") or ""),
+                    "description": str(item.get("description") or ""),
+                }
+            quote = quote or str(entry.get("quote") or "")
+
+        main_text = _title_text(main, main_desc)
+        item_text = _title_text(initial_item["title"], initial_item["description"])
+        fields = {"首要指令": main_text}
+        for i in range(4):
+            fields[f"许可行为{i+1}"] = permitted[i] if i < len(permitted) else ""
+        fields["许可行为奖励"] = bonus
+        fields["初始物品"] = item_text
+        fields["职能格言"] = quote
+        roles[str(name)] = {
+            "main": main,
+            "main_desc": main_desc,
+            "permitted": permitted,
+            "permitted_desc": permitted_desc,
+            "bonus": bonus,
+            "main_text": main_text,
+            "initial_item": initial_item,
+            "item_text": item_text,
+            "quote": quote,
+            "interactions": interactions,
+            "fields": fields,
+        }
+    return roles
+
+
+def _join_blocks(items, fields) -> str:
+    parts = []
+    if not isinstance(items, list):
+        return ""
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        lines = []
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, str) and value:
+                lines.append(value)
+        if lines:
+            parts.append("\n".join(lines))
+    return "\n\n".join(parts)
+
+
+def normalize_reality(raw: dict) -> dict[str, dict]:
+    """Reality.json (现实) -> {现实: {"types", "triggers_text", "overload_text"}}."""
+    realities: dict[str, dict] = {}
+    for name, cfg in raw.items():
+        if not isinstance(cfg, dict):
+            continue
+        types = cfg.get("类型")
+        realities[str(name)] = {
+            "types": [str(t) for t in types if t] if isinstance(types, list) else [],
+            "triggers_text": _join_blocks(cfg.get("现实触发器"), ("title", "description", "mechanics")),
+            "overload_text": _join_blocks(cfg.get("过载解除"), ("title", "description")),
+        }
+    return realities
+
+
+def catalog_stamp(setting_dir: str) -> tuple:
+    stamp = []
+    for filename in CATALOG_FILES.values():
+        try:
+            stamp.append(os.path.getmtime(os.path.join(setting_dir, filename)))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+_cache: dict[str, tuple[tuple, dict]] = {}
+_cache_lock = threading.Lock()
+
+
+def clear_cache():
+    """Drop the in-memory catalogs so the next load_catalog() reads from disk."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def load_catalog(setting_dir: str = SETTING_DIR) -> dict:
+    """
+    Load and normalize the three ARC files.
+    The result is kept in memory and only re-read when a file's mtime changes.
+    """
+    stamp = catalog_stamp(setting_dir)
+    with _cache_lock:
+        cached = _cache.get(setting_dir)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+    raw = {kind: _read_json(os.path.join(setting_dir, filename)) for kind, filename in CATALOG_FILES.items()}
+    catalog = {
+        "raw": raw,
+        "anomaly": normalize_anomaly(raw["anomaly"]),
+        "competency": normalize_competency(raw["competency"]),
+        "reality": normalize_reality(raw["reality"]),
+    }
+    with _cache_lock:
+        _cache[setting_dir] = (stamp, catalog)
+    return catalog
+
+
+def install_catalog(setting_dir: str, stamp: tuple, catalog) -> None:
+    """
+    Serve an already-normalized catalog (e.g. one attached by catalog_share) from
+    load_catalog() for as long as the files still match `stamp`.
+    """
+    with _cache_lock:
+        _cache[setting_dir] = (tuple(stamp), catalog)
+
+
+DERIVED_KINDS = ("reality", "competency", "anomaly")
+
+
+def card_dependencies(data: dict) -> list[tuple[str, str]]:
+    """The catalog entries a card was derived from, as (kind, key) pairs."""
+    return [
+        ("reality", str(data.get("现实", "")).split("-", 1)[0]),
+        ("competency", str(data.get("职能", ""))),
+        ("anomaly", str(data.get("异常体", ""))),
+    ]
+
+
+def derived_fields(data: dict, catalog: dict, kinds=DERIVED_KINDS) -> dict:
+    """The fields the GUI's fill_* helpers would write for this card's selections."""
+    fields = {}
+    deps = dict(card_dependencies(data))
+
+    reality = catalog["reality"].get(deps["reality"]) if "reality" in kinds else None
+    if reality:
+        fields["现实触发器"] = reality["triggers_text"]
+        fields["过载解除"] = reality["overload_text"]
+
+    role = catalog["competency"].get(deps["competency"]) if "competency" in kinds else None
+    if role:
+        fields.update(role["fields"])
+
+    abilities = catalog["anomaly"].get(deps["anomaly"]) if "anomaly" in kinds else None
+    if abilities:
+        output_abilities = []
+        for i, ab in enumerate(abilities):
+            new_ab = dict(ab)
+            stat_key = f"能力{i+1}资质"
+            if data.get(stat_key):
+                new_ab["stat"] = data[stat_key]
+            output_abilities.append(new_ab)
+        fields["abilities"] = output_abilities
+
+    return fields
+
+
+def fill_derived(data: dict, catalog: dict) -> dict:
+    """
+    Fill the catalog-derived fields of a card the same way the GUI does on selection.
+    Values already present in the card are kept.
+    """
+    out = dict(data)
+    for key, value in derived_fields(data, catalog).items():
+        if key == "abilities":
+            if not out.get("abilities"):
+                out[key] = value
+        elif value:
+            out.setdefault(key, value)
+    return out
+
+
+def _same_text(a, b) -> bool:
+    # The GUI strips what it saves from its text boxes
+    if isinstance(a, str) and isinstance(b, str):
+        return a.strip() == b.strip()
+    return a == b
+
+
+def hand_edited(data: dict, previous: dict) -> list[str]:
+    """Derived fields whose value no longer matches `previous`, the text they were filled from."""
+    return [key for key, value in previous.items() if key in data and not _same_text(data[key], value)]
+
+
+def refresh_derived(data: dict, catalog: dict, kinds=DERIVED_KINDS, previous: dict | None = None) -> dict:
+    """
+    Overwrite the derived fields of the given kinds with the current catalog text.
+    With `previous` (derived_fields() of the catalog the card was filled from), fields
+    edited by hand since then are kept.
+    """
+    out = dict(data)
+    kept = set(hand_edited(data, previous)) if previous is not None else set()
+    for key, value in derived_fields(data, catalog, kinds).items():
+        if key in kept:
+            continue
+        if value or key in out:
+            out[key] = value
+    return out
@@ -1,24 +1,29 @@
 import argparse
-import json
 import os
-import tempfile
+from collections import OrderedDict
+import sys
 from io import BytesIO
 
-
-PDF_PATH_DEFAULT = r"e:\三角Allin\角色卡文档-无水印无加密版.pdf"
+try:
+    import position_map
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import position_map
 
 
-def load_json_dict(path: str) -> dict:
-    with open(path, "r", encoding="utf-8") as f:
-        obj = json.load(f)
-    if not isinstance(obj, dict):
-        raise ValueError("JSON内容必须是对象(dict)。")
-    return obj
+PDF_PATH_DEFAULT = r"e:\三角Allin\角色卡文档-无水印无加密版.pdf"
 
+# Picker grid, in PDF points: a thin line every GRID_STEP, a labelled one every GRID_MAJOR
+GRID_STEP = 25.0
+GRID_MAJOR = 100.0
 
-def save_json_dict(path: str, obj: dict):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+# The picker renders the page in TILE_PX squares, only those in view, and keeps
+# the last TILE_CACHE of them; Ctrl + wheel zooms by ZOOM_STEP within the limits
+TILE_PX = 512
+TILE_CACHE = 48
+ZOOM_STEP = 1.25
+ZOOM_MIN = 0.5
+ZOOM_MAX = 8.0
 
 
 def parse_keys_arg(keys: str | None) -> list[str]:
@@ -53,35 +58,38 @@ def align_positions_x_by_groups(positions: dict[str, list], groups: list[list[st
             val[0] = round(base_x, 2)
 
 
-def build_grid_overlay_page(width: float, height: float, step: int) -> BytesIO:
+def build_grid_overlay(sizes: list[tuple[float, float]], step: int) -> BytesIO:
+    """One grid page per (width, height), in one reportlab pass."""
     from reportlab.pdfgen import canvas
 
     buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=(width, height))
-
-    c.setLineWidth(0.5)
-    c.setStrokeColorRGB(0.85, 0.85, 0.85)
-    c.setFont("Helvetica", 6)
-
-    x = 0
-    while x <= width:
-        c.line(x, 0, x, height)
-        c.setFillColorRGB(0.4, 0.4, 0.4)
-        c.drawString(x + 1, height - 8, str(int(x)))
-        x += step
-
-    y = 0
-    while y <= height:
-        c.line(0, y, width, y)
-        c.setFillColorRGB(0.4, 0.4, 0.4)
-        c.drawString(2, y + 1, str(int(y)))
-        y += step
-
-    c.setFillColorRGB(0.2, 0.2, 0.2)
-    c.setFont("Helvetica", 8)
-    c.drawString(6, height - 18, f"size: {int(width)} x {int(height)}  step: {step}")
-
-    c.showPage()
+    c = canvas.Canvas(buf)
+
+    for index, (width, height) in enumerate(sizes):
+        c.setPageSize((width, height))
+        c.setLineWidth(0.5)
+        c.setStrokeColorRGB(0.85, 0.85, 0.85)
+        c.setFont("Helvetica", 6)
+
+        x = 0
+        while x <= width:
+            c.line(x, 0, x, height)
+            c.setFillColorRGB(0.4, 0.4, 0.4)
+            c.drawString(x + 1, height - 8, str(int(x)))
+            x += step
+
+        y = 0
+        while y <= height:
+            c.line(0, y, width, y)
+            c.setFillColorRGB(0.4, 0.4, 0.4)
+            c.drawString(2, y + 1, str(int(y)))
+            y += step
+
+        c.setFillColorRGB(0.2, 0.2, 0.2)
+        c.setFont("Helvetica", 8)
+        c.drawString(6, height - 18, f"page: {index}  size: {int(width)} x {int(height)}  step: {step}")
+        c.showPage()
+
     c.save()
     buf.seek(0)
     return buf
@@ -91,24 +99,100 @@ def export_grid_pdf(pdf_path: str, out_path: str, step: int):
     from pypdf import PdfReader, PdfWriter
 
     reader = PdfReader(pdf_path)
-    page0 = reader.pages[0]
-    width = float(page0.mediabox.width)
-    height = float(page0.mediabox.height)
-
-    overlay_pdf = build_grid_overlay_page(width, height, int(step))
-    overlay_reader = PdfReader(overlay_pdf)
-    overlay_page = overlay_reader.pages[0]
-    page0.merge_page(overlay_page)
+    sizes = [(float(page.mediabox.width), float(page.mediabox.height)) for page in reader.pages]
+    overlay_reader = PdfReader(build_grid_overlay(sizes, int(step)))
 
     writer = PdfWriter()
-    writer.add_page(page0)
-    for i in range(1, len(reader.pages)):
-        writer.add_page(reader.pages[i])
+    for page, overlay_page in zip(reader.pages, overlay_reader.pages):
+        page.merge_page(overlay_page)
+        writer.add_page(page)
 
     with open(out_path, "wb") as f:
         writer.write(f)
 
 
+def key_page(positions: dict[int, dict], key: str) -> int | None:
+    """The page a field was placed on, if any."""
+    return next((index for index, entries in positions.items() if key in entries), None)
+
+
+def grid_sheet(page, render_scale: float):
+    """
+    A one-page scratch PDF showing `page` with the picker grid drawn on top, so the
+    canvas only holds page images instead of an item per grid line and label.
+    Line widths and labels are sized in screen pixels at render_scale.
+    """
+    import fitz
+
+    width = float(page.rect.width)
+    height = float(page.rect.height)
+    px = 1.0 / render_scale
+
+    sheet_doc = fitz.open()
+    sheet = sheet_doc.new_page(width=width, height=height)
+    sheet.show_pdf_page(sheet.rect, page.parent, page.number)
+
+    shape = sheet.new_shape()
+    lines = {True: [], False: []}
+    i = 0
+    while i * GRID_STEP <= width + 0.01:
+        x = i * GRID_STEP
+        lines[x % GRID_MAJOR == 0].append((fitz.Point(x, 0), fitz.Point(x, height)))
+        i += 1
+    i = 0
+    while i * GRID_STEP <= height + 0.01:
+        y = i * GRID_STEP
+        lines[y % GRID_MAJOR == 0].append((fitz.Point(0, y), fitz.Point(width, y)))
+        i += 1
+    for is_major, color, line_px in ((False, (0.85, 0.85, 0.85), 0.8), (True, (0.69, 0.69, 0.69), 1.2)):
+        for p1, p2 in lines[is_major]:
+            shape.draw_line(p1, p2)
+        shape.finish(color=color, width=line_px * px)
+    shape.draw_rect(sheet.rect)
+    shape.finish(color=(0.565, 0.565, 0.565), width=1.5 * px)
+
+    label_size = 10 * px
+    for p1, p2 in lines[True]:
+        if p1.x == p2.x and p1.x > 0:
+            shape.insert_text((p1.x + 2 * px, 2 * px + label_size), str(int(round(p1.x))), fontsize=label_size, color=(0.4, 0.4, 0.4))
+        elif p1.y == p2.y and p1.y > 0:
+            shape.insert_text((2 * px, p1.y + 2 * px + label_size), str(int(round(height - p1.y))), fontsize=label_size, color=(0.4, 0.4, 0.4))
+    shape.commit()
+    return sheet_doc
+
+
+def render_tile(sheet, render_scale: float, col: int, row: int):
+    """The TILE_PX square tile (col, row) of the sheet at render_scale, clipped to the page."""
+    import fitz
+
+    size = TILE_PX / render_scale
+    clip = fitz.Rect(col * size, row * size, (col + 1) * size, (row + 1) * size) & sheet.rect
+    return sheet.get_pixmap(matrix=fitz.Matrix(render_scale, render_scale), clip=clip, alpha=False)
+
+
+class TileCache:
+    """PhotoImages of rendered tiles by (zoom, col, row), least recently used dropped first."""
+
+    def __init__(self, max_tiles: int = TILE_CACHE):
+        self.max_tiles = max_tiles
+        self.tiles: OrderedDict[tuple, object] = OrderedDict()
+
+    def get(self, key: tuple, render):
+        image = self.tiles.get(key)
+        if image is None:
+            image = self.tiles[key] = render()
+        self.tiles.move_to_end(key)
+        return image
+
+    def trim(self, keep: set):
+        """Drop the oldest tiles over the limit, never one that is on screen."""
+        for key in list(self.tiles):
+            if len(self.tiles) <= self.max_tiles:
+                break
+            if key not in keep:
+                del self.tiles[key]
+
+
 def pick_positions_gui(
     pdf_path: str,
     out_positions_path: str,
@@ -120,36 +204,39 @@ def pick_positions_gui(
     import tkinter as tk
 
     doc = fitz.open(pdf_path)
-    page = doc[0]
-    width = float(page.rect.width)
-    height = float(page.rect.height)
-
-    matrix = fitz.Matrix(render_scale, render_scale)
-    pix = page.get_pixmap(matrix=matrix, alpha=False)
-
-    # Use PPM format to avoid libpng warnings (iCCP profile) and dependency issues
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".ppm")
-    tmp_path = tmp.name
-    tmp.close()
-    pix.save(tmp_path)
-
-    scale = pix.width / width
-
-    positions: dict[str, list[float | int]] = {}
+    page_count = len(doc)
+
+    # render_scale is only the starting zoom; Ctrl + wheel changes it
+    view = {"page": 0, "zoom": render_scale, "sheet": None, "sheet_key": None, "pending": False}
+    tile_cache = TileCache()
+    # (page, zoom, col, row) -> canvas image item of the tiles currently placed
+    placed: dict[tuple, int] = {}
+
+    # Page index -> field -> [x, y, size]. An existing file is picked up where it was left:
+    # fields it already has are skipped, and every click is saved right away.
+    positions: dict[int, dict[str, list[float | int]]] = {}
+    if os.path.exists(out_positions_path):
+        for index, entries in position_map.load_positions(out_positions_path).items():
+            positions[index] = {key: list(value) for key, value in entries.items()}
     cursor = {"i": 0}
+    while cursor["i"] < len(keys) and key_page(positions, keys[cursor["i"]]) is not None:
+        cursor["i"] += 1
     align_groups = [
         ["姓名", "机构头衔", "机构评级"],
         ["异常体", "现实", "职能"],
         ["现实触发器", "过载解除", "首要指令"],
     ]
 
+    def page_size() -> tuple[float, float]:
+        rect = doc[view["page"]].rect
+        return float(rect.width), float(rect.height)
+
     root = tk.Tk()
-    root.title(f"选点：{keys[cursor['i']]}（点击放置位置）")
-    img = tk.PhotoImage(file=tmp_path)
     screen_w = int(root.winfo_screenwidth())
     screen_h = int(root.winfo_screenheight())
-    view_w = min(int(img.width()), max(600, screen_w - 120))
-    view_h = min(int(img.height()), max(600, screen_h - 220))
+    width, height = page_size()
+    view_w = min(int(width * render_scale), max(600, screen_w - 120))
+    view_h = min(int(height * render_scale), max(600, screen_h - 220))
 
     frame = tk.Frame(root)
     frame.pack(fill="both", expand=True)
@@ -157,7 +244,6 @@ def pick_positions_gui(
     canvas = tk.Canvas(frame, width=view_w, height=view_h)
     vbar = tk.Scrollbar(frame, orient="vertical", command=canvas.yview)
     hbar = tk.Scrollbar(frame, orient="horizontal", command=canvas.xview)
-    canvas.configure(yscrollcommand=vbar.set, xscrollcommand=hbar.set)
 
     canvas.grid(row=0, column=0, sticky="nsew")
     vbar.grid(row=0, column=1, sticky="ns")
@@ -165,11 +251,7 @@ def pick_positions_gui(
     frame.grid_rowconfigure(0, weight=1)
     frame.grid_columnconfigure(0, weight=1)
 
-    canvas.create_image(0, 0, anchor="nw", image=img)
-    canvas.configure(scrollregion=(0, 0, int(img.width()), int(img.height())))
-
     hint = tk.StringVar()
-    hint.set(f"当前字段：{keys[cursor['i']]}  |  左键选点  |  右键撤销  |  鼠标滚轮滚动  |  中键拖拽  |  Esc退出")
     label = tk.Label(root, textvariable=hint)
     label.pack()
 
@@ -178,107 +260,174 @@ def pick_positions_gui(
     coord_label = tk.Label(root, textvariable=coord)
     coord_label.pack()
 
-    def cleanup():
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+    def page_size_px() -> tuple[float, float]:
+        width, height = page_size()
+        return width * view["zoom"], height * view["zoom"]
+
+    def tile_image(col: int, row: int):
+        sheet_key = (view["page"], view["zoom"])
+        if view["sheet_key"] != sheet_key:
+            if view["sheet"] is not None:
+                view["sheet"].close()
+            view["sheet"] = grid_sheet(doc[view["page"]], view["zoom"])
+            view["sheet_key"] = sheet_key
+        pix = render_tile(view["sheet"][0], view["zoom"], col, row)
+        # PPM straight from memory; avoids libpng warnings (iCCP profile) and temp files
+        return tk.PhotoImage(data=pix.tobytes("ppm"))
+
+    def update_tiles():
+        """Place the tiles in view at the current page and zoom and take the others off the canvas."""
+        view["pending"] = False
+        page, zoom = view["page"], view["zoom"]
+        w_px, h_px = page_size_px()
+        x0 = max(0.0, canvas.canvasx(0))
+        y0 = max(0.0, canvas.canvasy(0))
+        x1 = min(w_px, canvas.canvasx(canvas.winfo_width()))
+        y1 = min(h_px, canvas.canvasy(canvas.winfo_height()))
+        visible = {
+            (page, zoom, col, row)
+            for col in range(int(x0 // TILE_PX), int(max(x0, x1 - 1) // TILE_PX) + 1)
+            for row in range(int(y0 // TILE_PX), int(max(y0, y1 - 1) // TILE_PX) + 1)
+        }
+        for key in [key for key in placed if key not in visible]:
+            canvas.delete(placed.pop(key))
+        for key in visible - placed.keys():
+            _, _, col, row = key
+            image = tile_cache.get(key, lambda: tile_image(col, row))
+            placed[key] = canvas.create_image(col * TILE_PX, row * TILE_PX, anchor="nw", image=image, tags="tile")
+        canvas.tag_lower("tile")
+        tile_cache.trim(visible)
+
+    def schedule_tiles(*_):
+        if not view["pending"]:
+            view["pending"] = True
+            root.after_idle(update_tiles)
+
+    def on_xscroll(*args):
+        hbar.set(*args)
+        schedule_tiles()
+
+    def on_yscroll(*args):
+        vbar.set(*args)
+        schedule_tiles()
+
+    canvas.configure(yscrollcommand=on_yscroll, xscrollcommand=on_xscroll)
 
-    grid_ids: list[int] = []
     crosshair = {"v": None, "h": None}
+    # Marker layer of the page on screen: key -> canvas items, so undo only deletes the last marker
+    markers: dict[str, tuple[int, int]] = {}
 
-    def draw_grid():
-        nonlocal grid_ids
-        for gid in grid_ids:
-            try:
-                canvas.delete(gid)
-            except Exception:
-                pass
-        grid_ids = []
-
-        grid_step_pdf = 25.0
-        major_step_pdf = 100.0
-        grid_step_px = grid_step_pdf * scale
-        major_step_px = major_step_pdf * scale
-
-        w_px = float(img.width())
-        h_px = float(img.height())
-
-        x = 0.0
-        while x <= w_px + 0.1:
-            is_major = abs((x / major_step_px) - round(x / major_step_px)) < 1e-6 if major_step_px > 0 else False
-            color = "#B0B0B0" if is_major else "#D9D9D9"
-            width_px = 1.2 if is_major else 0.8
-            grid_ids.append(canvas.create_line(x, 0, x, h_px, fill=color, width=width_px))
-            if is_major and x > 0:
-                x_pdf = x / scale
-                grid_ids.append(
-                    canvas.create_text(x + 2, 2, anchor="nw", fill="#666666", text=str(int(round(x_pdf))), font=("Helvetica", 8))
-                )
-            x += grid_step_px
-
-        y = 0.0
-        while y <= h_px + 0.1:
-            is_major = abs((y / major_step_px) - round(y / major_step_px)) < 1e-6 if major_step_px > 0 else False
-            color = "#B0B0B0" if is_major else "#D9D9D9"
-            width_px = 1.2 if is_major else 0.8
-            grid_ids.append(canvas.create_line(0, y, w_px, y, fill=color, width=width_px))
-            if is_major and y > 0:
-                y_pdf = height - (y / scale)
-                grid_ids.append(
-                    canvas.create_text(2, y + 2, anchor="nw", fill="#666666", text=str(int(round(y_pdf))), font=("Helvetica", 8))
-                )
-            y += grid_step_px
-
-        grid_ids.append(canvas.create_rectangle(0, 0, w_px, h_px, outline="#909090", width=1.5))
-
-    draw_grid()
+    def place_marker(key: str):
+        x_pdf, y_pdf, _ = positions[view["page"]][key]
+        x = x_pdf * view["zoom"]
+        y = (page_size()[1] - y_pdf) * view["zoom"]
+        r = 5
+        oval, text = markers[key]
+        canvas.coords(oval, x - r, y - r, x + r, y + r)
+        canvas.coords(text, x + 8, y)
+
+    def add_marker(key: str):
+        markers[key] = (
+            canvas.create_oval(0, 0, 0, 0, outline="red", width=2),
+            canvas.create_text(0, 0, anchor="w", fill="red", text=key, font=("Helvetica", 10, "bold")),
+        )
+        place_marker(key)
+
+    def remove_marker(key: str):
+        for item in markers.pop(key, ()):
+            canvas.delete(item)
 
     def set_title():
+        page_text = f"第 {view['page'] + 1}/{page_count} 页"
         if cursor["i"] < len(keys):
-            root.title(f"选点：{keys[cursor['i']]}（点击放置位置）")
-            hint.set(f"当前字段：{keys[cursor['i']]}  |  左键选点  |  右键撤销  |  鼠标滚轮滚动  |  中键拖拽  |  Esc退出")
+            root.title(f"选点：{keys[cursor['i']]}（{page_text}，点击放置位置）")
+            hint.set(f"当前字段：{keys[cursor['i']]}  |  {page_text}  |  左键选点  |  右键撤销  |  PageUp/PageDown 翻页  |  "
+                     "鼠标滚轮滚动  |  Ctrl+滚轮缩放  |  中键拖拽  |  Esc退出")
         else:
-            root.title("选点完成")
+            root.title(f"选点完成（{page_text}）")
             hint.set("选点完成，窗口可关闭。")
 
+    def show_page(index: int):
+        """Switch the canvas to another page: its tiles and its markers only."""
+        for item in placed.values():
+            canvas.delete(item)
+        placed.clear()
+        for key in list(markers):
+            remove_marker(key)
+        view["page"] = index
+        canvas.configure(scrollregion=(0, 0, *page_size_px()))
+        canvas.xview_moveto(0)
+        canvas.yview_moveto(0)
+        for key in positions.get(index, {}):
+            add_marker(key)
+        set_title()
+        schedule_tiles()
+
+    def save():
+        # Aligned on a copy so the markers stay where they were clicked
+        aligned = {index: {key: list(value) for key, value in entries.items()} for index, entries in positions.items()}
+        for entries in aligned.values():
+            align_positions_x_by_groups(entries, align_groups)
+        position_map.save_positions(out_positions_path, aligned)
+
     def on_left_click(event):
         if cursor["i"] >= len(keys):
             return
         key = keys[cursor["i"]]
         cx = float(canvas.canvasx(event.x))
         cy = float(canvas.canvasy(event.y))
-        x_pdf = cx / scale
-        y_pdf = height - cy / scale
-        positions[key] = [round(x_pdf, 2), round(y_pdf, 2), int(default_font_size)]
-        r = 5
-        canvas.create_oval(cx - r, cy - r, cx + r, cy + r, outline="red", width=2)
-        canvas.create_text(cx + 8, cy, anchor="w", fill="red", text=key, font=("Helvetica", 10, "bold"))
+        x_pdf = cx / view["zoom"]
+        y_pdf = page_size()[1] - cy / view["zoom"]
+        positions.setdefault(view["page"], {})[key] = [round(x_pdf, 2), round(y_pdf, 2), int(default_font_size)]
+        add_marker(key)
         cursor["i"] += 1
         set_title()
-        if cursor["i"] >= len(keys):
-            align_positions_x_by_groups(positions, align_groups)
-            save_json_dict(out_positions_path, positions)
+        save()
 
     def on_right_click(event):
         if cursor["i"] <= 0:
             return
         cursor["i"] -= 1
         key = keys[cursor["i"]]
-        positions.pop(key, None)
-        canvas.delete("all")
-        canvas.create_image(0, 0, anchor="nw", image=img)
-        canvas.configure(scrollregion=(0, 0, int(img.width()), int(img.height())))
-        draw_grid()
-        for k, (x_pdf, y_pdf, _) in positions.items():
-            x = int(round(x_pdf * scale))
-            y = int(round((height - y_pdf) * scale))
-            r = 5
-            canvas.create_oval(x - r, y - r, x + r, y + r, outline="red", width=2)
-            canvas.create_text(x + 8, y, anchor="w", fill="red", text=k, font=("Helvetica", 10, "bold"))
+        index = key_page(positions, key)
+        if index is not None:
+            positions[index].pop(key)
+            if not positions[index]:
+                del positions[index]
+            if index == view["page"]:
+                remove_marker(key)
+            else:
+                show_page(index)
         set_title()
+        save()
+
+    def on_page(step: int):
+        index = view["page"] + step
+        if 0 <= index < page_count:
+            show_page(index)
+
+    def zoom_at(event, factor: float):
+        """Change the zoom keeping the page point under the mouse where it is."""
+        old = view["zoom"]
+        new = round(min(ZOOM_MAX, max(ZOOM_MIN, old * factor)), 4)
+        if abs(new - old) < 1e-9:
+            return
+        x_pdf = canvas.canvasx(event.x) / old
+        y_pdf = canvas.canvasy(event.y) / old
+        view["zoom"] = new
+        w_px, h_px = page_size_px()
+        canvas.configure(scrollregion=(0, 0, w_px, h_px))
+        canvas.xview_moveto(max(0.0, (x_pdf * new - event.x) / w_px))
+        canvas.yview_moveto(max(0.0, (y_pdf * new - event.y) / h_px))
+        for key in markers:
+            place_marker(key)
+        on_motion(event)
+        schedule_tiles()
 
     def on_mousewheel(event):
+        if event.state & 0x0004:
+            zoom_at(event, ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP)
+            return
         units = int(-1 * (event.delta / 120))
         if event.state & 0x0001:
             canvas.xview_scroll(units, "units")
@@ -286,21 +435,23 @@ def pick_positions_gui(
             canvas.yview_scroll(units, "units")
 
     def on_motion(event):
+        width, height = page_size()
         cx = float(canvas.canvasx(event.x))
         cy = float(canvas.canvasy(event.y))
-        x_pdf = cx / scale
-        y_pdf = height - cy / scale
+        x_pdf = cx / view["zoom"]
+        y_pdf = height - cy / view["zoom"]
         if 0 <= x_pdf <= width and 0 <= y_pdf <= height:
             coord.set(f"坐标：x={x_pdf:.2f}, y={y_pdf:.2f}")
         else:
             coord.set("坐标：x=—, y=—")
 
+        w_px, h_px = page_size_px()
         if crosshair["v"] is None:
-            crosshair["v"] = canvas.create_line(cx, 0, cx, float(img.height()), fill="#7A7A7A", width=1)
-            crosshair["h"] = canvas.create_line(0, cy, float(img.width()), cy, fill="#7A7A7A", width=1)
+            crosshair["v"] = canvas.create_line(cx, 0, cx, h_px, fill="#7A7A7A", width=1)
+            crosshair["h"] = canvas.create_line(0, cy, w_px, cy, fill="#7A7A7A", width=1)
         else:
-            canvas.coords(crosshair["v"], cx, 0, cx, float(img.height()))
-            canvas.coords(crosshair["h"], 0, cy, float(img.width()), cy)
+            canvas.coords(crosshair["v"], cx, 0, cx, h_px)
+            canvas.coords(crosshair["h"], 0, cy, w_px, cy)
 
     def on_middle_down(event):
         canvas.scan_mark(event.x, event.y)
@@ -310,31 +461,34 @@ def pick_positions_gui(
 
     def on_escape(event):
         if positions:
-            align_positions_x_by_groups(positions, align_groups)
-            save_json_dict(out_positions_path, positions)
-        cleanup()
+            save()
         root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_escape)
     root.bind("<Escape>", on_escape)
+    root.bind("<Prior>", lambda e: on_page(-1))
+    root.bind("<Next>", lambda e: on_page(1))
     canvas.bind("<Button-1>", on_left_click)
     canvas.bind("<Button-3>", on_right_click)
     canvas.bind("<MouseWheel>", on_mousewheel)
     canvas.bind("<Motion>", on_motion)
     canvas.bind("<Button-2>", on_middle_down)
     canvas.bind("<B2-Motion>", on_middle_drag)
+    canvas.bind("<Configure>", schedule_tiles)
 
+    show_page(0)
     root.mainloop()
-    cleanup()
+    if view["sheet"] is not None:
+        view["sheet"].close()
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pdf", default=PDF_PATH_DEFAULT, help="源PDF路径")
     ap.add_argument("--keys", default=None, help="字段列表(逗号分隔)")
-    ap.add_argument("--pick-positions", default=None, help="打开选点窗口并输出positions.json")
+    ap.add_argument("--pick-positions", default=None, help="打开选点窗口并输出positions.json(已有文件则接着选，每次点击都会保存)")
     ap.add_argument("--pick-font-size", type=int, default=12, help="选点输出的默认字体大小")
-    ap.add_argument("--pick-scale", type=float, default=2.0, help="选点渲染倍率(越大越清晰)")
+    ap.add_argument("--pick-scale", type=float, default=2.0, help="选点窗口的初始缩放倍率(Ctrl+滚轮可调)")
     ap.add_argument("--grid-out", default=None, help="生成坐标网格PDF并退出")
     ap.add_argument("--grid-step", type=int, default=50, help="网格间距(point)")
     args = ap.parse_args()
@@ -343,6 +497,7 @@ def main():
         raise FileNotFoundError(f"找不到PDF文件：{args.pdf}")
 
     keys = parse_keys_arg(args.keys)
+    position_map.check_keys(keys)
 
     if args.grid_out:
         export_grid_pdf(args.pdf, args.grid_out, int(args.grid_step))
@@ -0,0 +1,213 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import position_map
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import position_map
+
+# position_map puts codeFile/ on the path
+import arc_catalog
+import font_subset
+
+PDF_PATH_DEFAULT = r"e:\三角Allin\角色卡文档-无水印无加密版.pdf"
+POSITIONS_DEFAULT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "positions.json")
+CARDS_DIR = os.path.join(arc_catalog.PROJECT_ROOT, "output")
+
+# A span belongs to an anchor when its baseline is within BASELINE_TOL pt of the anchor's
+# and it starts no more than START_TOL pt before it (or one font size after it).
+BASELINE_TOL = 1.5
+START_TOL = 2.0
+# Fonts get_char_fromJSON draws with: the embedded subsets, or STSong-Light with --no-embed
+OVERLAY_FONTS = (font_subset.FONT_PREFIX, "STSong", "Helvetica")
+MIN_CONFIDENCE = 0.6
+
+
+def _spans(page) -> list[dict]:
+    """Text spans of a page with their baseline origin in PDF coordinates (origin bottom-left)."""
+    height = float(page.rect.height)
+    out = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                text = span["text"]
+                if not text.strip():
+                    continue
+                x, y = span["origin"]
+                out.append({
+                    "text": text,
+                    "x": float(x),
+                    "y": height - float(y),
+                    "x1": float(span["bbox"][2]),
+                    "size": float(span["size"]),
+                    "font": span["font"],
+                })
+    return out
+
+
+def _span_key(span: dict) -> tuple:
+    return span["text"], round(span["x"]), round(span["y"])
+
+
+def template_spans(pdf_path: str, pages) -> dict[int, set]:
+    """Text already printed on the blank form, so it is never taken for a filled-in value."""
+    import fitz
+
+    out = {}
+    with fitz.open(pdf_path) as doc:
+        for index in pages:
+            if index < len(doc):
+                out[index] = {_span_key(span) for span in _spans(doc[index])}
+    return out
+
+
+def read_field(spans: list[dict], x: float, y: float, size: int) -> tuple[str, float]:
+    """The text drawn at an anchor and how sure the match is (0 when nothing is there)."""
+    candidates = [
+        s for s in spans
+        if abs(s["y"] - y) <= BASELINE_TOL and x - START_TOL <= s["x"] <= x + size
+    ]
+    if not candidates:
+        return "", 0.0
+    first = min(candidates, key=lambda s: abs(s["x"] - x) + abs(s["y"] - y))
+    # A value drawn in one call can still come out as several spans on the same baseline
+    parts = [first]
+    rest = sorted((s for s in spans if abs(s["y"] - first["y"]) <= BASELINE_TOL and s["x"] > first["x"]), key=lambda s: s["x"])
+    for s in rest:
+        if s["x"] - parts[-1]["x1"] > s["size"]:
+            break
+        parts.append(s)
+    text = "".join(s["text"] for s in parts).strip()
+
+    distance = abs(first["x"] - x) + abs(first["y"] - y)
+    confidence = max(0.0, 1.0 - distance / max(size, 1))
+    if abs(first["size"] - size) > 0.5:
+        confidence *= 0.6
+    if not any(font in first["font"] for font in OVERLAY_FONTS):
+        confidence *= 0.8
+    return text, round(confidence, 2)
+
+
+def import_pdf(path: str, positions: dict[int, dict], blank: dict[int, set]) -> dict:
+    """{"path", "data", "fields": {field: {"text", "confidence"}}} or {"path", "error"} for one filled PDF."""
+    import fitz
+
+    try:
+        doc = fitz.open(path)
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+    data = {}
+    fields = {}
+    with doc:
+        for index, entries in sorted(positions.items()):
+            if index >= len(doc):
+                for key in entries:
+                    fields[key] = {"text": "", "confidence": 0.0}
+                continue
+            skip = blank.get(index, set())
+            spans = [s for s in _spans(doc[index]) if _span_key(s) not in skip]
+            for key, (x, y, size) in entries.items():
+                text, confidence = read_field(spans, x, y, size)
+                fields[key] = {"text": text, "confidence": confidence}
+                if text:
+                    data[key] = text
+    return {"path": path, "data": data, "fields": fields}
+
+
+def pdf_paths(targets) -> list[str]:
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths += sorted(
+                glob.glob(os.path.join(target, "**", "*.pdf"), recursive=True)
+                + glob.glob(os.path.join(target, "**", "*.PDF"), recursive=True)
+            )
+        else:
+            paths.append(target)
+    return list(dict.fromkeys(paths))
+
+
+def write_card(result: dict, cards_dir: str, overwrite: bool) -> str | None:
+    """Save as <cards_dir>/<姓名>/<姓名>.json like the editor does; None if it already exists."""
+    stem = os.path.splitext(os.path.basename(result["path"]))[0]
+    name = arc_catalog.safe_filename_part(result["data"].get("姓名", ""), stem)
+    card_dir = os.path.join(cards_dir, name)
+    json_path = os.path.join(card_dir, name + ".json")
+    if os.path.exists(json_path) and not overwrite:
+        return None
+    os.makedirs(card_dir, exist_ok=True)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(result["data"], f, ensure_ascii=False, indent=2)
+    return json_path
+
+
+def import_all(paths, positions: dict[int, dict], blank: dict[int, set], jobs: int):
+    """Yield the result of every PDF as it finishes."""
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(import_pdf, path, positions, blank) for path in paths]
+            for future in as_completed(futures):
+                yield future.result()
+    else:
+        for path in paths:
+            yield import_pdf(path, positions, blank)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdfs", nargs="+", help="已填写的PDF文件或目录")
+    ap.add_argument("--positions", default=POSITIONS_DEFAULT, help="坐标JSON文件路径(与填写时相同)")
+    ap.add_argument("--pdf", default=PDF_PATH_DEFAULT, help="空白源PDF路径(用于排除表格上原有的文字，找不到则不排除)")
+    ap.add_argument("--out", default=CARDS_DIR, help="角色卡输出目录(<姓名>/<姓名>.json)")
+    ap.add_argument("--overwrite", action="store_true", help="覆盖已存在的角色卡")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="并行进程数")
+    ap.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE, help="低于此置信度的字段列为需要核对")
+    ap.add_argument("--report", default=None, help="把每个字段的结果和置信度写入此JSON文件")
+    args = ap.parse_args()
+
+    positions = position_map.load_positions(args.positions)
+    paths = pdf_paths(args.pdfs)
+    if not paths:
+        raise SystemExit("没有找到PDF文件。")
+    blank = {}
+    if os.path.exists(args.pdf):
+        blank = template_spans(args.pdf, positions)
+    else:
+        print(f"找不到空白源PDF：{args.pdf}，表格原有文字不会被排除")
+
+    started = time.perf_counter()
+    report = []
+    written = 0
+    for result in import_all(paths, positions, blank, args.jobs):
+        report.append(result)
+        if "error" in result:
+            print(f"[失败] {result['path']}: {result['error']}")
+            continue
+        doubtful = [
+            f"{key}({info['confidence']:.2f})"
+            for key, info in result["fields"].items()
+            if info["confidence"] < args.min_confidence
+        ]
+        json_path = write_card(result, args.out, args.overwrite)
+        if json_path:
+            written += 1
+            where = json_path
+        else:
+            where = "角色卡已存在，未覆盖"
+        print(f"{result['path']} → {where}：读取 {len(result['data'])}/{len(result['fields'])} 个字段"
+              + (f"，需核对: {', '.join(doubtful)}" if doubtful else ""))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(sorted(report, key=lambda r: r["path"]), f, ensure_ascii=False, indent=2)
+    print(f"\n共 {len(paths)} 个PDF，生成 {written} 张角色卡，用时 {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
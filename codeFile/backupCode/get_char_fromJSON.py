@@ -2,8 +2,19 @@ import argparse
 import datetime as _dt
 import json
 import os
+import sys
 from io import BytesIO
 
+try:
+    import position_map
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import position_map
+
+# position_map puts codeFile/ on the path
+import arc_catalog
+import font_subset
+
 
 PDF_PATH_DEFAULT = r"e:\三角Allin\角色卡文档-无水印无加密版.pdf"
 OUTPUT_DIR_DEFAULT = r"e:\三角Allin\codeFile\output_CARD"
@@ -17,90 +28,86 @@ def load_json_dict(path: str) -> dict:
     return obj
 
 
-def normalize_positions(raw_positions: dict) -> dict[str, tuple[float, float, int]]:
-    normalized: dict[str, tuple[float, float, int]] = {}
-    for k, v in raw_positions.items():
-        if isinstance(v, (list, tuple)) and len(v) >= 3:
-            x, y, size = v[0], v[1], v[2]
-        elif isinstance(v, dict) and {"x", "y"} <= set(v.keys()):
-            x, y = v["x"], v["y"]
-            size = v.get("size", 12)
-        else:
-            raise ValueError(f"positions里字段 {k} 的格式不正确：{v}")
-        normalized[str(k)] = (float(x), float(y), int(size))
-    return normalized
-
-
-def _safe_filename_part(value: str, fallback: str, max_len: int = 50) -> str:
-    v = (value or "").strip() or fallback
-    v = "".join("_" if (c in '<>:"/\\|?*' or ord(c) < 32) else c for c in v)
-    v = "_".join(v.split())
-    v = v.strip("._ ")
-    if not v:
-        v = fallback
-    return v[:max_len]
-
-
 def build_default_output_path(data: dict) -> str:
     os.makedirs(OUTPUT_DIR_DEFAULT, exist_ok=True)
-    name = _safe_filename_part(str(data.get("姓名", "")), "未知姓名")
-    anomaly = _safe_filename_part(str(data.get("异常体", "")), "未知异常体")
-    duty = _safe_filename_part(str(data.get("职能", "")), "未知职能")
+    name = arc_catalog.safe_filename_part(str(data.get("姓名", "")), "未知姓名")
+    anomaly = arc_catalog.safe_filename_part(str(data.get("异常体", "")), "未知异常体")
+    duty = arc_catalog.safe_filename_part(str(data.get("职能", "")), "未知职能")
     ts = _dt.datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{name}_{anomaly}_{duty}_{ts}.PDF"
     return os.path.join(OUTPUT_DIR_DEFAULT, filename)
 
 
-def build_overlay_page(width: float, height: float, items: list[tuple[str, float, float, int]]) -> BytesIO:
+def build_overlay_pages(pages: list[tuple[float, float, list[tuple[str, float, float, int]]]], font_name: str | None = None) -> BytesIO:
+    """
+    One overlay PDF holding a page of text for each (width, height, items), in order.
+    font_name is a registered reportlab font; without one the viewer's STSong-Light is used (not embedded).
+    """
     from reportlab.pdfbase import pdfmetrics
     from reportlab.pdfbase.cidfonts import UnicodeCIDFont
     from reportlab.pdfgen import canvas
 
     buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=(width, height))
-
-    font_name = "Helvetica"
-    try:
-        pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
-        font_name = "STSong-Light"
-    except Exception:
-        pass
-
-    for text, x, y, font_size in items:
-        if not text:
-            continue
-        c.setFont(font_name, font_size)
-        c.drawString(x, y, text)
+    c = canvas.Canvas(buf)
+
+    if font_name is None:
+        font_name = "Helvetica"
+        try:
+            pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+            font_name = "STSong-Light"
+        except Exception:
+            pass
+
+    for width, height, items in pages:
+        c.setPageSize((width, height))
+        for text, x, y, font_size in items:
+            c.setFont(font_name, font_size)
+            c.drawString(x, y, text)
+        c.showPage()
 
-    c.showPage()
     c.save()
     buf.seek(0)
     return buf
 
 
-def fill_first_page_overlay(pdf_path: str, out_path: str, data: dict, positions: dict[str, tuple[float, float, int]]):
+def fill_overlay(pdf_path: str, out_path: str, data: dict, positions: dict[int, dict[str, tuple[float, float, int]]],
+                 fonts: "font_subset.FontService | None" = None):
+    """
+    Draw the card fields onto every page that has positions. All overlays are built
+    in one reportlab pass; pages without any text are copied untouched.
+    With `fonts`, the text is set in an embedded subset of its CJK font.
+    """
     from pypdf import PdfReader, PdfWriter
 
     reader = PdfReader(pdf_path)
-    page0 = reader.pages[0]
-    width = float(page0.mediabox.width)
-    height = float(page0.mediabox.height)
-
-    overlay_items = []
-    for key, (x, y, size) in positions.items():
-        v = str(data.get(key, "")).strip()
-        overlay_items.append((v, x, y, size))
-
-    overlay_pdf = build_overlay_page(width, height, overlay_items)
-    overlay_reader = PdfReader(overlay_pdf)
-    overlay_page = overlay_reader.pages[0]
-
-    page0.merge_page(overlay_page)
+    targets = []
+    overlay_pages = []
+    for index, entries in sorted(positions.items()):
+        if index >= len(reader.pages):
+            print(f"positions 中的第 {index + 1} 页超出了 PDF 页数（{len(reader.pages)}），已跳过")
+            continue
+        items = []
+        for key, (x, y, size) in entries.items():
+            v = str(data.get(key, "")).strip()
+            if v:
+                items.append((v, x, y, size))
+        if not items:
+            continue
+        box = reader.pages[index].mediabox
+        targets.append(index)
+        overlay_pages.append((float(box.width), float(box.height), items))
+
+    if overlay_pages:
+        font_name = None
+        if fonts is not None:
+            font_name = fonts.reportlab_font("".join(text for _, _, items in overlay_pages for text, *_ in items))
+        overlay_reader = PdfReader(build_overlay_pages(overlay_pages, font_name))
+        for index, overlay_page in zip(targets, overlay_reader.pages):
+            reader.pages[index].merge_page(overlay_page)
 
     writer = PdfWriter()
-    writer.add_page(page0)
-    for i in range(1, len(reader.pages)):
-        writer.add_page(reader.pages[i])
+    for page in reader.pages:
+        writer.add_page(page)
 
     with open(out_path, "wb") as f:
         writer.write(f)
@@ -109,24 +116,43 @@ def fill_first_page_overlay(pdf_path: str, out_path: str, data: dict, positions:
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pdf", default=PDF_PATH_DEFAULT, help="源PDF路径")
-    ap.add_argument("--data", required=True, help="填写数据JSON文件路径(对象：字段名->值)")
-    ap.add_argument("--positions", required=True, help="坐标JSON文件路径(对象：字段名->[x,y,size])")
-    ap.add_argument("--out", default=None, help="输出PDF路径")
+    ap.add_argument("--data", required=True, nargs="+", help="填写数据JSON文件路径(对象：字段名->值)，可以给多个")
+    ap.add_argument("--positions", required=True, help="坐标JSON文件路径(positions.json，按页记录 字段名->[x,y,size])")
+    ap.add_argument("--out", default=None, help="输出PDF路径(只给一个数据文件时可用)")
+    ap.add_argument("--font", default=None, help=f"嵌入的中文 TrueType 字体(默认：环境变量 {font_subset.FONT_ENV} 或系统字体)")
+    ap.add_argument("--no-embed", action="store_true", help="不嵌入字体，使用阅读器自带的 STSong-Light")
     args = ap.parse_args()
 
     if not os.path.exists(args.pdf):
         raise FileNotFoundError(f"找不到PDF文件：{args.pdf}")
-    if not os.path.exists(args.data):
-        raise FileNotFoundError(f"找不到数据JSON：{args.data}")
+    for path in args.data:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"找不到数据JSON：{path}")
     if not os.path.exists(args.positions):
         raise FileNotFoundError(f"找不到坐标JSON：{args.positions}")
-
-    data = load_json_dict(args.data)
-    positions = normalize_positions(load_json_dict(args.positions))
-    out_path = args.out or build_default_output_path(data)
-
-    fill_first_page_overlay(args.pdf, out_path, data, positions)
-    print(f"\n已生成：{out_path}")
+    if args.out and len(args.data) > 1:
+        raise SystemExit("--out 只能和一个数据文件一起使用")
+
+    cards = [load_json_dict(path) for path in args.data]
+    positions = position_map.load_positions(args.positions)
+
+    fonts = None
+    if not args.no_embed:
+        font_path = args.font or font_subset.find_font()
+        if not font_path:
+            print(f"没有找到可嵌入的中文字体(可用 --font 或 {font_subset.FONT_ENV} 指定)，使用不嵌入的 STSong-Light")
+        elif not font_subset.fonttools_available():
+            print("未安装 fontTools(pip install fonttools)，使用不嵌入的 STSong-Light")
+        else:
+            fonts = font_subset.FontService(font_path)
+            if len(cards) > 1:
+                # One subset for the batch; each card then reuses it from the cache
+                fonts.subset("".join(font_subset.card_text(data) for data in cards))
+
+    for data in cards:
+        out_path = args.out or build_default_output_path(data)
+        fill_overlay(args.pdf, out_path, data, positions, fonts)
+        print(f"\n已生成：{out_path}")
 
 
 if __name__ == "__main__":
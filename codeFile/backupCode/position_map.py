@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import arc_catalog
+
+# positions.json, version 2: PDF page index -> field -> [x, y, font size]
+#   {"version": 2, "pages": {"0": {"姓名": [50.0, 723.0, 12]}, "1": {...}}}
+# A file without "version" is the old single-page format (field -> [x, y, size] on page 0).
+POSITIONS_VERSION = 2
+DEFAULT_SIZE = 12
+
+# Keys older position files used for a card field
+KEY_ALIASES = {
+    "过载接触": "过载解除",
+}
+
+
+def card_fields() -> list[str]:
+    """The card fields a position can be given for."""
+    return list(arc_catalog.CARD_FIELDS)
+
+
+def check_keys(keys, fields=None):
+    unknown = [k for k in keys if k not in (fields or card_fields())]
+    if unknown:
+        raise ValueError(f"角色卡中没有这些字段：{', '.join(unknown)}")
+
+
+def normalize_entry(key: str, value) -> tuple[float, float, int]:
+    if isinstance(value, (list, tuple)) and len(value) >= 3:
+        x, y, size = value[0], value[1], value[2]
+    elif isinstance(value, dict) and {"x", "y"} <= set(value.keys()):
+        x, y = value["x"], value["y"]
+        size = value.get("size", DEFAULT_SIZE)
+    else:
+        raise ValueError(f"positions里字段 {key} 的格式不正确：{value}")
+    return float(x), float(y), int(size)
+
+
+def parse_positions(obj: dict, fields=None) -> dict[int, dict[str, tuple[float, float, int]]]:
+    """Page index -> field -> (x, y, size), checked against the card fields."""
+    if not isinstance(obj, dict):
+        raise ValueError("positions内容必须是对象(dict)。")
+    version = obj.get("version", 1)
+    if version == 1:
+        raw_pages = {"0": obj}
+    elif version == POSITIONS_VERSION:
+        raw_pages = obj.get("pages", {})
+    else:
+        raise ValueError(f"不支持的 positions 版本：{version}")
+
+    pages: dict[int, dict[str, tuple[float, float, int]]] = {}
+    for page_key, entries in raw_pages.items():
+        try:
+            page = int(page_key)
+        except ValueError:
+            raise ValueError(f"positions里的页码不正确：{page_key}")
+        if page < 0 or not isinstance(entries, dict):
+            raise ValueError(f"positions里第 {page_key} 页的格式不正确")
+        out = {}
+        for key, value in entries.items():
+            key = str(key)
+            if key in KEY_ALIASES:
+                print(f"positions: 字段 {key} 已改名为 {KEY_ALIASES[key]}")
+                key = KEY_ALIASES[key]
+            out[key] = normalize_entry(key, value)
+        check_keys(out, fields)
+        pages[page] = out
+    return pages
+
+
+def load_positions(path: str, fields=None) -> dict[int, dict[str, tuple[float, float, int]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_positions(json.load(f), fields)
+
+
+def save_positions(path: str, pages: dict[int, dict]):
+    """Write the version-2 file; replaced atomically so a crash mid-pick keeps the last save."""
+    obj = {
+        "version": POSITIONS_VERSION,
+        "pages": {
+            str(page): {key: [round(float(x), 2), round(float(y), 2), int(size)] for key, (x, y, size) in entries.items()}
+            for page, entries in sorted(pages.items())
+            if entries
+        },
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,248 @@
+import argparse
+import contextlib
+import datetime as _dt
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import json_to_html
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import json_to_html
+
+import arc_catalog
+import card_fixtures
+import pdf_export
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GUI_SCRIPT = os.path.join(BASE_DIR, "json_form_gui.py")
+OVERLAY_DIR = os.path.join(BASE_DIR, "backupCode")
+POSITIONS_PATH = os.path.join(BASE_DIR, "positions.json")
+
+
+class StageSkipped(Exception):
+    """Raised by a stage whose dependencies (browser, reportlab, display...) are missing."""
+
+
+def run_stage(fn, repeat: int, warmup: int = 1) -> dict:
+    samples = []
+    # The pipeline prints progress lines; keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+class Fixtures:
+    def __init__(self, workdir: str, seed: int, avatar_px: int):
+        self.workdir = workdir
+        catalog = arc_catalog.load_catalog()
+        self.avatar_path = card_fixtures.write_avatars(workdir, [avatar_px], seed)[0]
+        card = card_fixtures.FixtureFactory(catalog, seed).card(0)
+        self.plain_json = self._write("plain", card)
+        # Same card with only the avatar added, so avatar_encode is the whole difference
+        self.avatar_json = self._write("avatar", dict(card, 图片路径=self.avatar_path))
+        self.html_path = os.path.join(workdir, "plain.html")
+        with contextlib.redirect_stdout(io.StringIO()):
+            json_to_html.generate_html(self.plain_json, self.html_path)
+
+    def _write(self, name: str, data: dict) -> str:
+        path = os.path.join(self.workdir, name + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+
+def stage_arc_load():
+    arc_catalog.clear_cache()
+    arc_catalog.load_catalog()
+
+
+def make_stages(fx: Fixtures) -> dict:
+    out_html = os.path.join(fx.workdir, "out.html")
+    out_pdf = os.path.join(fx.workdir, "out.pdf")
+
+    def generate_plain():
+        json_to_html.generate_html(fx.plain_json, out_html)
+
+    def generate_avatar():
+        json_to_html.generate_html(fx.avatar_json, out_html)
+
+    def pdf_cold():
+        if not pdf_export.BROWSER_PATH:
+            raise StageSkipped("no Edge/Chrome found")
+        profile = tempfile.mkdtemp(prefix="bench_profile_", dir=fx.workdir)
+        try:
+            pdf_export.html_to_pdf(fx.html_path, out_pdf, profile)
+        finally:
+            shutil.rmtree(profile, ignore_errors=True)
+
+    warm_profile = os.path.join(fx.workdir, "warm_profile")
+
+    def pdf_warm():
+        if not pdf_export.BROWSER_PATH:
+            raise StageSkipped("no Edge/Chrome found")
+        pdf_export.html_to_pdf(fx.html_path, out_pdf, warm_profile)
+
+    def overlay():
+        try:
+            sys.path.insert(0, OVERLAY_DIR)
+            import get_char_fromJSON
+            from reportlab.pdfgen import canvas
+        except ImportError as e:
+            raise StageSkipped(str(e))
+        finally:
+            if OVERLAY_DIR in sys.path:
+                sys.path.remove(OVERLAY_DIR)
+        src = os.path.join(fx.workdir, "blank.pdf")
+        if not os.path.exists(src):
+            c = canvas.Canvas(src, pagesize=(595.28, 841.89))
+            for _ in range(5):
+                c.showPage()
+            c.save()
+        data = get_char_fromJSON.load_json_dict(fx.plain_json)
+        positions = get_char_fromJSON.position_map.load_positions(POSITIONS_PATH)
+        get_char_fromJSON.fill_overlay(src, os.path.join(fx.workdir, "overlay.pdf"), data, positions)
+
+    def gui_first_paint():
+        env = dict(os.environ, TA_EXIT_AFTER_FIRST_PAINT="1")
+        proc = subprocess.run(
+            [sys.executable, GUI_SCRIPT], env=env, capture_output=True, text=True, timeout=60
+        )
+        if "FIRST_PAINT" not in proc.stdout:
+            raise StageSkipped((proc.stderr.strip().splitlines() or ["GUI did not start"])[-1])
+
+    return {
+        "arc_load": stage_arc_load,
+        "generate_html": generate_plain,
+        "generate_html_avatar": generate_avatar,
+        "html_to_pdf_cold": pdf_cold,
+        "html_to_pdf_warm": pdf_warm,
+        "overlay_fill": overlay,
+        "gui_first_paint": gui_first_paint,
+    }
+
+
+# Slow stages get fewer repetitions regardless of --repeat
+STAGE_REPEAT_CAP = {
+    "html_to_pdf_cold": 3,
+    "html_to_pdf_warm": 5,
+    "gui_first_paint": 3,
+}
+
+
+def run_benchmarks(repeat: int, seed: int, avatar_px: int, only=None) -> dict:
+    workdir = tempfile.mkdtemp(prefix="ta_bench_")
+    results = {
+        "meta": {
+            "timestamp": _dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "avatar_px": avatar_px,
+        },
+        "stages": {},
+    }
+    try:
+        fx = Fixtures(workdir, seed, avatar_px)
+        for name, fn in make_stages(fx).items():
+            if only and name not in only:
+                continue
+            n = min(repeat, STAGE_REPEAT_CAP.get(name, repeat))
+            try:
+                results["stages"][name] = run_stage(fn, n)
+            except StageSkipped as e:
+                results["stages"][name] = {"skipped": str(e)}
+            except Exception as e:
+                results["stages"][name] = {"error": str(e)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float, only=None) -> list[str]:
+    """
+    Return one message per stage whose median regressed beyond the threshold. A stage
+    timed in the baseline that now fails or is missing (and not left out with --stages)
+    counts as a regression; only a stage skipped for a missing dependency is exempt.
+    """
+    regressions = []
+    for name, base in baseline.get("stages", {}).items():
+        if "median_ms" not in base or (only and name not in only):
+            continue
+        cur = current["stages"].get(name)
+        if cur is None:
+            regressions.append(f"{name:<22} {base['median_ms']:>10.2f} ms -> 本次未运行")
+            continue
+        if "error" in cur:
+            regressions.append(f"{name:<22} {base['median_ms']:>10.2f} ms -> error: {cur['error']}")
+            continue
+        if "median_ms" not in cur:
+            continue
+        limit = base["median_ms"] * (1.0 + threshold)
+        ratio = cur["median_ms"] / base["median_ms"] if base["median_ms"] else 0.0
+        line = f"{name:<22} {base['median_ms']:>10.2f} -> {cur['median_ms']:>10.2f} ms  ({ratio:.2f}x)"
+        if cur["median_ms"] > limit:
+            regressions.append(line)
+    return regressions
+
+
+def print_table(results: dict):
+    for name, r in results["stages"].items():
+        if "median_ms" in r:
+            print(f"{name:<22} median {r['median_ms']:>10.2f} ms   min {r['min_ms']:>10.2f} ms   runs {r['runs']}")
+        else:
+            print(f"{name:<22} {'skipped: ' + r['skipped'] if 'skipped' in r else 'error: ' + r['error']}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20, help="Timed runs per stage")
+    ap.add_argument("--seed", type=int, default=1234, help="Fixture seed")
+    ap.add_argument("--avatar-px", type=int, default=512, help="Synthetic avatar edge length (pixels)")
+    ap.add_argument("--stages", default=None, help="Only run these stages (comma separated)")
+    ap.add_argument("--out", default=None, help="Write results JSON (e.g. a new baseline)")
+    ap.add_argument("--compare", default=None, help="Baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.20, help="Allowed median slowdown, 0.20 = 20%%")
+    args = ap.parse_args()
+
+    only = {s.strip() for s in args.stages.split(",")} if args.stages else None
+    results = run_benchmarks(args.repeat, args.seed, args.avatar_px, only)
+    print_table(results)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n已保存：{args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, only)
+        if regressions:
+            print(f"\n性能回退 (超过 {args.threshold:.0%})：")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"\n与基线相比无回退 (阈值 {args.threshold:.0%})。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+import stat_rules
+
+ANSWER_FIELDS = ["问题0A", "问题0B", "问题1", "问题2", "问题3", "问题4", "问题5", "问题6", "问题7", "补充说明"]
+PRONOUNS = ["他", "她", "他们", "它"]
+TITLES = ["外勤干员", "实习特工", "资深特工", "行政专员"]
+RATINGS = ["A", "B", "C", "D"]
+
+
+def png_bytes(width: int, height: int, seed: int = 0) -> bytes:
+    """A deterministic RGB noise PNG, so avatar encoding cost scales like a real photo."""
+    rng = random.Random(seed)
+    row_len = width * 3
+    raw = bytearray()
+    for _ in range(height):
+        raw.append(0)
+        raw += rng.randbytes(row_len)
+
+    def chunk(tag, payload):
+        return struct.pack(">I", len(payload)) + tag + payload + struct.pack(">I", zlib.crc32(tag + payload))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(raw), 6)) + chunk(b"IEND", b"")
+
+
+def text_corpus(catalog: dict) -> str:
+    """All the prose in the ARC files, used as the alphabet for synthetic answers."""
+    parts = []
+    for abilities in catalog["anomaly"].values():
+        for ab in abilities:
+            parts += [ab["trigger"], ab["success"], ab["failure"], ab["special"]]
+    for reality in catalog["reality"].values():
+        parts += [reality["triggers_text"], reality["overload_text"]]
+    corpus = "".join(ch for ch in "".join(parts) if not ch.isspace())
+    return corpus or "三角机构"
+
+
+class FixtureFactory:
+    """Samples valid cards from a catalog. Same seed, same cards."""
+
+    def __init__(self, catalog: dict, seed: int = 0, text_len=(20, 120), avatar_paths=()):
+        self.catalog = catalog
+        self.rng = random.Random(seed)
+        self.text_len = text_len
+        self.avatar_paths = list(avatar_paths)
+        self.corpus = text_corpus(catalog)
+        self._ring = self.corpus * 2
+        self.anomalies = sorted(catalog["anomaly"])
+        self.realities = sorted(catalog["reality"])
+        self.roles = sorted(catalog["competency"])
+        self.rules = stat_rules.rules_for(catalog)
+
+    def text(self) -> str:
+        lo, hi = self.text_len
+        start = self.rng.randrange(len(self.corpus))
+        n = self.rng.randint(lo, hi)
+        # Slices of real prose read like real answers and are much cheaper than per-char sampling
+        if n <= len(self.corpus):
+            return self._ring[start:start + n]
+        return (self.corpus * (n // len(self.corpus) + 2))[start:start + n]
+
+    def card(self, index: int) -> dict:
+        rng = self.rng
+        reality = rng.choice(self.realities)
+        types = self.catalog["reality"][reality]["types"] or [""]
+        anomaly = rng.choice(self.anomalies)
+        data = {
+            "姓名": f"特工{index:05d}",
+            "人称代词": rng.choice(PRONOUNS),
+            "机构头衔": rng.choice(TITLES),
+            "机构评级": rng.choice(RATINGS),
+            "异常体": anomaly,
+            "现实": f"{reality}-{rng.choice(types)}",
+            "职能": rng.choice(self.roles),
+        }
+        role = self.catalog["competency"][data["职能"]]
+        data["职能问答"] = [
+            rng.randrange(len(q["options"])) if q["options"] else None
+            for q in role["interactions"]
+        ]
+        for i in range(3):
+            data[f"能力{i+1}资质"] = rng.choice(stat_rules.STAT_NAMES)
+        for field in ANSWER_FIELDS:
+            data[field] = self.text()
+        data["异常问答"] = [
+            rng.randrange(len(ab["options"])) if ab["options"] else None
+            for ab in self.catalog["anomaly"][anomaly]
+        ]
+        # Stats follow from the answers, so generated cards pass stat_rules audits
+        data.update(stat_rules.derived_stat_fields(data, self.rules))
+        if self.avatar_paths:
+            avatar = rng.choice(self.avatar_paths)
+            if avatar:
+                data["图片路径"] = avatar
+        return arc_catalog.fill_derived(data, self.catalog)
+
+
+def write_avatars(out_dir: str, sizes, seed: int) -> list[str]:
+    """One shared avatar file per requested size; size 0 means 'no avatar'."""
+    paths = []
+    avatar_dir = os.path.join(out_dir, "_avatars")
+    for size in sizes:
+        if size <= 0:
+            paths.append("")
+            continue
+        os.makedirs(avatar_dir, exist_ok=True)
+        path = os.path.join(avatar_dir, f"avatar_{size}.png")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(png_bytes(size, size, seed + size))
+        paths.append(os.path.abspath(path))
+    return paths
+
+
+def generate_cards(out_dir: str, count: int, seed: int = 0, text_len=(20, 120), avatar_sizes=(0,), catalog=None) -> list[str]:
+    """Write `count` cards as out_dir/<name>/<name>.json and return their paths."""
+    catalog = catalog or arc_catalog.load_catalog()
+    factory = FixtureFactory(catalog, seed, text_len, write_avatars(out_dir, avatar_sizes, seed))
+    paths = []
+    for i in range(count):
+        data = factory.card(i)
+        name = data["姓名"]
+        card_dir = os.path.join(out_dir, name)
+        os.makedirs(card_dir, exist_ok=True)
+        path = os.path.join(card_dir, name + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        paths.append(path)
+    return paths
+
+
+def parse_range(value: str) -> tuple[int, int]:
+    lo, _, hi = value.partition(":")
+    return int(lo), int(hi or lo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="Output directory (same layout as output/)")
+    parser.add_argument("-n", "--count", type=int, default=100, help="Number of cards")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--text-len", default="20:120", help="Answer length range in characters, e.g. 20:120")
+    parser.add_argument("--avatar-sizes", default="0", help="Avatar edge lengths to sample from, 0 = none, e.g. 0,256,1024")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.avatar_sizes.split(",") if s.strip()]
+    t0 = time.perf_counter()
+    paths = generate_cards(args.out, args.count, args.seed, parse_range(args.text_len), sizes)
+    print(f"已生成 {len(paths)} 张角色卡：{args.out} ({time.perf_counter() - t0:.2f}s)")
@@ -0,0 +1,246 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+import stat_rules
+
+CARDS_DIR = os.path.join(arc_catalog.PROJECT_ROOT, "output")
+INDEX_NAME = ".code_index.json"
+INDEX_VERSION = 1
+
+def normalize_code(code: str) -> str:
+    """"p4" / " P4 " -> "P4", "+3  共情" -> "+3 共情"."""
+    return " ".join(str(code or "").split()).upper()
+
+
+def catalog_questions(catalog: dict, kind: str) -> dict[str, list[dict]]:
+    """{key: [{"title", "question", "options"}]} for either kind of catalog entry."""
+    if kind == "anomaly":
+        return {
+            key: [{"title": ab["title"], "question": ab["question"], "options": ab["options"]} for ab in abilities]
+            for key, abilities in catalog["anomaly"].items()
+        }
+    return {
+        key: [{"title": "", "question": q["question"], "options": q["options"]} for q in role["interactions"]]
+        for key, role in catalog["competency"].items()
+    }
+
+
+def build_emitters(catalog: dict) -> dict[str, list[dict]]:
+    """code -> every catalog question option that carries it."""
+    emitters: dict[str, list[dict]] = {}
+    for kind in stat_rules.SOURCES:
+        for key, questions in catalog_questions(catalog, kind).items():
+            for q_idx, q in enumerate(questions):
+                for o_idx, opt in enumerate(q["options"]):
+                    code = normalize_code(opt["code"])
+                    if not code:
+                        continue
+                    emitters.setdefault(code, []).append({
+                        "kind": kind,
+                        "key": key,
+                        "question": q_idx,
+                        "option": o_idx,
+                        "title": q["title"],
+                        "text": q["question"],
+                        "answer": opt["answer"],
+                    })
+    return emitters
+
+
+def card_codes(data: dict, catalog: dict, questions_by_kind: dict | None = None) -> list[str]:
+    """The codes of the options a card selected, from its recorded answers."""
+    if questions_by_kind is None:
+        questions_by_kind = {kind: catalog_questions(catalog, kind) for kind in stat_rules.SOURCES}
+    codes = []
+    for kind, (key_field, answer_field) in stat_rules.SOURCES.items():
+        questions = questions_by_kind[kind].get(str(data.get(key_field, "")), [])
+        for q_idx, option in enumerate(data.get(answer_field) or []):
+            if option is None or q_idx >= len(questions):
+                continue
+            # Hand-edited or imported cards may store the index as a string ("2")
+            try:
+                option = int(option)
+            except (TypeError, ValueError):
+                continue
+            options = questions[q_idx]["options"]
+            if 0 <= option < len(options):
+                code = normalize_code(options[option]["code"])
+                if code:
+                    codes.append(code)
+    return codes
+
+
+class CodeIndex:
+    """
+    code -> emitting questions and selecting cards, persisted next to the cards.
+    refresh() only re-reads cards whose mtime or size changed, and only rebuilds
+    the emitter table when an ARC file changed.
+    """
+
+    def __init__(self, cards_dir: str = CARDS_DIR, index_path: str | None = None, setting_dir: str = arc_catalog.SETTING_DIR):
+        self.cards_dir = cards_dir
+        self.index_path = index_path or os.path.join(cards_dir, INDEX_NAME)
+        self.setting_dir = setting_dir
+        self.catalog_stamp = None
+        self.emitters: dict[str, list[dict]] = {}
+        self.cards: dict[str, dict] = {}
+        self.users: dict[str, set[str]] = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get("version") != INDEX_VERSION:
+            return
+        self.catalog_stamp = tuple(saved.get("catalog_stamp") or ()) or None
+        self.emitters = saved.get("emitters", {})
+        self.cards = saved.get("cards", {})
+        self._rebuild_users()
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "catalog_stamp": list(self.catalog_stamp or ()),
+                "emitters": self.emitters,
+                "cards": self.cards,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    def _rebuild_users(self):
+        self.users = {}
+        for rel, entry in self.cards.items():
+            for code in entry["codes"]:
+                self.users.setdefault(code, set()).add(rel)
+
+    def _set_card(self, rel: str, entry: dict | None):
+        old = self.cards.pop(rel, None)
+        for code in (old or {}).get("codes", []):
+            users = self.users.get(code)
+            if users:
+                users.discard(rel)
+                if not users:
+                    del self.users[code]
+        if entry is not None:
+            self.cards[rel] = entry
+            for code in entry["codes"]:
+                self.users.setdefault(code, set()).add(rel)
+
+    def refresh(self) -> dict:
+        """Bring the index up to date with the catalog and the card directory."""
+        stats = {"read": 0, "removed": 0, "catalog": False}
+        stamp = arc_catalog.catalog_stamp(self.setting_dir)
+        catalog = arc_catalog.load_catalog(self.setting_dir)
+        catalog_changed = stamp != self.catalog_stamp
+        if catalog_changed:
+            self.emitters = build_emitters(catalog)
+            self.catalog_stamp = stamp
+            stats["catalog"] = True
+        questions_by_kind = {kind: catalog_questions(catalog, kind) for kind in stat_rules.SOURCES}
+
+        seen = set()
+        for path in glob.glob(os.path.join(self.cards_dir, "*", "*.json")):
+            rel = os.path.relpath(path, self.cards_dir)
+            seen.add(rel)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            old = self.cards.get(rel)
+            if old and not catalog_changed and old["mtime"] == st.st_mtime and old["size"] == st.st_size:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(data, dict):
+                data = {}
+            self._set_card(rel, {
+                "name": str(data.get("姓名", "")),
+                "mtime": st.st_mtime,
+                "size": st.st_size,
+                "codes": card_codes(data, catalog, questions_by_kind),
+            })
+            stats["read"] += 1
+        for rel in [rel for rel in self.cards if rel not in seen]:
+            self._set_card(rel, None)
+            stats["removed"] += 1
+        if stats["read"] or stats["removed"] or stats["catalog"]:
+            self.save()
+        return stats
+
+    # --- Queries ---
+
+    def emitters_of(self, code: str) -> list[dict]:
+        return self.emitters.get(normalize_code(code), [])
+
+    def cards_with(self, code: str) -> list[dict]:
+        """[{"path", "name"}] of every card that selected the code."""
+        return [
+            {"path": os.path.join(self.cards_dir, rel), "name": self.cards[rel]["name"]}
+            for rel in sorted(self.users.get(normalize_code(code), ()))
+        ]
+
+    def codes(self) -> list[tuple[str, int, int]]:
+        """(code, emitting options, selecting cards) for every known code."""
+        return sorted(
+            (code, len(self.emitters.get(code, [])), len(self.users.get(code, ())))
+            for code in set(self.emitters) | set(self.users)
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("codes", nargs="*", help="Codes to look up, e.g. P4 T2")
+    parser.add_argument("--cards", default=CARDS_DIR, help="Directory holding <name>/<name>.json cards")
+    parser.add_argument("--index", default=None, help=f"Index file (default: <cards>/{INDEX_NAME})")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the saved index and rebuild it")
+    parser.add_argument("--list", action="store_true", help="List every code with its usage counts")
+    parser.add_argument("--json", action="store_true", help="Print query results as JSON")
+    args = parser.parse_args()
+
+    index_path = args.index or os.path.join(args.cards, INDEX_NAME)
+    if args.rebuild and os.path.exists(index_path):
+        os.remove(index_path)
+    started = time.perf_counter()
+    index = CodeIndex(args.cards, index_path)
+    stats = index.refresh()
+    elapsed = time.perf_counter() - started
+    if not args.json:
+        print(f"索引: {len(index.cards)} 张角色卡, {len(index.emitters)} 个代码 "
+              f"(重新读取 {stats['read']}, 移除 {stats['removed']}, {elapsed * 1000:.0f} ms)")
+
+    if args.list:
+        for code, n_emit, n_cards in index.codes():
+            print(f"{code:<10} 出处 {n_emit:>2}  角色卡 {n_cards}")
+
+    results = {code: {"emitters": index.emitters_of(code), "cards": index.cards_with(code)} for code in args.codes}
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for code, res in results.items():
+            print(f"\n[{normalize_code(code)}]")
+            for em in res["emitters"]:
+                where = f"{em['key']} · {em['title']}" if em["title"] else em["key"]
+                print(f"  出处: {where} — {em['text']} → {em['answer']}")
+            if not res["emitters"]:
+                print("  出处: （ARC 数据中没有此代码）")
+            print(f"  选择此项的角色卡 ({len(res['cards'])}):")
+            for card in res["cards"]:
+                print(f"    {card['name']}  {card['path']}")
@@ -0,0 +1,192 @@
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+from stat_rules import STAT_NAMES
+
+# Every roll is a pool of six d4; each die showing 3 counts.
+# A roll succeeds with at least one 3. Each QA point spent from the rolled
+# quality (资质, the *MAX value on the card) turns one more die into a 3.
+POOL_SIZE = 6
+DIE_SIDES = 4
+MAX_QA = 9
+
+_ROLL_RE = re.compile("掷(" + "|".join(STAT_NAMES) + ")")
+
+# (pattern, kind, parameter) checked in order against the 'specially' text
+SPECIAL_RULES = [
+    (re.compile(r"(六|6)\s*个或更多\s*3"), "threshold", 6),
+    (re.compile(r"每掷出第三个\s*3"), "every", 3),
+    (re.compile(r"每额外一个\s*3"), "extra", 1),
+    (re.compile(r"花费\s*3"), "extra", 1),
+]
+
+
+def parse_roll_stat(trigger: str) -> str | None:
+    """The quality named by the roll instruction at the end of an ability ("……掷气场。")."""
+    found = _ROLL_RE.findall(trigger or "")
+    return found[-1] if found else None
+
+
+def parse_special(special: str) -> tuple[str | None, int]:
+    for pattern, kind, param in SPECIAL_RULES:
+        if pattern.search(special or ""):
+            return kind, param
+    return None, 0
+
+
+@functools.lru_cache(maxsize=None)
+def pool_pmf(pool_size: int = POOL_SIZE):
+    """Exact distribution of the number of 3s in the pool, by repeated convolution."""
+    import numpy as np
+
+    die = np.array([(DIE_SIDES - 1) / DIE_SIDES, 1 / DIE_SIDES])
+    pmf = np.array([1.0])
+    for _ in range(pool_size):
+        pmf = np.convolve(pmf, die)
+    pmf.flags.writeable = False
+    return pmf
+
+
+def add_qa(counts, spent, pool_size: int = POOL_SIZE):
+    """Number of 3s after spending QA: each point turns one more die into a 3, up to the pool size."""
+    import numpy as np
+
+    return np.minimum(counts + spent, pool_size)
+
+
+@functools.lru_cache(maxsize=None)
+def qa_table(pool_size: int = POOL_SIZE, max_qa: int = MAX_QA):
+    """
+    table[k, c] = P(c threes after spending k QA), for every k in 0..max_qa at once.
+    Spent QA cannot push the count past the pool size.
+    """
+    import numpy as np
+
+    pmf = pool_pmf(pool_size)
+    spent = np.arange(max_qa + 1)[:, None]
+    counts = add_qa(np.arange(pool_size + 1)[None, :], spent, pool_size)
+    table = np.zeros((max_qa + 1, pool_size + 1))
+    rows = np.broadcast_to(spent, counts.shape)
+    np.add.at(table, (rows, counts), np.broadcast_to(pmf, counts.shape))
+    table.flags.writeable = False
+    return table
+
+
+def special_triggers(kind: str | None, param: int, counts):
+    """Special results triggered by each count of 3s (array in, float array out)."""
+    import numpy as np
+
+    if kind == "threshold":
+        return (counts >= param).astype(float)
+    if kind == "every":
+        return (counts // param).astype(float)
+    if kind == "extra":
+        return np.maximum(counts - param, 0).astype(float)
+    return np.zeros(len(counts))
+
+
+@functools.lru_cache(maxsize=256)
+def special_odds(kind: str | None, param: int, pool_size: int = POOL_SIZE, max_qa: int = MAX_QA) -> dict:
+    """Success / special probabilities for every QA value, as plain lists indexed by QA."""
+    import numpy as np
+
+    table = qa_table(pool_size, max_qa)
+    trig = special_triggers(kind, param, np.arange(pool_size + 1))
+    return {
+        "success": table[:, 1:].sum(axis=1).tolist(),
+        "special": (table @ (trig > 0)).tolist(),
+        "special_expected": (table @ trig).tolist(),
+        "distribution": table.tolist(),
+    }
+
+
+def ability_odds(ability: dict, qa: int = 0) -> dict:
+    """Odds of one ability (a card/catalog ability dict) with `qa` points of its quality spent."""
+    kind, param = parse_special(ability.get("special", ""))
+    odds = special_odds(kind, param)
+    qa = max(0, min(int(qa), MAX_QA))
+    return {
+        "kind": kind,
+        "qa": qa,
+        "success": odds["success"][qa],
+        "special": odds["special"][qa] if kind else None,
+        "special_expected": odds["special_expected"][qa] if kind else None,
+    }
+
+
+def stat_value(data: dict, stat: str) -> int:
+    try:
+        return max(0, min(int(str(data.get(f"{stat}MAX", "0")).strip() or 0), MAX_QA))
+    except ValueError:
+        return 0
+
+
+def format_odds(odds: dict) -> str:
+    text = f"成功 {odds['success']:.0%}"
+    if odds["special"] is not None:
+        text += f" · 特殊 {odds['special']:.0%}"
+    return text
+
+
+def describe_ability(ability: dict, qa: int) -> str:
+    """One line for cards and the GUI: odds without QA, and with the quality's QA spent."""
+    base = format_odds(ability_odds(ability, 0))
+    if qa <= 0:
+        return base
+    return f"{base}（花费 {qa} 点资质：{format_odds(ability_odds(ability, qa))}）"
+
+
+def numpy_available() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def catalog_report(catalog: dict) -> dict:
+    """Odds for every ability in Anomaly.json and every QA value."""
+    report = {}
+    for anomaly, abilities in catalog["anomaly"].items():
+        rows = []
+        for ab in abilities:
+            kind, param = parse_special(ab["special"])
+            odds = special_odds(kind, param)
+            rows.append({
+                "title": ab["title"],
+                "roll": parse_roll_stat(ab["trigger"]),
+                "special_rule": kind,
+                "success": odds["success"],
+                "special": odds["special"] if kind else None,
+                "special_expected": odds["special_expected"] if kind else None,
+            })
+        report[anomaly] = rows
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", action="store_true", help="Print the full table as JSON")
+    parser.add_argument("--qa", type=int, default=0, help="QA spent for the text table")
+    args = parser.parse_args()
+
+    report = catalog_report(arc_catalog.load_catalog())
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        qa = max(0, min(args.qa, MAX_QA))
+        for anomaly, rows in report.items():
+            print(f"[{anomaly}]")
+            for row in rows:
+                special = f"{row['special'][qa]:.1%}" if row["special"] else "—"
+                print(f"  {row['title']:<12} 掷{row['roll'] or '?'}  成功 {row['success'][qa]:.1%}  特殊({row['special_rule'] or '—'}) {special}")
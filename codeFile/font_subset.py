@@ -0,0 +1,233 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import string
+import sys
+import threading
+import time
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+CACHE_DIR = os.path.join(arc_catalog.PROJECT_ROOT, "output", ".font_cache")
+INDEX_NAME = "index.json"
+INDEX_VERSION = 2
+# Subsets carry this prefix in their PostScript name (which is what a PDF reader reports)
+# and in their reportlab name, so filled-in text can be told apart from the template's.
+FONT_PREFIX = "TA-CJK-"
+
+# TA_CJK_FONT overrides the search. reportlab can only embed TrueType outlines,
+# so OpenType/CFF fonts (most Noto CJK builds) are not usable here.
+FONT_ENV = "TA_CJK_FONT"
+FONT_CANDIDATES = [
+    r"C:\Windows\Fonts\simhei.ttf",
+    r"C:\Windows\Fonts\msyh.ttc",
+    r"C:\Windows\Fonts\simsun.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+]
+
+# Always part of a subset, so cards that differ only in digits or punctuation share one
+BASE_CHARS = frozenset(string.ascii_letters + string.digits + string.punctuation + " " + "，。、；：？！（）《》「」“”‘’…—·")
+
+
+def find_font() -> str | None:
+    path = os.environ.get(FONT_ENV)
+    if path:
+        return path
+    return next((p for p in FONT_CANDIDATES if os.path.isfile(p)), None)
+
+
+def fonttools_available() -> bool:
+    try:
+        import fontTools.subset  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class FontService:
+    """
+    Subsets of one CJK font, cut to the characters a document uses and cached on disk
+    by character set. A cached subset that covers a superset of the characters (say,
+    one made for a whole roster) is reused for every card inside it.
+    """
+
+    def __init__(self, font_path: str, cache_dir: str = CACHE_DIR, font_number: int = 0):
+        self.font_path = font_path
+        self.cache_dir = cache_dir
+        self.font_number = font_number
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] | None = None
+        self._registered: set[str] = set()
+        self.stats = {"hits": 0, "reused": 0, "built": 0}
+        st = os.stat(font_path)
+        stamp = f"{os.path.abspath(font_path)}|{st.st_mtime}|{st.st_size}|{font_number}"
+        self.font_id = hashlib.sha1(stamp.encode("utf-8")).hexdigest()[:12]
+
+    # --- Cache index ---
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_NAME)
+
+    def _load_index(self) -> dict[str, dict]:
+        if self._index is None:
+            try:
+                with open(self._index_path(), "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                self._index = saved.get("subsets", {}) if saved.get("version") == INDEX_VERSION else {}
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "subsets": self._index}, f, ensure_ascii=False)
+        os.replace(tmp, self._index_path())
+
+    # --- Subsets ---
+
+    def charset(self, text: str) -> frozenset:
+        return frozenset(ch for ch in text if ch.isprintable()) | BASE_CHARS
+
+    def key(self, chars: frozenset) -> str:
+        return hashlib.sha1((self.font_id + "".join(sorted(chars))).encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.ttf")
+
+    def _build(self, chars: frozenset, path: str):
+        from fontTools import subset
+
+        # Tables fontTools cannot subset are dropped; that is fine for embedding
+        logging.getLogger("fontTools.subset").setLevel(logging.ERROR)
+        options = subset.Options()
+        options.font_number = self.font_number
+        options.name_IDs = ["*"]
+        options.notdef_outline = True
+        options.hinting = False
+        font = subset.load_font(self.font_path, options)
+        if "glyf" not in font:
+            raise ValueError(f"{self.font_path} 不是 TrueType 轮廓字体，无法嵌入 PDF")
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[ord(ch) for ch in chars])
+        subsetter.subset(font)
+        ps_name = FONT_PREFIX + os.path.splitext(os.path.basename(path))[0]
+        font["name"].removeNames(nameID=6)
+        font["name"].setName(ps_name, 6, 1, 0, 0)
+        font["name"].setName(ps_name, 6, 3, 1, 0x409)
+        tmp = path + ".tmp"
+        subset.save_font(font, tmp, options)
+        font.close()
+        os.replace(tmp, path)
+
+    def subset(self, text: str) -> str:
+        """Path of a subset font that has every character of `text`."""
+        chars = self.charset(text)
+        key = self.key(chars)
+        with self._lock:
+            index = self._load_index()
+            if key in index and os.path.isfile(self._path(key)):
+                self.stats["hits"] += 1
+                return self._path(key)
+            # The smallest cached subset of this font that covers the text
+            covering = [
+                (len(entry["chars"]), k) for k, entry in index.items()
+                if entry["font"] == self.font_id and chars <= set(entry["chars"]) and os.path.isfile(self._path(k))
+            ]
+            if covering:
+                self.stats["reused"] += 1
+                return self._path(min(covering)[1])
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._build(chars, self._path(key))
+            index[key] = {"font": self.font_id, "chars": "".join(sorted(chars))}
+            self._save_index()
+            self.stats["built"] += 1
+            return self._path(key)
+
+    def reportlab_font(self, text: str) -> str:
+        """Register the subset for `text` with reportlab (embedded when used) and return its font name."""
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        path = self.subset(text)
+        name = FONT_PREFIX + os.path.splitext(os.path.basename(path))[0]
+        if name not in self._registered:
+            pdfmetrics.registerFont(TTFont(name, path))
+            self._registered.add(name)
+        return name
+
+    def clear(self):
+        with self._lock:
+            index = self._load_index()
+            for key in list(index):
+                if index[key]["font"] == self.font_id:
+                    try:
+                        os.remove(self._path(key))
+                    except OSError:
+                        pass
+                    del index[key]
+            if os.path.isdir(self.cache_dir):
+                self._save_index()
+
+
+def card_text(data: dict) -> str:
+    """Every string value of a card, the text a document of it can show."""
+    parts = []
+
+    def walk(value):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for v in value.values():
+                walk(v)
+        elif isinstance(value, list):
+            for v in value:
+                walk(v)
+
+    walk(data)
+    return "".join(parts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cards", nargs="*", help="Card JSON files to build subsets for")
+    parser.add_argument("--font", default=None, help=f"TrueType font (default: ${FONT_ENV} or a system CJK font)")
+    parser.add_argument("--cache", default=CACHE_DIR, help="Subset cache directory")
+    parser.add_argument("--roster", action="store_true", help="Build one subset covering all the cards first")
+    parser.add_argument("--clear", action="store_true", help="Remove the cached subsets of the font")
+    args = parser.parse_args()
+
+    font_path = args.font or find_font()
+    if not font_path:
+        sys.exit(f"没有找到可嵌入的中文字体，请用 --font 或环境变量 {FONT_ENV} 指定 TrueType 字体。")
+    if not fonttools_available():
+        sys.exit("需要 fontTools：pip install fonttools")
+    service = FontService(font_path, args.cache)
+    if args.clear:
+        service.clear()
+        print(f"已清除 {font_path} 的字体子集缓存")
+
+    texts = []
+    for path in args.cards:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append((path, card_text(json.load(f))))
+    if args.roster and texts:
+        texts.insert(0, ("(花名册)", "".join(text for _, text in texts)))
+    full = os.path.getsize(font_path)
+    for name, text in texts:
+        started = time.perf_counter()
+        path = service.subset(text)
+        print(f"{name}: {len(service.charset(text))} 字 → {os.path.getsize(path) / 1024:.0f} KB "
+              f"(原字体 {full / 1024:.0f} KB)，{(time.perf_counter() - started) * 1000:.0f} ms")
+    if texts:
+        s = service.stats
+        print(f"缓存命中 {s['hits']}，复用更大的子集 {s['reused']}，新生成 {s['built']}")
@@ -0,0 +1,296 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+# Post-render size optimizer for generated cards. Every step keeps the rendering
+# identical: markup whitespace is only collapsed between tags, and the contents of
+# <script>/<style>/<pre>/<textarea> get their own, more careful treatment.
+
+_PROTECTED_RE = re.compile(r"(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)", re.S | re.I)
+_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_GAP_RE = re.compile(r">\s+<")
+_EDGE_END_RE = re.compile(r">\s+\Z")
+_EDGE_START_RE = re.compile(r"\A\s+<")
+_DATA_URI_RE = re.compile(r"data:[\w/+.-]+(?:;[\w=.-]+)*;base64,[A-Za-z0-9+/=]+")
+_IMG_RE = re.compile(r"<img\b([^<>]*?)\s*/?>", re.I)
+_ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*"([^"]*)"')
+_START_TAG_RE = re.compile(r"<[a-zA-Z][\w-]*\s[^<>]*>")
+_STYLE_ATTR_RE = re.compile(r'\sstyle="([^"]*)"')
+_CLASS_ATTR_RE = re.compile(r'\sclass="([^"]*)"')
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s*([{};,])\s*")
+
+# How an <img> with object-fit maps to a background
+_IMG_FITS = {"object-cover": "cover", "object-contain": "contain"}
+
+STEP_LABELS = {
+    "data_uris": "重复图片",
+    "styles": "重复样式",
+    "comments": "注释",
+    "whitespace": "空白",
+}
+
+
+def _segments(html: str):
+    """
+    [(kind, text)] covering the document: kind is "html" for markup, or the tag
+    name for a protected element, whose text is (open tag, body, close tag).
+    """
+    out = []
+    pos = 0
+    for m in _PROTECTED_RE.finditer(html):
+        out.append(("html", html[pos:m.start()]))
+        out.append((m.group(2).lower(), (m.group(1), m.group(3), m.group(4))))
+        pos = m.end()
+    out.append(("html", html[pos:]))
+    return out
+
+
+def _join(segments) -> str:
+    return "".join(text if kind == "html" else "".join(text) for kind, text in segments)
+
+
+def _map_html(html: str, fn) -> str:
+    """Apply fn to the markup outside protected elements only."""
+    return _join([(kind, fn(text) if kind == "html" else text) for kind, text in _segments(html)])
+
+
+def _add_head_style(html: str, css: str) -> str:
+    if not css:
+        return html
+    block = f"<style>{css}</style>"
+    at = html.find("</head>")
+    return html[:at] + block + html[at:] if at != -1 else block + html
+
+
+def _add_class(tag: str, name: str) -> str:
+    m = _CLASS_ATTR_RE.search(tag)
+    if m:
+        return tag[:m.start(1)] + f"{m.group(1)} {name}".strip() + tag[m.end(1):]
+    end = len(tag) - (2 if tag.endswith("/>") else 1)
+    return tag[:end] + f' class="{name}"' + tag[end:]
+
+
+def dedupe_data_uris(html: str) -> str:
+    """
+    A data URI used more than once (the avatar is on pages 1 and 2) is kept once in a
+    CSS custom property. <img> tags become background boxes of the same size, other
+    url(...) uses refer to the property.
+    """
+    counts: dict[str, int] = {}
+    for kind, text in _segments(html):
+        if kind == "html":
+            for uri in _DATA_URI_RE.findall(text):
+                counts[uri] = counts.get(uri, 0) + 1
+    repeated = {uri: n for n, uri in enumerate(u for u, c in counts.items() if c > 1)}
+    if not repeated:
+        return html
+
+    fits_used: dict[int, set[str]] = {}
+
+    def img(m):
+        attrs = dict(_ATTR_RE.findall(m.group(1)))
+        n = repeated.get(attrs.get("src"))
+        if n is None:
+            return m.group(0)
+        classes = attrs.pop("class", "").split()
+        fit = next((_IMG_FITS[c] for c in classes if c in _IMG_FITS), "100% 100%")
+        fits_used.setdefault(n, set()).add(fit)
+        attrs.pop("src")
+        alt = attrs.pop("alt", "")
+        extra = "".join(f' {k}="{v}"' for k, v in attrs.items())
+        label = f' aria-label="{alt}"' if alt else ""
+        cls = " ".join(classes + [f"ta-uri-{n}", f"ta-fit-{fit.split()[0].rstrip('%')}"])
+        return f'<div role="img"{label} class="{cls}"{extra}></div>'
+
+    def other(text):
+        for uri, n in repeated.items():
+            for quoted in (f'url("{uri}")', f"url('{uri}')", f"url({uri})", f"url(&quot;{uri}&quot;)"):
+                text = text.replace(quoted, f"var(--ta-uri-{n})")
+        return text
+
+    html = _map_html(html, lambda text: other(_IMG_RE.sub(img, text)))
+    css = ":root{" + ";".join(f"--ta-uri-{n}:url({uri})" for uri, n in repeated.items()) + "}"
+    for n in fits_used:
+        css += f".ta-uri-{n}{{background-image:var(--ta-uri-{n});background-position:center;background-repeat:no-repeat}}"
+    for fit in sorted(set().union(*fits_used.values())):
+        css += f".ta-fit-{fit.split()[0].rstrip('%')}{{background-size:{fit}}}"
+    return _add_head_style(html, css)
+
+
+def dedupe_styles(html: str) -> str:
+    """
+    Drop repeated identical <style> blocks, and turn style="" attributes used more
+    than once into classes. The class declarations are !important so they still win
+    over the template's utility classes, as the inline style did.
+    """
+    seen_blocks = set()
+    segments = []
+    for kind, text in _segments(html):
+        if kind == "style":
+            body = text[1].strip()
+            if body in seen_blocks:
+                continue
+            seen_blocks.add(body)
+        segments.append((kind, text))
+
+    counts: dict[str, int] = {}
+    for kind, text in segments:
+        if kind == "html":
+            for tag in _START_TAG_RE.findall(text):
+                m = _STYLE_ATTR_RE.search(tag)
+                if m and m.group(1).strip() and "url(" not in m.group(1) and "{{" not in m.group(1):
+                    counts[m.group(1)] = counts.get(m.group(1), 0) + 1
+    classes = {}
+    for style, count in counts.items():
+        name = f"ta-s-{len(classes)}"
+        # Worth it when the rule costs less than the attributes it replaces
+        if count > 1 and len(style) * (count - 1) > len(name) * (count + 1) + 16:
+            classes[style] = name
+    if not classes:
+        return _join(segments)
+
+    def tag(m):
+        text = m.group(0)
+        s = _STYLE_ATTR_RE.search(text)
+        if not s or s.group(1) not in classes:
+            return text
+        return _add_class(text[:s.start()] + text[s.end():], classes[s.group(1)])
+
+    html = _join([(kind, _START_TAG_RE.sub(tag, text) if kind == "html" else text) for kind, text in segments])
+    css = ""
+    for style, name in classes.items():
+        decls = [d.strip() for d in style.split(";") if d.strip()]
+        css += f".{name}{{" + ";".join(d if "!important" in d else d + " !important" for d in decls) + "}"
+    return _add_head_style(html, css)
+
+
+def _script_lines(body: str, strip_comments: bool, strip_indent: bool) -> str:
+    """Line-wise cleanup of inline JS that leaves template literals untouched."""
+    out = []
+    in_literal = False
+    for line in body.split("\n"):
+        if not in_literal:
+            stripped = line.strip()
+            if strip_comments and stripped.startswith("//"):
+                continue
+            if strip_indent:
+                if not stripped:
+                    continue
+                line = stripped
+        out.append(line)
+        if (line.count("`") - line.count("\\`")) % 2:
+            in_literal = not in_literal
+    return "\n".join(out)
+
+
+def strip_comments(html: str) -> str:
+    segments = []
+    for kind, text in _segments(html):
+        if kind == "html":
+            text = _COMMENT_RE.sub("", text)
+        elif kind == "style":
+            text = (text[0], _CSS_COMMENT_RE.sub("", text[1]), text[2])
+        elif kind == "script":
+            text = (text[0], _script_lines(text[1], strip_comments=True, strip_indent=False), text[2])
+        segments.append((kind, text))
+    return _join(segments)
+
+
+def _gap(m) -> str:
+    return ">\n<" if "\n" in m.group(0) else "> <"
+
+
+def collapse_whitespace(html: str) -> str:
+    segments = []
+    for kind, text in _segments(html):
+        if kind == "html":
+            # Whitespace between tags renders as at most one space, so one character is kept.
+            # Protected elements start with "<" and end with ">", so the segment edges count too.
+            if text and not text.strip():
+                text = "\n" if "\n" in text else " "
+            text = _GAP_RE.sub(_gap, text)
+            text = _EDGE_END_RE.sub(lambda m: ">" + _gap(m)[1:-1], text)
+            text = _EDGE_START_RE.sub(lambda m: _gap(m)[1:-1] + "<", text)
+        elif kind == "style":
+            text = (text[0], _CSS_SPACE_RE.sub(r"\1", " ".join(text[1].split())), text[2])
+        elif kind == "script":
+            text = (text[0], _script_lines(text[1], strip_comments=False, strip_indent=True), text[2])
+        segments.append((kind, text))
+    return _join(segments).strip() + "\n"
+
+
+STEPS = [
+    ("data_uris", dedupe_data_uris),
+    ("styles", dedupe_styles),
+    ("comments", strip_comments),
+    ("whitespace", collapse_whitespace),
+]
+
+
+def optimize(html: str, steps=STEPS) -> tuple[str, dict]:
+    """The optimized document and a size report {"before", "after", "steps": {name: bytes saved}}."""
+    before = size = len(html.encode("utf-8"))
+    saved = {}
+    for name, step in steps:
+        html = step(html)
+        new_size = len(html.encode("utf-8"))
+        saved[name] = size - new_size
+        size = new_size
+    return html, {"before": before, "after": size, "steps": saved}
+
+
+def format_report(report: dict) -> str:
+    before, after = report["before"], report["after"]
+    ratio = (before - after) / before if before else 0.0
+    parts = "，".join(f"{STEP_LABELS.get(name, name)} -{saved / 1024:.1f} KB" for name, saved in report["steps"].items() if saved)
+    return f"{before / 1024:.1f} KB → {after / 1024:.1f} KB (-{ratio:.0%})" + (f"：{parts}" if parts else "")
+
+
+def html_paths(targets) -> list[str]:
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths += sorted(glob.glob(os.path.join(target, "**", "*.html"), recursive=True))
+        else:
+            paths.append(target)
+    return paths
+
+
+if __name__ == "__main__":
+    default_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", help=f"HTML files or directories (default: {default_dir})")
+    parser.add_argument("--write", action="store_true", help="Rewrite the files in place (default: only report sizes)")
+    parser.add_argument("--json", action="store_true", help="Print the per-file reports as JSON")
+    args = parser.parse_args()
+
+    paths = html_paths(args.paths or [default_dir])
+    if not paths:
+        sys.exit("没有找到 HTML 文件。")
+    started = time.perf_counter()
+    reports = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        optimized, report = optimize(html)
+        reports[path] = report
+        if args.write and report["after"] < report["before"]:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(optimized)
+        if not args.json:
+            print(f"{path}: {format_report(report)}")
+
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    else:
+        total = {
+            "before": sum(r["before"] for r in reports.values()),
+            "after": sum(r["after"] for r in reports.values()),
+            "steps": {name: sum(r["steps"][name] for r in reports.values()) for name, _ in STEPS},
+        }
+        print(f"共 {len(paths)} 个文件{'（已写回）' if args.write else ''}: {format_report(total)}，用时 {time.perf_counter() - started:.2f}s")
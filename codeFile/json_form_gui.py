@@ -4,7 +4,6 @@ import sys
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox, filedialog
-import subprocess
 import threading
 import time
 
@@ -14,62 +13,20 @@ except ImportError:
     sys.path.append(os.path.dirname(__file__))
     import json_to_html
 
-CARDS_DIR = ""  # Will be set dynamically
-EDGE_PATH = ""  # Will be set dynamically
-
-def find_browser_path():
-    """Finds a suitable Chromium-based browser (Edge or Chrome)."""
-    possible_paths = [
-        # Edge
-        r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
-        r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
-        os.path.expanduser(r"~\AppData\Local\Microsoft\Edge\Application\msedge.exe"),
-        # Chrome
-        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-        os.path.expanduser(r"~\AppData\Local\Google\Chrome\Application\chrome.exe"),
-    ]
-    
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-            
-    # Try finding in PATH
-    import shutil
-    for binary in ["msedge", "chrome", "google-chrome"]:
-        path = shutil.which(binary)
-        if path:
-            return path
-            
-    return None
-
-BROWSER_PATH = find_browser_path()
-
-# Determine paths based on run environment (Frozen/Dev)
-if getattr(sys, 'frozen', False):
-    # Running as compiled exe
-    # APP_DIR is e:\三角Allin\TrianglgAgency_charCreater\release
-    APP_DIR = os.path.dirname(sys.executable)
-    
-    # Project root is one level up from release
-    PROJECT_ROOT = os.path.dirname(APP_DIR)
-    
-    # Try to use external ARC_setting first for user customizability
-    external_setting = os.path.join(PROJECT_ROOT, "ARC_setting")
-    if os.path.exists(os.path.join(external_setting, "Anomaly.json")):
-        SETTING_DIR = external_setting
-    else:
-        # Fallback to bundled resources if external files are missing
-        SETTING_DIR = os.path.join(sys._MEIPASS, "ARC_setting")
-    
-    CARDS_DIR = os.path.join(PROJECT_ROOT, "output")
-else:
-    # Running as script
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__)) 
-    PROJECT_ROOT = os.path.dirname(BASE_DIR) 
-    
-    SETTING_DIR = os.path.join(PROJECT_ROOT, "ARC_setting")
-    CARDS_DIR = os.path.join(PROJECT_ROOT, "output")
+import arc_catalog
+import dice_odds
+import pipeline_trace
+import stat_rules
+import text_fit
+import theme_registry
+import thumbnail_cache
+from pdf_export import html_to_pdf
+from pipeline_trace import span
+
+# Paths are resolved once (Frozen/Dev) in arc_catalog
+PROJECT_ROOT = arc_catalog.PROJECT_ROOT
+SETTING_DIR = arc_catalog.SETTING_DIR
+CARDS_DIR = os.path.join(PROJECT_ROOT, "output")
 
 ANOMALY_PATH = os.path.join(SETTING_DIR, "Anomaly.json")
 COMPETENCY_PATH = os.path.join(SETTING_DIR, "Competency.json")
@@ -96,40 +53,6 @@ def get_absolute_path(path):
     return path
 
 
-def safe_filename_part(value: str, fallback: str, max_len: int = 50) -> str:
-    v = (value or "").strip() or fallback
-    v = "".join("_" if (c in '<>:"/\\|?*' or ord(c) < 32) else c for c in v)
-    v = "_".join(v.split())
-    v = v.strip("._ ")
-    if not v:
-        v = fallback
-    return v[:max_len]
-
-def html_to_pdf(html_path: str, pdf_path: str):
-    """
-    Convert HTML to PDF using a Chromium-based browser (Edge or Chrome) in headless mode.
-    """
-    if not BROWSER_PATH or not os.path.exists(BROWSER_PATH):
-        raise FileNotFoundError(f"No compatible browser (Edge/Chrome) found. Please install one.")
-
-    # Browser arguments for headless printing
-    # Note: Paths must be absolute.
-    cmd = [
-        BROWSER_PATH,
-        "--headless",
-        "--disable-gpu",
-        f"--print-to-pdf={pdf_path}",
-        html_path
-    ]
-    
-    # Run the command
-    try:
-        # Browser might print logs to stderr/stdout, we capture them to keep console clean
-        subprocess.run(cmd, check=True, capture_output=True)
-    except subprocess.CalledProcessError as e:
-        print(f"PDF conversion failed: {e.stderr.decode()}")
-        raise e
-
 def main():
     # Setup main window
     root = tk.Tk()
@@ -138,58 +61,28 @@ def main():
     # Use a wider window
     root.geometry("900x700")
 
-    try:
-        with open(ANOMALY_PATH, "r", encoding="utf-8") as f:
-            anomaly_data = json.load(f)
-        anomaly_titles: list[str] = []
-        for key, value in anomaly_data.items():
-            if isinstance(value, list):
-                anomaly_titles.append(str(key))
-    except Exception:
-        anomaly_titles = []
+    catalog = arc_catalog.load_catalog(SETTING_DIR)
 
-    try:
-        with open(COMPETENCY_PATH, "r", encoding="utf-8") as f:
-            reality_raw = json.load(f)
-        reality_roles: dict[str, dict] = {}
-        for name, arr in reality_raw.items():
-            if isinstance(arr, list) and arr:
-                first = arr[0]
-                if not isinstance(first, dict):
-                    continue
-                main = first.get("MAIN") or ""
-                main_desc = first.get("MAIN_description") or ""
-                pa = first.get("permitted_actions")
-                permitted: list[str] = []
-                if isinstance(pa, dict):
-                    lst = pa.get("list")
-                    if isinstance(lst, list):
-                        for item in lst:
-                            if isinstance(item, str) and item:
-                                permitted.append(item)
-                reality_roles[str(name)] = {
-                    "main": str(main),
-                    "main_desc": str(main_desc),
-                    "permitted": permitted,
-                }
-        reality_names = list(reality_roles.keys())
-    except Exception:
-        reality_roles = {}
-        reality_names: list[str] = []
+    # Every theme is compiled in the background while the window is built
+    themes = theme_registry.default_registry()
+    themes.warm()
+    theme_labels: dict[str, str] = dict(themes.labels())
+    theme_ids: dict[str, str] = {label: theme_id for theme_id, label in theme_labels.items()}
 
-    try:
-        with open(REALITY_PATH, "r", encoding="utf-8") as f:
-            competency_data = json.load(f)
-        competency_types: dict[str, list[str]] = {}
-        for name, cfg in competency_data.items():
-            if isinstance(cfg, dict):
-                types = cfg.get("类型")
-                if isinstance(types, list) and types:
-                    competency_types[str(name)] = [str(t) for t in types if t]
-        competency_names = list(competency_types.keys())
-    except Exception:
-        competency_types = {}
-        competency_names: list[str] = []
+    # Card previews for the library window, rendered off the Tk thread
+    thumbs = thumbnail_cache.ThumbnailWorker()
+
+    anomaly_data = catalog["anomaly"]
+    anomaly_titles: list[str] = list(anomaly_data.keys())
+
+    reality_roles: dict[str, dict] = catalog["competency"]
+    reality_names: list[str] = list(reality_roles.keys())
+
+    competency_data = catalog["reality"]
+    competency_types: dict[str, list[str]] = {
+        name: cfg["types"] for name, cfg in competency_data.items() if cfg["types"]
+    }
+    competency_names: list[str] = list(competency_types.keys())
 
     container = tk.Frame(root)
     container.pack(fill="both", expand=True)
@@ -236,23 +129,10 @@ def main():
 
     tab1 = create_tab("基础属性内容")
     tab2 = create_tab("角色详细内容")
+    tab3 = create_tab("入职问答")
     
     pages = [tab1, tab2]
 
-    STAT_MAX_FIELDS = [
-        "专注MAX",
-        "欺瞒MAX",
-        "活力MAX",
-        "共情MAX",
-        "主动MAX",
-        "坚毅MAX",
-        "气场MAX",
-        "专业MAX",
-        "诡秘MAX",
-    ]
-
-    STAT_NAMES = ["专注", "欺瞒", "活力", "共情", "主动", "坚毅", "气场", "专业", "诡秘"]
-
     form_config = [
         # (Key, Label, Type, PageIndex)
         ("姓名", "姓名", "entry", 0),
@@ -281,6 +161,9 @@ def main():
         ("许可行为2", "许可行为2", "entry", 1),
         ("许可行为3", "许可行为3", "entry", 1),
         ("许可行为4", "许可行为4", "entry", 1),
+        ("许可行为奖励", "许可行为奖励", "text", 1),
+        ("初始物品", "初始物品", "text", 1),
+        ("职能格言", "职能格言", "entry", 1),
         ("问题1", "1 你是如何与你的异常体接触的？", "text", 1),
         ("问题2", "2 机构是如何找到你的？", "text", 1),
         ("问题3", "3 你的能力有独特的外在视觉表现吗？", "text", 1),
@@ -290,6 +173,7 @@ def main():
         ("问题7", "7 协作中你能做出什么贡献？", "text", 1),
         ("补充说明", "补充说明", "text", 1),
 
+        ("主题", "主题", "theme_select", 0),
         ("能力1资质", "能力1资质", "stat_select", 0),
         ("能力2资质", "能力2资质", "stat_select", 0),
         ("能力3资质", "能力3资质", "stat_select", 0),
@@ -302,49 +186,104 @@ def main():
     widgets: dict[str, object] = {}
     setting_from_data = False
 
+    # The *MAX stats follow from the competency / anomaly answers (see stat_rules.py).
+    # Entries still holding the last derived value are kept in sync; hand-edited
+    # ones that disagree get a warning next to them.
+    rules = stat_rules.rules_for(catalog)
+    stat_state = stat_rules.StatState(rules)
+    auto_stats: dict[str, str] = {field: "0" for field in stat_rules.STAT_FIELDS}
+    stat_flags: dict[str, tk.Label] = {}
+    answer_vars: dict[str, list[tk.IntVar]] = {kind: [] for kind in stat_rules.SOURCES}
+    question_frames: dict[str, tk.LabelFrame] = {}
+    for kind, (_, answer_field) in stat_rules.SOURCES.items():
+        frame = tk.LabelFrame(tab3, text=answer_field, padx=10, pady=6)
+        frame.pack(fill="x", padx=10, pady=6, anchor="nw")
+        question_frames[kind] = frame
+
+    def check_stats(*_):
+        derived = stat_state.fields()
+        answered = bool(stat_state.chosen)
+        for field, flag in stat_flags.items():
+            value = widgets[field].get().strip() or "0"
+            if answered and value != derived[field]:
+                flag.config(text=f"≠ 问答推导 {derived[field]}")
+            else:
+                flag.config(text="")
+
+    def sync_stats():
+        for field, value in stat_state.fields().items():
+            e = widgets.get(field)
+            if isinstance(e, tk.Entry) and (e.get().strip() or "0") == auto_stats[field]:
+                e.delete(0, "end")
+                e.insert(0, value)
+                auto_stats[field] = value
+        check_stats()
+        update_odds()
+
+    def on_stat_edit(*_):
+        check_stats()
+        update_odds()
+
+    def on_answer(kind, question, var):
+        stat_state.select(kind, question, var.get())
+        sync_stats()
+
+    def build_questions(kind: str, key: str, questions: list):
+        frame = question_frames[kind]
+        for child in frame.winfo_children():
+            child.destroy()
+        stat_state.reset(kind, key)
+        answer_vars[kind] = []
+        for q_idx, q in enumerate(questions):
+            tk.Label(frame, text=f"{q_idx+1}. {q.get('question', '')}", anchor="w", justify="left", wraplength=760).pack(fill="x", pady=(6, 0))
+            var = tk.IntVar(frame, value=-1)
+            for o_idx, opt in enumerate(q.get("options", [])):
+                tk.Radiobutton(
+                    frame, text=f"{opt.get('answer', '')}（{opt.get('code', '')}）", variable=var, value=o_idx, anchor="w",
+                    command=lambda k=kind, i=q_idx, v=var: on_answer(k, i, v)
+                ).pack(fill="x", padx=20)
+            answer_vars[kind].append(var)
+        if not setting_from_data:
+            sync_stats()
+
+    def build_role_questions(name: str):
+        cfg = reality_roles.get(name) or {}
+        build_questions("competency", name, cfg.get("interactions") or [])
+
     # ... (helper functions fill_reality_details_from_competency, fill_role_details_from_reality unchanged) ...
 
+    # Text that will not fit its box on the printed card is flagged while typing (see text_fit.py)
+    fit_flags: dict[str, tk.Label] = {}
+
+    def widget_text(w) -> str:
+        if isinstance(w, tk.Text):
+            return w.get("1.0", "end-1c")
+        if isinstance(w, tk.Entry):
+            return w.get()
+        return ""
+
+    def check_fit(key: str):
+        # Fields of a page section share its space, so one edit can shrink all of them
+        group = text_fit.SLOTS[key].get("group")
+        keys = [k for k in fit_flags if text_fit.SLOTS[k].get("group") == group] if group else [key]
+        fits = text_fit.fit_card({k: widget_text(widgets.get(k)) for k in keys})
+        for k in keys:
+            fit = fits.get(k)
+            fit_flags[k].config(
+                text=text_fit.describe(fit),
+                fg="#b91c1c" if fit and fit["overflow"] else "#b45309",
+            )
+
+    def check_fits():
+        for key in fit_flags:
+            check_fit(key)
+
     def fill_reality_details_from_competency(name: str):
         cfg = competency_data.get(name)
         if not isinstance(cfg, dict):
             return
-        triggers_text = ""
-        overload_text = ""
-        triggers = cfg.get("现实触发器")
-        if isinstance(triggers, list):
-            parts = []
-            for item in triggers:
-                if not isinstance(item, dict):
-                    continue
-                lines = []
-                title = item.get("title")
-                if isinstance(title, str) and title:
-                    lines.append(title)
-                desc = item.get("description")
-                if isinstance(desc, str) and desc:
-                    lines.append(desc)
-                mech = item.get("mechanics")
-                if isinstance(mech, str) and mech:
-                    lines.append(mech)
-                if lines:
-                    parts.append("\n".join(lines))
-            triggers_text = "\n\n".join(parts)
-        overloads = cfg.get("过载解除")
-        if isinstance(overloads, list):
-            parts = []
-            for item in overloads:
-                if not isinstance(item, dict):
-                    continue
-                lines = []
-                title = item.get("title")
-                if isinstance(title, str) and title:
-                    lines.append(title)
-                desc = item.get("description")
-                if isinstance(desc, str) and desc:
-                    lines.append(desc)
-                if lines:
-                    parts.append("\n".join(lines))
-            overload_text = "\n\n".join(parts)
+        triggers_text = cfg.get("triggers_text", "")
+        overload_text = cfg.get("overload_text", "")
         trig_widget = widgets.get("现实触发器")
         if isinstance(trig_widget, tk.Text):
             trig_widget.delete("1.0", "end")
@@ -353,32 +292,23 @@ def main():
         if isinstance(overload_widget, tk.Text):
             overload_widget.delete("1.0", "end")
             overload_widget.insert("1.0", overload_text)
+        check_fits()
 
     def fill_role_details_from_reality(name: str):
         cfg = reality_roles.get(name)
         if not isinstance(cfg, dict):
             return
-        main = cfg.get("main", "") or ""
-        main_desc = cfg.get("main_desc", "") or ""
-        if main and main_desc:
-            main_text = f"{main}：{main_desc}"
-        else:
-            main_text = main or main_desc
-        main_widget = widgets.get("首要指令")
-        if isinstance(main_widget, tk.Text):
-            main_widget.delete("1.0", "end")
-            main_widget.insert("1.0", main_text)
-        permitted = cfg.get("permitted") or []
-        if not isinstance(permitted, list):
-            permitted = []
-        for i in range(4):
-            label = f"许可行为{i+1}"
-            w = widgets.get(label)
-            value = permitted[i] if i < len(permitted) else ""
-            if isinstance(w, tk.Entry):
+        # cfg["fields"] is computed once per catalog load by arc_catalog
+        for key, value in cfg.get("fields", {}).items():
+            w = widgets.get(key)
+            if isinstance(w, tk.Text):
+                w.delete("1.0", "end")
+                w.insert("1.0", value)
+            elif isinstance(w, tk.Entry):
                 w.delete(0, "end")
                 if value:
                     w.insert(0, value)
+        check_fits()
 
     def fill_anomaly_abilities(anomaly_key: str):
         # anomaly_data = { "Category": [ {ability1}, {ability2}, ... ], ... }
@@ -389,53 +319,34 @@ def main():
         if not isinstance(abilities, list):
             return
 
-        # Prepare data structure for abilities
-        # We need to store this data so gather_data can pick it up.
-        # Since the UI doesn't have explicit fields for abilities, we'll store them in a hidden way
-        # or we should probably add them to the data dict directly in gather_data.
-        # But wait, gather_data reads from widgets.
-        # So we need to store the abilities data somewhere accessible.
-        # Let's attach it to the root or a global variable.
-        # Better yet, let's update a global 'current_abilities_data' variable.
-        
+        # gather_data reads from widgets, so the ability records (already normalized
+        # by arc_catalog) are kept in 'current_abilities_data' for it to pick up.
         nonlocal current_abilities_data
-        current_abilities_data = []
-
-        for item in abilities:
-            if not isinstance(item, dict):
-                continue
-            
-            ability_info = {
-                "title": item.get("title", ""),
-                "trigger": item.get("description", ""), # Trigger is the description usually? Or part of it. The JSON has description which seems to be the trigger text.
-                # Actually, looking at template.html, card 3 has:
-                # <div>能力</div> (Title)
-                # <div>触发器</div> (Trigger)
-                # <div>资质</div> (Stat/Dice?)
-                
-                # In JSON: "description": "他们似乎永远不知道你在哪里... 并掷欺瞒。"
-                # The description includes the trigger and the dice roll.
-                
-                "success": item.get("outcomes", {}).get("success", ""),
-                "failure": item.get("outcomes", {}).get("failure", ""),
-                "special": item.get("outcomes", {}).get("specially", ""),
-                
-                "question": item.get("interactions", {}).get("question", ""),
-                "options": []
-            }
-            
-            opts = item.get("interactions", {}).get("options", [])
-            for opt in opts:
-                ability_info["options"].append({
-                    "answer": opt.get("answer", ""),
-                    "code": opt.get("code", "")
-                })
-                
-            current_abilities_data.append(ability_info)
+        current_abilities_data = [dict(item) for item in abilities if isinstance(item, dict)]
+        update_odds()
+        build_questions("anomaly", anomaly_key, current_abilities_data)
 
     # Global variable to hold current abilities data
     current_abilities_data = []
 
+    # Live dice odds next to each '能力N资质' selector (hidden without NumPy)
+    show_odds = dice_odds.numpy_available()
+    odds_labels: dict[str, tk.Label] = {}
+
+    def update_odds(*_):
+        for i in range(3):
+            stat_key = f"能力{i+1}资质"
+            label = odds_labels.get(stat_key)
+            if label is None:
+                continue
+            if i >= len(current_abilities_data):
+                label.config(text="")
+                continue
+            stat = widgets[stat_key].get().strip()
+            qa_widget = widgets.get(f"{stat}MAX")
+            qa = dice_odds.stat_value({f"{stat}MAX": qa_widget.get()}, stat) if qa_widget is not None else 0
+            label.config(text="🎲 " + dice_odds.describe_ability(current_abilities_data[i], qa))
+
     # --- UI Layout ---
 
     # 1. Image Selection
@@ -534,6 +445,7 @@ def main():
             job_option.grid(row=row, column=1, sticky="nw", padx=10, pady=6)
 
             def on_job_change(*_):
+                build_role_questions(job_var.get())
                 if setting_from_data:
                     return
                 fill_role_details_from_reality(job_var.get())
@@ -541,21 +453,42 @@ def main():
             job_var.trace_add("write", on_job_change)
             widgets[key] = job_var
         elif kind == "stat_select":
+            stat_frame = tk.Frame(parent)
+            stat_frame.grid(row=row, column=1, sticky="nw", padx=10, pady=6)
             stat_var = tk.StringVar(parent)
-            stat_var.set(STAT_NAMES[0] if STAT_NAMES else "")
-            stat_option = tk.OptionMenu(parent, stat_var, *STAT_NAMES) if STAT_NAMES else tk.OptionMenu(parent, stat_var, "")
-            stat_option.grid(row=row, column=1, sticky="nw", padx=10, pady=6)
+            stat_var.set(stat_rules.STAT_NAMES[0])
+            stat_option = tk.OptionMenu(stat_frame, stat_var, *stat_rules.STAT_NAMES)
+            stat_option.pack(side="left")
+            if show_odds:
+                odds_label = tk.Label(stat_frame, text="", fg="#64748b")
+                odds_label.pack(side="left", padx=8)
+                odds_labels[key] = odds_label
+                stat_var.trace_add("write", update_odds)
             widgets[key] = stat_var
+        elif kind == "theme_select":
+            theme_var = tk.StringVar(parent)
+            theme_var.set(theme_labels[theme_registry.DEFAULT_THEME])
+            tk.OptionMenu(parent, theme_var, *theme_labels.values()).grid(row=row, column=1, sticky="nw", padx=10, pady=6)
+            widgets[key] = theme_var
         elif kind == "entry":
             e = tk.Entry(parent, width=60)
             e.grid(row=row, column=1, sticky="nw", padx=10, pady=6)
-            if key in STAT_MAX_FIELDS:
+            if key in stat_rules.STAT_FIELDS:
                 e.insert(0, "0")
+                e.bind("<KeyRelease>", on_stat_edit)
+                flag = tk.Label(parent, text="", fg="#b91c1c")
+                flag.grid(row=row, column=2, sticky="nw", pady=6)
+                stat_flags[key] = flag
             widgets[key] = e
         else:
             t = tk.Text(parent, width=60, height=4)
             t.grid(row=row, column=1, sticky="nw", padx=10, pady=6)
             widgets[key] = t
+        if key in text_fit.SLOTS:
+            flag = tk.Label(parent, text="", fg="#b45309", anchor="w", justify="left")
+            flag.grid(row=row, column=2, sticky="nw", pady=6)
+            fit_flags[key] = flag
+            widgets[key].bind("<KeyRelease>", lambda _e, k=key: check_fit(k), add="+")
 
     if anomaly_titles:
         fill_anomaly_abilities(anomaly_titles[0])
@@ -563,6 +496,7 @@ def main():
         fill_reality_details_from_competency(competency_names[0])
     if reality_names:
         fill_role_details_from_reality(reality_names[0])
+        build_role_questions(reality_names[0])
 
     # --- Logic Functions ---
 
@@ -595,6 +529,8 @@ def main():
                     value = w.get().strip()
                 else:
                     value = str(w.get()).strip()
+            elif kind == "theme_select":
+                value = theme_ids.get(w.get(), "")
             elif kind == "entry":
                 value = w.get().strip()
             else:
@@ -613,6 +549,10 @@ def main():
                     new_ab["stat"] = data[stat_key]
                 output_abilities.append(new_ab)
             data["abilities"] = output_abilities
+
+        for kind, (_, answer_field) in stat_rules.SOURCES.items():
+            if answer_vars[kind]:
+                data[answer_field] = [v.get() if v.get() >= 0 else None for v in answer_vars[kind]]
             
         return data
 
@@ -670,14 +610,30 @@ def main():
                             w.set(val)
                         elif reality_names:
                             w.set(reality_names[0])
+                elif kind == "stat_select":
+                    if val:
+                        w.set(val)
+                elif kind == "theme_select":
+                    w.set(theme_labels[themes.resolve(data)])
                 elif kind == "entry":
                     w.delete(0, "end")
                     w.insert(0, val)
                 else:
                     w.delete("1.0", "end")
                     w.insert("1.0", val)
+
+            for kind, (_, answer_field) in stat_rules.SOURCES.items():
+                answers = data.get(answer_field) or []
+                for q_idx, var in enumerate(answer_vars[kind]):
+                    option = answers[q_idx] if q_idx < len(answers) and answers[q_idx] is not None else -1
+                    var.set(option)
+                    stat_state.select(kind, q_idx, option)
+            auto_stats.update(stat_state.fields())
         finally:
             setting_from_data = False
+        check_stats()
+        update_odds()
+        check_fits()
 
     def validate_data(data):
         if not data.get("姓名"):
@@ -688,10 +644,16 @@ def main():
             return False
         return True
 
+    # Seconds each save stage took last time, to split the progress bar by
+    stage_seconds: dict[str, float] = {}
+
     def save_and_generate():
         data = gather_data()
         if not validate_data(data):
             return
+        problems = stat_rules.audit_card(data, rules)
+        if problems:
+            print("资质与问答推导不一致: " + ", ".join(f"{field} {entered}≠{derived}" for field, entered, derived in problems))
 
         # Progress Window
         progress_win = tk.Toplevel(root)
@@ -718,7 +680,7 @@ def main():
         pb["value"] = 0
         
         # Determine paths (Main thread)
-        name = safe_filename_part(data.get("姓名", ""), "Unnamed")
+        name = arc_catalog.safe_filename_part(data.get("姓名", ""), "Unnamed")
         card_dir = os.path.join(CARDS_DIR, name)
         os.makedirs(card_dir, exist_ok=True)
         base_path = os.path.join(card_dir, name)
@@ -741,26 +703,41 @@ def main():
                 progress_win.destroy()
             messagebox.showerror("错误", f"处理失败：\n{err_msg}")
 
+        def write_json():
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+            with span("json_write", bytes=text):
+                with open(json_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+
+        stages = [
+            ("JSON", "正在保存 JSON 数据 (Saving JSON)...", write_json),
+            ("HTML", "正在生成 HTML 档案 (Generating HTML)...", lambda: json_to_html.generate_html(json_path, html_path)),
+            ("PDF", "正在渲染 PDF (Rendering PDF)...", lambda: html_to_pdf(html_path, pdf_path)),
+        ]
+
         def task():
             try:
-                # Step 1
-                root.after(0, lambda: update_progress(10, "正在保存 JSON 数据 (Saving JSON)..."))
-                time.sleep(0.2) 
-                with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                
-                # Step 2
-                root.after(0, lambda: update_progress(40, "正在生成 HTML 档案 (Generating HTML)..."))
-                time.sleep(0.2)
-                json_to_html.generate_html(json_path, html_path)
-                
-                # Step 3
-                root.after(0, lambda: update_progress(70, "正在渲染 PDF (Rendering PDF)..."))
-                html_to_pdf(html_path, pdf_path)
+                # Each stage gets the share of the bar it took last time (equal shares on the first save)
+                weights = [max(stage_seconds.get(key, 1.0), 0.001) for key, _, _ in stages]
+                total = sum(weights)
+                done = 0.0
+                timings = []
+                for (key, text, run), weight in zip(stages, weights):
+                    root.after(0, lambda v=100 * done / total, t=text: update_progress(v, t))
+                    t0 = time.perf_counter()
+                    run()
+                    timings.append((key, time.perf_counter() - t0))
+                    done += weight
+                stage_seconds.update(timings)
+                print("耗时: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings))
+                if pipeline_trace.enabled():
+                    print(f"Trace: {pipeline_trace.trace_path()}")
                 
+                # The library shows the new card without waiting for its preview
+                thumbs.request(json_path)
+
                 # Done
                 root.after(0, lambda: update_progress(100, "完成！ (Done!)"))
-                time.sleep(0.5)
                 root.after(0, finish_success)
                 
             except Exception as e:
@@ -776,7 +753,9 @@ def main():
         )
         if not path:
             return
-            
+        open_card(path)
+
+    def open_card(path):
         try:
             with open(path, "r", encoding="utf-8") as f:
                 data = json.load(f)
@@ -786,11 +765,72 @@ def main():
         except Exception as e:
             messagebox.showerror("读取失败", f"无法读取文件：\n{str(e)}")
 
+    def open_library():
+        """Every saved card with a preview of its first page; click one to open it."""
+        win = tk.Toplevel(root)
+        win.title("角色库 (Library)")
+        win.geometry("860x600")
+        win.transient(root)
+
+        canvas = tk.Canvas(win, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(win, orient="vertical", command=canvas.yview)
+        grid = tk.Frame(canvas)
+        grid.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.create_window((0, 0), window=grid, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        win.bind("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
+
+        paths = thumbnail_cache.card_paths(CARDS_DIR)
+        if not paths:
+            tk.Label(grid, text="output/ 下还没有角色卡").pack(padx=20, pady=20)
+            return
+
+        width = thumbs.cache.width
+        # Blank image of the preview size, so the grid does not jump as thumbnails arrive
+        placeholder = tk.PhotoImage(width=width, height=round(width * 1.414))
+        images = {"": placeholder}
+        pending = []
+
+        def choose(path):
+            win.destroy()
+            open_card(path)
+
+        for i, path in enumerate(paths):
+            cell = tk.Frame(grid, bd=1, relief="groove")
+            cell.grid(row=i // 4, column=i % 4, padx=6, pady=6, sticky="n")
+            preview = tk.Label(cell, image=placeholder, text="生成预览…", compound="center", cursor="hand2")
+            preview.pack(padx=4, pady=(4, 0))
+            name = os.path.splitext(os.path.basename(path))[0]
+            tk.Label(cell, text=name, wraplength=width).pack(pady=(2, 4))
+            for widget in (cell, preview):
+                widget.bind("<Button-1>", lambda e, p=path: choose(p))
+
+            def show(png_path, label=preview, key=path):
+                if not label.winfo_exists():
+                    return
+                if not png_path:
+                    label.config(text="无预览")
+                    return
+                images[key] = tk.PhotoImage(file=png_path)
+                label.config(image=images[key], text="")
+
+            pending.append(thumbs.request(path, lambda _p, png, show=show: root.after(0, lambda: show(png))))
+
+        def on_close(event):
+            if event.widget is win:
+                for future in pending:
+                    future.cancel()
+                thumbs.cache.flush()
+        win.bind("<Destroy>", on_close)
+
     # --- Buttons ---
     btn_frame = tk.Frame(container)
     btn_frame.pack(side="bottom", fill="x", pady=10, padx=10)
     
     tk.Button(btn_frame, text="📂 打开 (Load)", command=load_card, width=15, height=2).pack(side="left", padx=10)
+    tk.Button(btn_frame, text="🗂 角色库 (Library)", command=open_library, width=15, height=2).pack(side="left", padx=10)
     tk.Button(btn_frame, text="💾 保存并生成 (Save & Sync)", command=save_and_generate, width=25, height=2, bg="#dddddd").pack(side="left", padx=10)
     tk.Button(btn_frame, text="退出 (Exit)", command=root.destroy, width=15, height=2).pack(side="left", padx=10)
 
@@ -826,7 +866,25 @@ def main():
 
     print("系统已启动。等待操作...")
 
-    root.mainloop()
+    if os.environ.get("TA_EXIT_AFTER_FIRST_PAINT"):
+        # Used by bench_pipeline.py to time startup to first paint
+        def _first_paint():
+            root.update_idletasks()
+            sys.__stdout__.write("FIRST_PAINT\n")
+            sys.__stdout__.flush()
+            root.destroy()
+        root.after(0, _first_paint)
+
+    try:
+        root.mainloop()
+    finally:
+        # Every way out (Exit, closing the window) ends the main loop; stop the preview threads
+        thumbs.close()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    pipeline_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    pipeline_trace.enable_from_args(args)
     main()
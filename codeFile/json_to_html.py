@@ -1,10 +1,20 @@
 import argparse
 import base64
+import functools
 import json
 import os
+import re
 import sys
+import threading
 import datetime as _dt
 
+import arc_catalog
+import dice_odds
+import html_optimize
+import pipeline_trace
+import text_fit
+from pipeline_trace import span
+
 if getattr(sys, 'frozen', False):
     # Frozen
     BASE_RESOURCE_DIR = sys._MEIPASS
@@ -29,6 +39,17 @@ def load_template(path):
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
 
+def resolve_image_path(image_path):
+    """The avatar file a card's 图片路径 points at (as given, else relative to PROJECT_ROOT), or None."""
+    if not image_path:
+        return None
+    if os.path.exists(image_path):
+        return image_path
+    p = os.path.join(PROJECT_ROOT, image_path)
+    if os.path.exists(p):
+        return p
+    return None
+
 def get_image_tag(image_path):
     # This logic matches the new template structure (div with class/style)
     # The new template has a container:
@@ -38,19 +59,7 @@ def get_image_tag(image_path):
     # We want to replace the inner content with the image, OR replace the whole div.
     # The template has <!-- AVATAR_PLACEHOLDER --> before the div.
     
-    if not image_path:
-        return None
-        
-    # Resolve path
-    real_path = None
-    if os.path.exists(image_path):
-        real_path = image_path
-    else:
-        # Try relative to PROJECT_ROOT
-        p = os.path.join(PROJECT_ROOT, image_path)
-        if os.path.exists(p):
-            real_path = p
-            
+    real_path = resolve_image_path(image_path)
     if not real_path:
         # Return the default placeholder div (as string) or just empty if we don't replace
         return None 
@@ -76,28 +85,267 @@ def safe_filename(s):
     keep = ("-", "_", ".")
     return "".join(c if c.isalnum() or c in keep else "_" for c in s).strip()
 
-def generate_html(json_path, out_path=None, template_path=DEFAULT_TEMPLATE):
-    data = load_json(json_path)
-    template = load_template(template_path)
-    
-    # 1. Fill standard fields
-    keys = [
-        "姓名", "人称代词", "机构头衔", "机构评级", "异常体", 
-        "现实", "职能", "现实触发器", "过载解除", "首要指令",
-        "许可行为1", "许可行为2", "许可行为3", "许可行为4",
-        "问题0A", "问题0B", "问题1", "问题2", "问题3", "问题4", "问题5", "问题6", "问题7", "补充说明",
-        "专注MAX", "欺瞒MAX", "活力MAX", "共情MAX", "主动MAX",
-        "坚毅MAX", "气场MAX", "专业MAX", "诡秘MAX",
-    ]
-    
-    content = template
-    for k in keys:
-        val = str(data.get(k, ""))
-        content = content.replace(f"{{{{{k}}}}}", val)
+# Template placeholders: the card's fields plus their 字号:<field> styles
+CARD_FIELDS = arc_catalog.CARD_FIELDS + text_fit.STYLE_FIELDS
+
+_PLACEHOLDER_RE = re.compile(r"\{\{(.+?)\}\}")
+
+# The page-3 section of template.html is repeated once per ABILITIES_PER_PAGE abilities.
+# Markers may carry a description after the name: <!-- ABILITY_PAGE_BEGIN: ... -->
+ABILITIES_PER_PAGE = 3
+ABILITY_SLOT = "@ability_pages"
+_MARKER_RES = {
+    name: re.compile(r"<!--\s*" + name + r"\b.*?-->", re.S)
+    for name in ("ABILITY_PAGE_BEGIN", "ABILITY_CARDS_BEGIN", "ABILITY_CARDS_END", "ABILITY_PAGE_END")
+}
+# Templates made before the markers existed
+_LEGACY_CARDS_MARKER = '<!-- 循环 3 次生成能力卡片 (静态写死或之后用脚本) -->'
+
+class CompiledTemplate(tuple):
+    """
+    Even indices are literals, odd indices are field names (or ABILITY_SLOT).
+    `ability_page` is (page start, blank cards, page end) with the start and end
+    compiled the same way, or None if the template has no ability page.
+    """
+    ability_page = None
+
+def _split_ability_page(template):
+    """(before, page start, blank cards, page end, after), or None."""
+    found = {name: regex.search(template) for name, regex in _MARKER_RES.items()}
+    if all(found.values()):
+        # Cut whole marker lines so no stray indentation is left behind
+        cuts = []
+        for name in ("ABILITY_PAGE_BEGIN", "ABILITY_CARDS_BEGIN", "ABILITY_CARDS_END", "ABILITY_PAGE_END"):
+            match = found[name]
+            line_end = template.find("\n", match.end())
+            cuts.append((template.rfind("\n", 0, match.start()) + 1, line_end + 1 if line_end != -1 else len(template)))
+        (pb_start, pb_end), (cb_start, cb_end), (ce_start, ce_end), (pe_start, pe_end) = cuts
+        return (
+            template[:pb_start],
+            template[pb_end:cb_start],
+            template[cb_end:ce_start],
+            template[ce_end:pe_start],
+            template[pe_end:],
+        )
+    marker = template.find(_LEGACY_CARDS_MARKER)
+    if marker == -1:
+        return None
+    # Old layout: the cards run from the marker to the container's closing </div>,
+    # the page wrapper closes right before the page-4 comment.
+    page_start = template.rfind('<div class="page-wrapper page-3', 0, marker)
+    next_page = template.find('<!-- 第四页', marker)
+    if next_page == -1:
+        next_page = len(template)
+    page_close = template.rfind('</div>', 0, next_page)
+    container_close = template.rfind('</div>', 0, page_close)
+    if page_start == -1 or container_close <= marker:
+        return None
+    page_close += len('</div>')
+    return (
+        template[:page_start],
+        template[page_start:marker],
+        template[marker + len(_LEGACY_CARDS_MARKER):container_close],
+        template[container_close:page_close],
+        template[page_close:],
+    )
+
+def _compile_fields(template):
+    parts = []
+    pos = 0
+    for m in _PLACEHOLDER_RE.finditer(template):
+        key = m.group(1)
+        if key not in CARD_FIELDS:
+            continue
+        parts.append(template[pos:m.start()])
+        parts.append(key)
+        pos = m.end()
+    parts.append(template[pos:])
+    # Even indices are literals, odd indices are field names
+    return tuple(parts)
+
+def compile_template(template):
+    """
+    Split a template into literal text and {{field}} slots once, so filling a card
+    is a single join instead of one full-document replace() per field.
+    Placeholders that are not card fields are kept as literal text. The ability
+    page is lifted out as a repeating section with its own slot.
+    """
+    region = _split_ability_page(template)
+    if region is None:
+        return CompiledTemplate(_compile_fields(template))
+    before, page_start, blank_cards, page_end, after = region
+    compiled = CompiledTemplate(_compile_fields(before) + (ABILITY_SLOT,) + _compile_fields(after))
+    compiled.ability_page = (_compile_fields(page_start), blank_cards, _compile_fields(page_end))
+    return compiled
+
+_compiled_cache = {}
+_compiled_lock = threading.Lock()
+
+def get_compiled_template(path=DEFAULT_TEMPLATE):
+    """Load and compile a template, cached in memory until the file changes."""
+    mtime = os.path.getmtime(path)
+    with _compiled_lock:
+        cached = _compiled_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with span("template_load", path=path) as sp:
+        text = load_template(path)
+        compiled = compile_template(text)
+        sp["bytes"] = text
+    with _compiled_lock:
+        _compiled_cache[path] = (mtime, compiled)
+    return compiled
+
+def clear_template_cache():
+    with _compiled_lock:
+        _compiled_cache.clear()
+
+def fill_fields(compiled, data, slots=None):
+    out = list(compiled)
+    for i in range(1, len(out), 2):
+        key = out[i]
+        if slots and key in slots:
+            out[i] = slots[key]
+        else:
+            out[i] = str(data.get(key, ""))
+    return "".join(out)
+
+def odds_line(ab, data):
+    """Dice odds under an ability card header, or "" when NumPy is not installed."""
+    if not dice_odds.numpy_available():
+        return ""
+    stat = ab.get("stat") or dice_odds.parse_roll_stat(ab.get("trigger", "")) or ""
+    text = dice_odds.describe_ability(ab, dice_odds.stat_value(data, stat))
+    return f'''
+            <div style="font-size:10px; color:#64748b; padding:2px 12px;">🎲 {text}</div>'''
+
+ABILITY_CACHE_SIZE = 256
+
+@functools.lru_cache(maxsize=ABILITY_CACHE_SIZE)
+def ability_card_html(title, trigger, success, failure, special, question, options, stat, odds_html):
+    """
+    One page-3 ability card. Memoized on the card's content, so batch and roster
+    builds assemble page 3 from cached fragments; `options` is a tuple of (answer, code).
+    """
+    # Format Options HTML
+    options_html = ""
+    for ans, code in options:
+        options_html += f'''
+                        <div class="qa-row">
+                            答: <input type="text" value="{ans}" readonly style="background:transparent;"> ➔ <div class="square"></div> <div class="square"></div> <div class="square"></div>
+                            <span style="margin-left:5px; font-size:10px; color:#999;">({code})</span>
+                        </div>'''
+
+    return f'''
+        <div class="ability-card">
+            <div class="card-header">
+                <div>{title}</div>
+                <div style="font-size: 10px; font-weight: normal; overflow: hidden; white-space: nowrap; text-overflow: ellipsis;" title="{trigger}"></div>
+                <div style="text-align:right">{stat}</div>
+            </div>{odds_html}
+            <div class="card-body">
+                <div class="success-side">
+                    <div class="success-title">▲ 成功时， <div style="flex-grow:1; border-bottom:1px solid var(--primary-blue); margin-left:10px;"></div></div>
+                    <div class="input-line" style="height:auto; min-height:25px; font-size:11px;">{success}</div>
+
+                    <div style="display:flex; align-items:center; margin-top:20px;">
+                        <span class="icon-star">★</span> 
+                        <div style="background:#e2e8f0; width:80px; height:18px; border-radius:10px; margin-right:10px;"></div>,
+                        <div style="flex-grow:1; border-bottom:1px solid var(--primary-blue); font-size:11px;">{special}</div>
+                    </div>
+                </div>
+
+                <div class="fail-side">
+                    <div class="fail-title">✘ 失败时， <div style="flex-grow:1; border-bottom:1px solid var(--fail-red); margin-left:10px;"></div></div>
+                    <div class="fail-line" style="height:auto; min-height:25px; font-size:11px;">{failure}</div>
+
+                    <div class="qa-section">
+                        <div class="qa-row">
+                            问: <input type="text" value="{question}" readonly style="background:transparent;"> 
+                            <div class="checkbox-group">已练习? <div class="square"></div></div>
+                        </div>
+                        <div style="text-align:right; font-size:11px; margin-bottom:5px;">页码 # ________</div>
+                        {options_html}
+                    </div>
+                </div>
+            </div>
+        </div>'''
+
+def clear_fragment_cache():
+    ability_card_html.cache_clear()
+
+def build_ability_cards(abilities, data=None, fragment=None):
+    """
+    HTML for a run of ability cards. Passing the card data adds a dice-odds line.
+    `fragment`, if given, maps each card's HTML to what is inserted instead (roster.py
+    uses it to store repeated cards once).
+    """
+    abilities_html = []
+    for ab in abilities:
+        # In Anomaly.json: "description": "text... and roll Stat."
+        # We put the whole description in trigger for now.
+        card_html = ability_card_html(
+            ab.get("title", ""),
+            ab.get("trigger", ""),
+            ab.get("success", ""),
+            ab.get("failure", ""),
+            ab.get("special", ""),
+            ab.get("question", ""),
+            tuple((opt.get("answer", ""), opt.get("code", "")) for opt in ab.get("options", [])),
+            ab.get("stat", "资质"),
+            odds_line(ab, data) if data is not None else "",
+        )
+        abilities_html.append(fragment(card_html) if fragment else card_html)
+
+    return "\n".join(abilities_html)
+
+def ability_pages(abilities, data, page, show_odds=False, fragment=None):
+    """One ability page per ABILITIES_PER_PAGE abilities; the template's blank cards if there are none."""
+    page_start, blank_cards, page_end = page
+    start = fill_fields(page_start, data)
+    end = fill_fields(page_end, data)
+    if not abilities:
+        return start + blank_cards + end
+    pages = []
+    for i in range(0, len(abilities), ABILITIES_PER_PAGE):
+        cards = build_ability_cards(abilities[i:i + ABILITIES_PER_PAGE], data if show_odds else None, fragment)
+        pages.append(start + cards + "\n" + end)
+    return "".join(pages)
+
+def render_html(data, compiled, show_odds=False, fragment=None, fit=True, fits=None, truncate=False):
+    """
+    Render a card dict against a compiled template and return the HTML string.
+    If `fits` is a dict it receives the text_fit result of every adjusted field.
+    """
+    # 0. Shrink text that would overflow its box; cut what still does not fit only if asked
+    if fit:
+        with span("text_fit") as sp:
+            fitted = text_fit.fit_card(data, truncate)
+            data = dict(data, **text_fit.render_fields(fitted))
+            sp["count"] = len(fitted)
+        if fits is not None:
+            fits.update(fitted)
+
+    # 1. Ability pages, laid out before the document is assembled
+    slots = {}
+    if compiled.ability_page:
+        abilities = data.get("abilities", [])
+        if not isinstance(abilities, list):
+            abilities = []
+        with span("ability_block", count=len(abilities)) as sp:
+            slots[ABILITY_SLOT] = ability_pages(abilities, data, compiled.ability_page, show_odds, fragment)
+            sp["bytes"] = slots[ABILITY_SLOT]
+
+    # 2. Fill standard fields
+    with span("field_substitution") as sp:
+        content = fill_fields(compiled, data, slots)
+        sp["bytes"] = content
     
-    # 2. Handle Image
+    # 3. Handle Image
     img_path = data.get("图片路径", "")
-    img_tag = get_image_tag(img_path)
+    with span("avatar_encode") as sp:
+        img_tag = get_image_tag(img_path)
+        sp["bytes"] = img_tag or ""
     
     # We look for <!-- AVATAR_PLACEHOLDER --> and optionally the "No Photo" text
     # The updated template.html uses "角色头像" as the placeholder text.
@@ -112,236 +360,26 @@ def generate_html(json_path, out_path=None, template_path=DEFAULT_TEMPLATE):
         # And remove the "No Photo" text if it exists (to avoid overlap)
         if no_photo_text in content:
             content = content.replace(no_photo_text, "")
-    else:
-        # If no image, we can leave the placeholder and text as is, 
-        # or just remove the placeholder comment.
-        pass
-
-    # 3. Handle Page 3 Abilities
-    abilities = data.get("abilities", [])
-    if abilities and isinstance(abilities, list):
-        # We need to replace the ability cards in the template.
-        # The template has 3 static ability cards. We should ideally have a placeholder or logic to replace them.
-        # Currently, the template has:
-        # <!-- 循环 3 次生成能力卡片 (静态写死或之后用脚本) -->
-        # <div class="ability-card">...</div> ... <div class="ability-card">...</div>
-        
-        # We will construct the HTML for the abilities and replace the entire block.
-        # But first we need to identify the block in the template.
-        # A simple way is to use a marker comment if it exists, or regex replace.
-        # The template has comments: <!-- 循环 3 次生成能力卡片 (静态写死或之后用脚本) -->
-        
-        start_marker = '<!-- 循环 3 次生成能力卡片 (静态写死或之后用脚本) -->'
-        end_marker = '<!-- 第四页: 角色关系网 -->' # The next section starts here, but page-3 ends with </div></div>
-        
-        # Ideally, we should look for the container content of page-3.
-        # Let's find the start marker and replace until the end of the 3 cards.
-        # Since we don't have an explicit end marker for the cards, we can replace the content 
-        # inside <div class="page-wrapper page-3 ..."> ... </div>
-        # But replacing by string search is safer if we add a placeholder.
-        # Let's construct the HTML first.
-        
-        abilities_html = []
-        for i, ab in enumerate(abilities):
-            if i >= 3: break # Only 3 cards fit
-            
-            title = ab.get("title", "")
-            trigger = ab.get("trigger", "")
-            # Split description/trigger if needed? 
-            # In Anomaly.json: "description": "text... and roll Stat."
-            # We put the whole description in trigger for now.
-            
-            success = ab.get("success", "")
-            failure = ab.get("failure", "")
-            special = ab.get("special", "")
-            question = ab.get("question", "")
-            options = ab.get("options", [])
-            
-            stat = ab.get("stat", "资质")
-            
-            # Format Options HTML
-            options_html = ""
-            for opt in options:
-                ans = opt.get("answer", "")
-                code = opt.get("code", "")
-                options_html += f'''
-                            <div class="qa-row">
-                                答: <input type="text" value="{ans}" readonly style="background:transparent;"> ➔ <div class="square"></div> <div class="square"></div> <div class="square"></div>
-                                <span style="margin-left:5px; font-size:10px; color:#999;">({code})</span>
-                            </div>'''
-
-            card_html = f'''
-            <div class="ability-card">
-                <div class="card-header">
-                    <div>{title}</div>
-                    <div style="font-size: 10px; font-weight: normal; overflow: hidden; white-space: nowrap; text-overflow: ellipsis;" title="{trigger}"></div>
-                    <div style="text-align:right">{stat}</div>
-                </div>
-                <div class="card-body">
-                    <div class="success-side">
-                        <div class="success-title">▲ 成功时， <div style="flex-grow:1; border-bottom:1px solid var(--primary-blue); margin-left:10px;"></div></div>
-                        <div class="input-line" style="height:auto; min-height:25px; font-size:11px;">{success}</div>
-                        
-                        <div style="display:flex; align-items:center; margin-top:20px;">
-                            <span class="icon-star">★</span> 
-                            <div style="background:#e2e8f0; width:80px; height:18px; border-radius:10px; margin-right:10px;"></div>,
-                            <div style="flex-grow:1; border-bottom:1px solid var(--primary-blue); font-size:11px;">{special}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="fail-side">
-                        <div class="fail-title">✘ 失败时， <div style="flex-grow:1; border-bottom:1px solid var(--fail-red); margin-left:10px;"></div></div>
-                        <div class="fail-line" style="height:auto; min-height:25px; font-size:11px;">{failure}</div>
-                        
-                        <div class="qa-section">
-                            <div class="qa-row">
-                                问: <input type="text" value="{question}" readonly style="background:transparent;"> 
-                                <div class="checkbox-group">已练习? <div class="square"></div></div>
-                            </div>
-                            <div style="text-align:right; font-size:11px; margin-bottom:5px;">页码 # ________</div>
-                            {options_html}
-                        </div>
-                    </div>
-                </div>
-            </div>'''
-            abilities_html.append(card_html)
-            
-        full_abilities_html = "\n".join(abilities_html)
-        
-        # Replace in template
-        # We need to find where to insert. 
-        # In template.html: 
-        # <!-- 循环 3 次生成能力卡片 (静态写死或之后用脚本) -->
-        # ... (3 cards) ...
-        # </div>
-        # </div>
-        # <!-- 第四页: ... -->
-        
-        # Let's replace the whole marker and following content until the closing div of container?
-        # A better way is to define a replacement range in the template using a new marker.
-        # But we can't edit template.html easily from here without rewriting it.
-        # So we'll use string finding logic.
-        
-        if start_marker in content:
-            # Find the end of the cards section.
-            # The cards are inside <div class="container"> which is inside <div class="page-wrapper page-3 ...">
-            # The next page starts with <!-- 第四页
-            
-            next_page_idx = content.find('<!-- 第四页')
-            if next_page_idx == -1:
-                next_page_idx = len(content)
-                
-            # Find the last closing div before the next page?
-            # Actually, we can just replace the marker and assume the static cards follow it.
-            # But we need to remove the static cards.
-            # The static cards start after the marker.
-            # We can use regex or just finding known strings.
-            
-            # Simple approach: Replace the marker + known static content if it matches.
-            # Or, we can just replace everything between the marker and the closing </div> of the container.
-            # The container closes before page-3 wrapper closes.
-            
-            # Let's try to find the start marker index
-            start_idx = content.find(start_marker)
-            
-            # Find the end of the container div. 
-            # The structure is:
-            # <div class="page-wrapper page-3 ...">
-            #   <div class="container">
-            #      <div class="header">...</div>
-            #      <!-- Marker -->
-            #      <div class="ability-card">...</div>
-            #      ...
-            #   </div>
-            # </div>
-            
-            # So we look for the next "</div>\n    </div>" sequence after start_idx?
-            # That's risky.
-            
-            # Alternative: Since we control the template, let's assume the user hasn't modified it manually too much.
-            # We will replace the static content by looking for the first <div class="ability-card"> and the last </div> of the last card.
-            
-            # Let's just insert the new HTML after the marker, and if we can, remove the old cards.
-            # To remove old cards, we can regex replace `<div class="ability-card">.*?</div>\s*</div>\s*</div>` (non-greedy?)
-            # No, nested divs make regex hard.
-            
-            # BEST APPROACH: Use a unique placeholder in template.html.
-            # Since we can't edit template.html right now in this function (it's read only), 
-            # we rely on what's there.
-            # The marker is unique.
-            
-            # Let's try to match the exact string of the first static card start?
-            card_start = '<div class="ability-card">'
-            
-            # We construct a replacement string that includes the marker (to keep it?) or just replaces it.
-            # Let's replace the marker with the new content.
-            # And we need to consume the existing cards.
-            # Since we are generating the file, maybe we can just overwrite the whole section if we knew the bounds.
-            
-            # Hacky but effective: 
-            # Find start_marker.
-            # Find the start of "<!-- 第四页"
-            # The content between them contains the 3 static cards AND the closing divs for container and page-wrapper.
-            # Wait, page-wrapper closes BEFORE "<!-- 第四页".
-            
-            # content[start_idx : next_page_idx] contains:
-            # <!-- Marker -->
-            # (Static Cards)
-            # </div> (container)
-            # </div> (page-wrapper)
-            
-            # We want to replace (Static Cards) with full_abilities_html.
-            # So we keep the closing divs.
-            
-            # Let's find the position of the last "</div>" before "<!-- 第四页"
-            # And the one before that.
-            
-            segment = content[start_idx : next_page_idx]
-            # segment ends with closing divs.
-            # We want to replace everything from start of marker to the start of the closing divs.
-            
-            # How many closing divs? 
-            # <div class="container"> ... </div>
-            # <div class="page-wrapper ..."> ... </div>
-            # So 2 closing divs at the end of segment.
-            
-            r_idx = segment.rfind('</div>')
-            r_idx = segment.rfind('</div>', 0, r_idx) 
-            # This should be the start of the </div> for container.
-            
-            if r_idx != -1:
-                # We replace content[start_idx : start_idx + r_idx] with full_abilities_html
-                # But we need to be careful about whitespace.
-                
-                # Let's just use the marker.
-                # We will replace the marker with full_abilities_html.
-                # AND we will try to remove the static cards.
-                # If we just prepend, we have 6 cards.
-                
-                # Let's assume the static cards are exactly as in the template file we read.
-                # If we read the template file fresh, we know its content.
-                # We can try to identify the block of static cards in the template string.
-                pass
-                
-            # Let's try to be robust. 
-            # We will use regex to remove all <div class="ability-card">...</div> blocks? 
-            # No, regex is bad for HTML.
-            
-            # Let's just use the marker and cut until the known footer of the page container.
-            # The container ends with:
-            #         </div>
-            #     </div>
-            # 
-            #     <!-- 第四页
-            
-            end_of_cards_idx = content.rfind('</div>', 0, next_page_idx) # page-wrapper end
-            end_of_cards_idx = content.rfind('</div>', 0, end_of_cards_idx) # container end
-            
-            if start_idx != -1 and end_of_cards_idx != -1:
-                # Replace everything between marker and container end
-                prefix = content[:start_idx]
-                suffix = content[end_of_cards_idx:]
-                content = prefix + full_abilities_html + "\n" + suffix
+
+    return content
+
+def generate_html(json_path, out_path=None, template_path=DEFAULT_TEMPLATE, show_odds=False, fit=True, minify=False,
+                  theme=None, truncate=False):
+    # theme_registry imports this module, so it is imported here
+    import theme_registry
+
+    data = load_json(json_path)
+    compiled = theme_registry.compiled_for_card(data, template_path, theme)
+    fits = {}
+    content = render_html(data, compiled, show_odds, fit=fit, fits=fits, truncate=truncate)
+    if fit:
+        for warning in text_fit.warnings(fits):
+            print(f"排版: {warning}")
+    if minify:
+        with span("html_optimize") as sp:
+            content, report = html_optimize.optimize(content)
+            sp["bytes"] = content
+        print(f"压缩: {html_optimize.format_report(report)}")
 
     # Output path
     if not out_path:
@@ -353,8 +391,9 @@ def generate_html(json_path, out_path=None, template_path=DEFAULT_TEMPLATE):
     else:
         os.makedirs(os.path.dirname(out_path), exist_ok=True)
         
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    with span("html_write", bytes=content):
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(content)
         
     print(f"HTML Generated: {out_path}")
     return out_path
@@ -363,7 +402,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--json", required=True, help="Path to JSON data file")
     parser.add_argument("--out", help="Path to output HTML file")
-    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Path to HTML template")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Path to HTML template (overrides the theme)")
+    parser.add_argument("--theme", default=None, help="Theme id under themes/ (default: the card's 主题 field)")
+    parser.add_argument("--odds", action="store_true", help="Print dice odds on each ability card (needs NumPy)")
+    parser.add_argument("--no-fit", action="store_true", help="Do not shrink text that overflows its box")
+    parser.add_argument("--truncate", action="store_true", help="Cut text that still overflows at the smallest size, ending it with …")
+    parser.add_argument("--minify", action="store_true", help="Strip comments/whitespace and dedupe repeated styles and images")
+    pipeline_trace.add_trace_arguments(parser)
     args = parser.parse_args()
+    pipeline_trace.enable_from_args(args)
     
-    generate_html(args.json, args.out, args.template)
+    generate_html(args.json, args.out, args.template, args.odds, not args.no_fit, args.minify, args.theme, args.truncate)
@@ -0,0 +1,89 @@
+import os
+import shutil
+import subprocess
+
+import pdf_optimize
+from pipeline_trace import span
+
+
+def find_browser_path():
+    """Finds a suitable Chromium-based browser (Edge or Chrome)."""
+    possible_paths = [
+        # Edge
+        r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+        r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+        os.path.expanduser(r"~\AppData\Local\Microsoft\Edge\Application\msedge.exe"),
+        # Chrome
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        os.path.expanduser(r"~\AppData\Local\Google\Chrome\Application\chrome.exe"),
+    ]
+
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+
+    # Try finding in PATH
+    for binary in ["msedge", "chrome", "google-chrome"]:
+        path = shutil.which(binary)
+        if path:
+            return path
+
+    return None
+
+BROWSER_PATH = find_browser_path()
+
+
+def build_print_command(html_path: str, pdf_path: str, profile_dir: str | None = None) -> list[str]:
+    """Browser arguments for headless printing. Paths must be absolute."""
+    if not BROWSER_PATH or not os.path.exists(BROWSER_PATH):
+        raise FileNotFoundError(f"No compatible browser (Edge/Chrome) found. Please install one.")
+
+    cmd = [
+        BROWSER_PATH,
+        "--headless",
+        "--disable-gpu",
+    ]
+    if profile_dir:
+        # A persistent profile skips first-run setup on every launch.
+        cmd.append(f"--user-data-dir={profile_dir}")
+    cmd += [
+        f"--print-to-pdf={pdf_path}",
+        html_path
+    ]
+    return cmd
+
+
+def html_to_pdf(html_path: str, pdf_path: str, profile_dir: str | None = None, optimize: bool = False) -> dict | None:
+    """
+    Convert HTML to PDF using a Chromium-based browser (Edge or Chrome) in headless mode.
+    optimize=True runs pdf_optimize on the result (needs PyMuPDF) and returns its size report.
+    """
+    cmd = build_print_command(html_path, pdf_path, profile_dir)
+
+    # Browser might print logs to stderr/stdout, we capture them to keep console clean
+    with span("browser_spawn"):
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with span("print") as sp:
+        stdout, stderr = proc.communicate()
+        if proc.returncode == 0 and os.path.exists(pdf_path):
+            sp["bytes"] = os.path.getsize(pdf_path)
+    if proc.returncode != 0:
+        e = subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+        print(f"PDF conversion failed: {e.stderr.decode()}")
+        raise e
+    if optimize:
+        return pdf_optimize.optimize_file(pdf_path)
+    return None
+
+
+def html_to_png(html_path: str, png_path: str, width: int = 794, height: int = 1123, profile_dir: str | None = None):
+    """Screenshot the top of an HTML page (by default one A4 page at 96 dpi) with the headless browser."""
+    cmd = build_print_command(html_path, png_path, profile_dir)
+    cmd[-2:] = [f"--screenshot={png_path}", f"--window-size={width},{height}", "--hide-scrollbars", html_path]
+    with span("browser_spawn"):
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with span("screenshot"):
+        stdout, stderr = proc.communicate()
+    if proc.returncode != 0 or not os.path.exists(png_path):
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
@@ -0,0 +1,166 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+try:
+    from pipeline_trace import span
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from pipeline_trace import span
+
+# Post-print size optimizer for browser PDFs (needs PyMuPDF: pip install pymupdf).
+# Lossless steps always run. Images placed on the pages are only resampled when shown
+# above DPI_THRESHOLD_FACTOR times the target resolution; opaque ones become JPEG at
+# JPEG_QUALITY. Images inside Type3 fonts (Chrome's emoji) are never touched.
+DEFAULT_DPI = 200
+DPI_THRESHOLD_FACTOR = 1.5
+JPEG_QUALITY = 85
+
+STEP_LABELS = {
+    "streams": "压缩与合并重复对象",
+    "images": "图片降采样",
+}
+
+# garbage=4 drops unused objects and merges identical ones (fonts and images the
+# browser wrote more than once); deflate compresses every stream left uncompressed.
+_SAVE_OPTIONS = dict(garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, clean=True)
+
+
+def downsample_images(doc, dpi: int, quality: int = JPEG_QUALITY) -> int:
+    """Resample page images shown above the threshold to `dpi` at their largest placement; the number changed."""
+    import fitz
+
+    # xref -> (pixel width, the width needed for its largest placement)
+    needed: dict[int, tuple[int, float]] = {}
+    for page in doc:
+        for xref, _smask, width, _height, *_ in page.get_images(full=True):
+            for rect in page.get_image_rects(xref):
+                px = max(rect.width, 1) / 72 * dpi
+                needed[xref] = (width, max(px, needed.get(xref, (width, 0.0))[1]))
+
+    changed = 0
+    for xref, (width, px) in needed.items():
+        if width <= px * DPI_THRESHOLD_FACTOR:
+            continue
+        info = doc.extract_image(xref)
+        pix = fitz.Pixmap(doc, xref)
+        if info.get("smask"):
+            pix = fitz.Pixmap(pix, fitz.Pixmap(doc, info["smask"]))
+        if pix.n - pix.alpha >= 4:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        scale = px / width
+        pix = fitz.Pixmap(pix, max(1, round(pix.width * scale)), max(1, round(pix.height * scale)), None)
+        page = next(p for p in doc if any(img[0] == xref for img in p.get_images()))
+        if pix.alpha:
+            page.replace_image(xref, pixmap=pix)
+        else:
+            page.replace_image(xref, stream=pix.tobytes("jpg", jpg_quality=quality))
+        changed += 1
+    return changed
+
+
+def optimize_bytes(data: bytes, dpi: int | None = DEFAULT_DPI, quality: int = JPEG_QUALITY) -> tuple[bytes, dict]:
+    """
+    The optimized PDF and a size report {"before", "after", "images", "steps": {name: bytes saved}}.
+    dpi=None skips image resampling. The input is returned unchanged if nothing got smaller.
+    """
+    import fitz
+
+    before = len(data)
+    saved = {name: 0 for name in STEP_LABELS}
+    images = 0
+    with fitz.open("pdf", data) as doc:
+        out = doc.tobytes(**_SAVE_OPTIONS)
+        # A step that does not shrink the file is dropped, so every saving is >= 0
+        # and the steps add up to before - after
+        if len(out) < before:
+            saved["streams"] = before - len(out)
+        else:
+            out = data
+        if dpi:
+            images = downsample_images(doc, dpi, quality)
+            if images:
+                resampled = doc.tobytes(**_SAVE_OPTIONS)
+                if len(resampled) < len(out):
+                    saved["images"] = len(out) - len(resampled)
+                    out = resampled
+    if len(out) >= before:
+        return data, {"before": before, "after": before, "images": 0, "steps": {name: 0 for name in STEP_LABELS}}
+    return out, {"before": before, "after": len(out), "images": images, "steps": saved}
+
+
+def optimize_file(path: str, out_path: str | None = None, dpi: int | None = DEFAULT_DPI, quality: int = JPEG_QUALITY) -> dict:
+    """Optimize a PDF file, in place unless out_path is given."""
+    with open(path, "rb") as f:
+        data = f.read()
+    with span("pdf_optimize") as sp:
+        out, report = optimize_bytes(data, dpi, quality)
+        sp["bytes"] = report["after"]
+    target = out_path or path
+    if out is not data or target != path:
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(out)
+        os.replace(tmp, target)
+    return report
+
+
+def format_report(report: dict) -> str:
+    before, after = report["before"], report["after"]
+    ratio = (before - after) / before if before else 0.0
+    parts = "，".join(f"{STEP_LABELS.get(name, name)} -{saved / 1024:.1f} KB" for name, saved in report["steps"].items() if saved)
+    return f"{before / 1024:.1f} KB → {after / 1024:.1f} KB (-{ratio:.0%})" + (f"：{parts}" if parts else "")
+
+
+def pdf_paths(targets) -> list[str]:
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths += sorted(glob.glob(os.path.join(target, "**", "*.pdf"), recursive=True))
+        else:
+            paths.append(target)
+    return paths
+
+
+if __name__ == "__main__":
+    default_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", help=f"PDF files or directories (default: {default_dir})")
+    parser.add_argument("--write", action="store_true", help="Rewrite the files in place (default: only report sizes)")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="Target resolution of embedded images (0: keep images)")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG quality of resampled images")
+    parser.add_argument("--json", action="store_true", help="Print the per-file reports as JSON")
+    args = parser.parse_args()
+
+    paths = pdf_paths(args.paths or [default_dir])
+    if not paths:
+        sys.exit("没有找到 PDF 文件。")
+    started = time.perf_counter()
+    reports = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            optimized, report = optimize_bytes(data, args.dpi or None, args.quality)
+        except Exception as e:
+            print(f"{path}: 无法处理 ({e})")
+            continue
+        reports[path] = report
+        if args.write and report["after"] < report["before"]:
+            with open(path, "wb") as f:
+                f.write(optimized)
+        if not args.json:
+            print(f"{path}: {format_report(report)}")
+
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    else:
+        total = {
+            "before": sum(r["before"] for r in reports.values()),
+            "after": sum(r["after"] for r in reports.values()),
+            "steps": {name: sum(r["steps"][name] for r in reports.values()) for name in STEP_LABELS},
+        }
+        print(f"共 {len(reports)} 个文件{'（已写回）' if args.write else ''}: {format_report(total)}，用时 {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,171 @@
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+
+# TA_TRACE=1 writes trace.jsonl in the working directory, any other value is the output path.
+# TA_TRACE_CHROME=<path> additionally converts the trace to Chrome trace-event format at exit.
+# Runs append to the same file; every span carries the id of its run, which worker
+# processes inherit through TA_TRACE_RUN so their spans count as the same run.
+TRACE_ENV = "TA_TRACE"
+CHROME_ENV = "TA_TRACE_CHROME"
+RUN_ENV = "TA_TRACE_RUN"
+DEFAULT_TRACE_PATH = "trace.jsonl"
+
+_lock = threading.Lock()
+_out = None
+_path = None
+_run = None
+
+
+def enable(path: str = DEFAULT_TRACE_PATH, chrome_path: str | None = None):
+    """Start appending spans to a JSON-lines file."""
+    global _out, _path, _run
+    with _lock:
+        if _out is not None:
+            _out.close()
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        _out = open(path, "a", encoding="utf-8")
+        _path = path
+        _run = os.environ.get(RUN_ENV) or f"{os.getpid()}-{time.time_ns()}"
+        os.environ[RUN_ENV] = _run
+    if chrome_path:
+        run = _run
+        atexit.register(lambda: export_chrome(path, chrome_path, run))
+
+
+def enabled() -> bool:
+    return _out is not None
+
+
+def trace_path():
+    return _path
+
+
+def run_id():
+    return _run
+
+
+def enable_from_env():
+    value = os.environ.get(TRACE_ENV, "").strip()
+    if not value or value.lower() in ("0", "false", "no"):
+        return
+    path = DEFAULT_TRACE_PATH if value.lower() in ("1", "true", "yes") else value
+    enable(path, os.environ.get(CHROME_ENV) or None)
+
+
+def add_trace_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--trace", nargs="?", const=DEFAULT_TRACE_PATH, default=None,
+                        help=f"Write per-stage JSON-lines trace (default: {DEFAULT_TRACE_PATH})")
+    parser.add_argument("--trace-chrome", default=None, help="Also export the trace in Chrome trace-event format")
+
+
+def enable_from_args(args):
+    if args.trace:
+        enable(args.trace, args.trace_chrome)
+
+
+def _emit(record: dict):
+    line = json.dumps(record, ensure_ascii=False)
+    with _lock:
+        if _out is None:
+            return
+        _out.write(line + "\n")
+        _out.flush()
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """
+    Time a pipeline stage. The yielded dict can be filled with extra fields before
+    the block ends. "bytes" may be given the payload itself (str or bytes); it is
+    only measured when tracing is on, so disabled spans cost next to nothing.
+    """
+    if _out is None:
+        yield attrs
+        return
+    ts = time.time()
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        record = {
+            "name": name,
+            "ts": round(ts * 1e6),
+            "dur_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "run": _run,
+        }
+        record.update(attrs)
+        payload = record.get("bytes")
+        if isinstance(payload, str):
+            record["bytes"] = len(payload.encode("utf-8"))
+        elif isinstance(payload, (bytes, bytearray)):
+            record["bytes"] = len(payload)
+        if error:
+            record["error"] = error
+        _emit(record)
+
+
+def _records(jsonl_path: str):
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def last_run(jsonl_path: str) -> str | None:
+    """Id of the most recent run in a trace file."""
+    run = None
+    for rec in _records(jsonl_path):
+        run = rec.get("run", run)
+    return run
+
+
+def export_chrome(jsonl_path: str, out_path: str, run: str | None = None) -> int:
+    """
+    Convert a JSON-lines trace to the Chrome trace-event format (chrome://tracing, Perfetto).
+    With `run`, only the spans of that run are exported; otherwise every run in the file.
+    """
+    events = []
+    for rec in _records(jsonl_path):
+        if run is not None and rec.get("run") != run:
+            continue
+        args = {k: v for k, v in rec.items() if k not in ("name", "ts", "dur_ms", "pid", "tid", "run")}
+        events.append({
+            "name": rec["name"],
+            "ph": "X",
+            "ts": rec["ts"],
+            "dur": round(rec["dur_ms"] * 1000.0),
+            "pid": rec.get("pid", 0),
+            "tid": rec.get("tid", 0),
+            "args": args,
+        })
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    return len(events)
+
+
+enable_from_env()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("trace", help="JSON-lines trace file")
+    parser.add_argument("--chrome", required=True, help="Write Chrome trace-event JSON here")
+    parser.add_argument("--run", default=None, help="Run id to export (default: the last run in the file)")
+    parser.add_argument("--all", action="store_true", help="Export every run in the file")
+    args = parser.parse_args()
+
+    n = export_chrome(args.trace, args.chrome, None if args.all else args.run or last_run(args.trace))
+    print(f"已导出 {n} 个 span：{args.chrome}")
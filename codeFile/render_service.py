@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+try:
+    import json_to_html
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import json_to_html
+
+import arc_catalog
+import pipeline_trace
+import pdf_export
+import pdf_optimize
+import theme_registry
+from arc_catalog import card_hash
+from pipeline_trace import span
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class ResponseCache:
+    """Small LRU of rendered documents, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key):
+        body = self._items.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._items[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._items), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+class BrowserPool:
+    """
+    A fixed number of print slots, each with its own persistent browser profile.
+    Reusing the profile keeps every launch after the first one warm.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._root = tempfile.mkdtemp(prefix="ta_render_")
+        self._slots: asyncio.Queue = asyncio.Queue()
+        for i in range(size):
+            slot_dir = os.path.join(self._root, f"slot{i}")
+            os.makedirs(os.path.join(slot_dir, "profile"), exist_ok=True)
+            self._slots.put_nowait(slot_dir)
+
+    async def print_pdf(self, html: str) -> bytes:
+        slot_dir = await self._slots.get()
+        try:
+            html_path = os.path.join(slot_dir, "card.html")
+            pdf_path = os.path.join(slot_dir, "card.pdf")
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(html)
+            cmd = pdf_export.build_print_command(html_path, pdf_path, os.path.join(slot_dir, "profile"))
+            with span("browser_spawn"):
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                )
+            with span("print") as sp:
+                _, stderr = await proc.communicate()
+                if proc.returncode != 0:
+                    raise RuntimeError(f"PDF conversion failed: {stderr.decode(errors='replace')}")
+                with open(pdf_path, "rb") as f:
+                    pdf = f.read()
+                sp["bytes"] = pdf
+            return pdf
+        finally:
+            self._slots.put_nowait(slot_dir)
+
+    def close(self):
+        shutil.rmtree(self._root, ignore_errors=True)
+
+
+class RenderService:
+    def __init__(
+        self,
+        template_path: str = json_to_html.DEFAULT_TEMPLATE,
+        setting_dir: str = arc_catalog.SETTING_DIR,
+        max_concurrent: int = 4,
+        browser_slots: int = 2,
+        cache_bytes: int = 64 * 1024 * 1024,
+        optimize_pdf: bool = False,
+    ):
+        self.template_path = template_path
+        self.setting_dir = setting_dir
+        self.max_concurrent = max_concurrent
+        self.browser_slots = browser_slots
+        self.cache = ResponseCache(cache_bytes)
+        self.optimize_pdf = optimize_pdf
+        self._limit: asyncio.Semaphore | None = None
+        self._browsers: BrowserPool | None = None
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.themes = theme_registry.default_registry()
+
+    def warm(self):
+        """Load the catalog and compile the template (or every theme) before the first request."""
+        arc_catalog.load_catalog(self.setting_dir)
+        json_to_html.get_compiled_template(self.template_path)
+        self.themes.warm_all()
+
+    def _template_stamp(self, data: dict):
+        if os.path.abspath(self.template_path) != os.path.abspath(json_to_html.DEFAULT_TEMPLATE):
+            return os.path.getmtime(self.template_path)
+        return self.themes.stamp(self.themes.resolve(data))
+
+    @staticmethod
+    def _avatar_stamp(data: dict):
+        # The card only holds the avatar's path; replacing the image must still miss the cache
+        path = json_to_html.resolve_image_path(data.get("图片路径", ""))
+        if not path:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def _render_html(self, data: dict) -> bytes:
+        catalog = arc_catalog.load_catalog(self.setting_dir)
+        compiled = theme_registry.compiled_for_card(data, self.template_path)
+        card = arc_catalog.fill_derived(data, catalog)
+        return json_to_html.render_html(card, compiled).encode("utf-8")
+
+    def _optimize_pdf(self, pdf: bytes) -> bytes:
+        with span("pdf_optimize") as sp:
+            pdf, _ = pdf_optimize.optimize_bytes(pdf)
+            sp["bytes"] = pdf
+        return pdf
+
+    async def render(self, data: dict, fmt: str) -> tuple[bytes, bool]:
+        """
+        Return (body, cache_hit). Template, theme, catalog and avatar file edits invalidate
+        the cache. Identical requests arriving while one is rendering wait for that render
+        instead of starting their own, and count as hits.
+        """
+        key = (
+            card_hash(data),
+            fmt,
+            self._template_stamp(data),
+            arc_catalog.catalog_stamp(self.setting_dir),
+            self._avatar_stamp(data),
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached, True
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            # shield: a waiter that disconnects must not cancel the render the others share
+            return await asyncio.shield(pending), True
+        pending = asyncio.ensure_future(self._render_uncached(key, data, fmt))
+        self._inflight[key] = pending
+        pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending), False
+
+    async def _render_uncached(self, key: tuple, data: dict, fmt: str) -> bytes:
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            html = await loop.run_in_executor(None, self._render_html, data)
+            if fmt == "pdf":
+                body = await self._browsers.print_pdf(html.decode("utf-8"))
+                if self.optimize_pdf:
+                    body = await loop.run_in_executor(None, self._optimize_pdf, body)
+            else:
+                body = html
+
+        self.cache.put(key, body)
+        return body
+
+    async def _respond(self, writer, status: int, body: bytes, content_type: str, extra=None):
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ]
+        for k, v in (extra or {}).items():
+            head.append(f"{k}: {v}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _respond_json(self, writer, status: int, obj: dict):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        await self._respond(writer, status, body, "application/json; charset=utf-8")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            try:
+                method, target, _ = request_line.split(" ", 2)
+            except ValueError:
+                await self._respond_json(writer, 400, {"error": "malformed request line"})
+                return
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ("\r\n", "\n", ""):
+                    break
+                k, _, v = line.partition(":")
+                headers[k.strip().lower()] = v.strip()
+
+            url = urlsplit(target)
+            if url.path == "/health":
+                await self._respond_json(writer, 200, {"status": "ok", "cache": self.cache.stats()})
+                return
+            if url.path != "/render":
+                await self._respond_json(writer, 404, {"error": f"unknown path {url.path}"})
+                return
+            if method != "POST":
+                await self._respond_json(writer, 405, {"error": "use POST"})
+                return
+
+            try:
+                length = int(headers.get("content-length", "0") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                await self._respond_json(writer, 400, {"error": "invalid Content-Length"})
+                return
+            if length > MAX_BODY_BYTES:
+                await self._respond_json(writer, 413, {"error": "card JSON too large"})
+                return
+            try:
+                body = await reader.readexactly(length)
+            except asyncio.IncompleteReadError:
+                await self._respond_json(writer, 400, {"error": "body shorter than Content-Length"})
+                return
+
+            fmt = parse_qs(url.query).get("format", ["html"])[0]
+            if fmt not in CONTENT_TYPES:
+                await self._respond_json(writer, 400, {"error": f"unsupported format {fmt}"})
+                return
+            if fmt == "pdf" and not pdf_export.BROWSER_PATH:
+                await self._respond_json(writer, 503, {"error": "no compatible browser (Edge/Chrome) found"})
+                return
+            try:
+                data = json.loads(body.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                await self._respond_json(writer, 400, {"error": f"invalid JSON: {e}"})
+                return
+            if not isinstance(data, dict):
+                await self._respond_json(writer, 400, {"error": "JSON内容必须是对象(dict)。"})
+                return
+
+            out, hit = await self.render(data, fmt)
+            await self._respond(writer, 200, out, CONTENT_TYPES[fmt], {"X-Cache": "HIT" if hit else "MISS"})
+        except Exception as e:
+            try:
+                await self._respond_json(writer, 500, {"error": str(e)})
+            except Exception:
+                pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self._limit = asyncio.Semaphore(self.max_concurrent)
+        self._browsers = BrowserPool(self.browser_slots)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.warm)
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Render service listening on http://{host}:{port} (POST /render?format=html|pdf)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._browsers.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to bind")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to bind")
+    parser.add_argument("--template", default=json_to_html.DEFAULT_TEMPLATE, help="Path to HTML template")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum renders in flight")
+    parser.add_argument("--browsers", type=int, default=2, help="Number of browser print slots")
+    parser.add_argument("--cache-mb", type=int, default=64, help="Response cache size in MB")
+    parser.add_argument("--optimize-pdf", action="store_true", help="Compress streams, merge duplicates and downsample images of served PDFs")
+    pipeline_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    pipeline_trace.enable_from_args(args)
+
+    service = RenderService(
+        template_path=args.template,
+        max_concurrent=args.concurrency,
+        browser_slots=args.browsers,
+        cache_bytes=args.cache_mb * 1024 * 1024,
+        optimize_pdf=args.optimize_pdf,
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nRender service stopped.")
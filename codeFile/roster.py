@@ -0,0 +1,168 @@
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+
+try:
+    import json_to_html
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import json_to_html
+
+import arc_catalog
+import html_optimize
+import pdf_export
+import pdf_optimize
+import pipeline_trace
+import theme_registry
+from pipeline_trace import span
+
+# Expands <ta-frag> references in place while the page is parsed, then gives every
+# agent the page-4/page-5 grids the template script only fills for the first id match.
+ROSTER_SCRIPT = """
+    <script>
+        document.querySelectorAll("ta-frag").forEach(function (ref) {
+            var tpl = document.getElementById("frag-" + ref.getAttribute("data-id"));
+            if (tpl) { ref.replaceWith(tpl.content.cloneNode(true)); }
+        });
+        document.addEventListener("DOMContentLoaded", function () {
+            ["page-4-grid", "page-5-grid"].forEach(function (id) {
+                var grids = document.querySelectorAll('[id="' + id + '"]');
+                for (var i = 1; i < grids.length; i++) { grids[i].innerHTML = grids[0].innerHTML; }
+            });
+        });
+    </script>
+"""
+
+
+class FragmentStore:
+    """Each distinct ability-card fragment once, referenced by content hash."""
+
+    def __init__(self):
+        self.fragments: dict[str, str] = {}
+        self.refs = 0
+        # Bytes the references saved compared to inlining every fragment
+        self.inlined_bytes = 0
+
+    def add(self, html: str) -> str:
+        raw = html.encode("utf-8")
+        key = hashlib.sha1(raw).hexdigest()[:12]
+        self.fragments.setdefault(key, html)
+        self.refs += 1
+        ref = f'<ta-frag data-id="{key}"></ta-frag>'
+        self.inlined_bytes += len(raw) - len(ref)
+        return ref
+
+    def templates(self) -> str:
+        return "\n".join(
+            f'    <template id="frag-{key}">{html}</template>' for key, html in self.fragments.items()
+        )
+
+
+def split_document(html: str) -> tuple[str, str, str]:
+    """(head up to and including <body>, page markup, trailing script and </body></html>)."""
+    body_start = html.find("<body")
+    body_start = html.find(">", body_start) + 1 if body_start != -1 else 0
+    body_end = html.rfind("</body>")
+    if body_end == -1:
+        body_end = len(html)
+    script = html.rfind("<script", body_start, body_end)
+    cut = script if script != -1 else body_end
+    return html[:body_start], html[body_start:cut], html[cut:]
+
+
+def card_paths(targets) -> list[str]:
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths += sorted(glob.glob(os.path.join(target, "*", "*.json")))
+        else:
+            paths.append(target)
+    return paths
+
+
+def build_roster(paths, out_html: str, template_path: str = json_to_html.DEFAULT_TEMPLATE, show_odds: bool = False,
+                 minify: bool = False, theme: str | None = None) -> dict:
+    """
+    Render every card into one HTML document with a single head and shared fragments.
+    The document has one stylesheet, so the whole roster uses one theme (default: the first card's).
+    """
+    catalog = arc_catalog.load_catalog()
+    compiled = None
+    store = FragmentStore()
+    head = tail = ""
+    bodies = []
+    separate_bytes = 0
+    for path in paths:
+        data = arc_catalog.fill_derived(json_to_html.load_json(path), catalog)
+        if compiled is None:
+            compiled = theme_registry.compiled_for_card(data, template_path, theme)
+        inlined = store.inlined_bytes
+        doc = json_to_html.render_html(data, compiled, show_odds, fragment=store.add)
+        separate_bytes += len(doc.encode("utf-8")) + store.inlined_bytes - inlined
+        card_head, body, card_tail = split_document(doc)
+        if not bodies:
+            head, tail = card_head, card_tail
+        bodies.append(f"\n    <!-- 特工: {data.get('姓名', '')} -->{body}")
+
+    tail_at = tail.rfind("</body>")
+    if tail_at == -1:
+        tail_at = len(tail)
+    content = (
+        head
+        + "".join(bodies)
+        + "\n" + store.templates() + "\n"
+        + tail[:tail_at]
+        + ROSTER_SCRIPT
+        + tail[tail_at:]
+    )
+    optimized = None
+    if minify:
+        content, optimized = html_optimize.optimize(content)
+    os.makedirs(os.path.dirname(os.path.abspath(out_html)), exist_ok=True)
+    with span("html_write", bytes=content):
+        with open(out_html, "w", encoding="utf-8") as f:
+            f.write(content)
+    return {
+        "cards": len(bodies),
+        "bytes": len(content.encode("utf-8")),
+        "separate_bytes": separate_bytes,
+        "fragments": len(store.fragments),
+        "fragment_refs": store.refs,
+        "optimized": optimized,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cards", nargs="+", help="Card JSON files or card directories")
+    parser.add_argument("--out", required=True, help="Output HTML path (the PDF goes next to it)")
+    parser.add_argument("--template", default=json_to_html.DEFAULT_TEMPLATE, help="Path to HTML template (overrides the theme)")
+    parser.add_argument("--theme", default=None, help="Theme id for the whole roster (default: the first card's)")
+    parser.add_argument("--pdf", action="store_true", help="Also print the roster to PDF in one browser job")
+    parser.add_argument("--odds", action="store_true", help="Print dice odds on each ability card (needs NumPy)")
+    parser.add_argument("--minify", action="store_true", help="Strip comments/whitespace and dedupe repeated styles and images")
+    parser.add_argument("--optimize-pdf", action="store_true", help="With --pdf: compress streams, merge duplicates and downsample images")
+    pipeline_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    pipeline_trace.enable_from_args(args)
+
+    paths = card_paths(args.cards)
+    if not paths:
+        sys.exit("没有找到角色卡。")
+    started = time.perf_counter()
+    stats = build_roster(paths, args.out, args.template, args.odds, args.minify, args.theme)
+    print(f"花名册: {stats['cards']} 张角色卡 → {args.out} "
+          f"({stats['bytes'] / 1024:.0f} KB，单独生成共 {stats['separate_bytes'] / 1024:.0f} KB；"
+          f"能力卡片 {stats['fragment_refs']} 张，去重后 {stats['fragments']} 张)")
+    if stats["optimized"]:
+        print(f"压缩: {html_optimize.format_report(stats['optimized'])}")
+    if args.pdf:
+        pdf_path = os.path.splitext(args.out)[0] + ".pdf"
+        report = pdf_export.html_to_pdf(os.path.abspath(args.out), os.path.abspath(pdf_path), optimize=args.optimize_pdf)
+        print(f"PDF: {pdf_path}")
+        if report:
+            print(f"PDF 压缩: {pdf_optimize.format_report(report)}")
+    print(f"用时 {time.perf_counter() - started:.2f}s")
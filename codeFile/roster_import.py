@@ -0,0 +1,314 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+import catalog_share
+import json_to_html
+import pipeline_trace
+import stat_rules
+import watch_mode
+from pipeline_trace import span
+
+CARDS_DIR = os.path.join(arc_catalog.PROJECT_ROOT, "output")
+
+# Columns are matched to card fields by name: every card field (姓名, 人称代词, 问题1, 专注MAX …),
+# 主题, 图片路径, 能力1资质 … 能力3资质, plus the aliases below. 现实 may hold "名称-类型" or
+# just the name with the type in a 现实类型 column. Answers go in 职能问答 / 异常问答 (all
+# questions, separated by commas) or one column per question (职能问答1, 职能问答2 …).
+REALITY_TYPE = "现实类型"
+COLUMN_ALIASES = {
+    "name": "姓名",
+    "pronoun": "人称代词",
+    "pronouns": "人称代词",
+    "代词": "人称代词",
+    "title": "机构头衔",
+    "rating": "机构评级",
+    "anomaly": "异常体",
+    "reality": "现实",
+    "reality type": REALITY_TYPE,
+    "competency": "职能",
+    "role": "职能",
+    "theme": "主题",
+    "avatar": "图片路径",
+    "头像": "图片路径",
+}
+EXTRA_FIELDS = ["主题", "图片路径", "能力1资质", "能力2资质", "能力3资质", REALITY_TYPE]
+ANSWER_FIELDS = {answer_field: kind for kind, (_, answer_field) in stat_rules.SOURCES.items()}
+
+_ANSWER_COLUMN_RE = re.compile(r"^(" + "|".join(ANSWER_FIELDS) + r")\s*(\d+)?$")
+_ANSWER_SPLIT_RE = re.compile(r"\s*[,，;；|、]\s*")
+# Builds waiting on the pool per worker; more rows are not read until one finishes
+PENDING_PER_JOB = 2
+
+
+def card_columns() -> list[str]:
+    return arc_catalog.CARD_FIELDS + EXTRA_FIELDS
+
+
+def map_column(header: str, fields: set[str]):
+    """The card field a column fills, (answer field, question index) for one answer, or None."""
+    name = (header or "").strip()
+    name = COLUMN_ALIASES.get(name.lower(), name)
+    if name in stat_rules.STAT_NAMES:
+        name += "MAX"
+    if name in fields:
+        return name
+    m = _ANSWER_COLUMN_RE.match(name)
+    if m and m.group(2) != "0":
+        return (m.group(1), int(m.group(2)) - 1) if m.group(2) else m.group(1)
+    return None
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_rows(path: str, encoding: str = "utf-8-sig", sheet: str | None = None):
+    """Yield (row number, header, cells) one row at a time from a CSV or .xlsx file."""
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if sheet else wb.active
+            rows = ws.iter_rows(values_only=True)
+            header = [_cell(v) for v in next(rows, ())]
+            for number, row in enumerate(rows, start=2):
+                yield number, header, [_cell(v) for v in row]
+        finally:
+            wb.close()
+        return
+
+    with open(path, "r", encoding=encoding, newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",\t;")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = [_cell(v) for v in next(reader, [])]
+        for row in reader:
+            yield reader.line_num, header, [_cell(v) for v in row]
+
+
+def resolve_option(value: str, options: list[dict]):
+    """Option index for an answer given as its number (from 1), answer text or code; None when blank."""
+    if not value:
+        return None
+    if value.isdigit():
+        index = int(value) - 1
+        if 0 <= index < len(options):
+            return index
+        raise ValueError(f"选项 {value} 超出范围 (共 {len(options)} 项)")
+    for index, opt in enumerate(options):
+        if value in (opt["answer"], opt["code"]):
+            return index
+    raise ValueError(f"没有选项“{value}”")
+
+
+def row_card(values: dict, answers: dict, catalog: dict, rules) -> tuple[dict, list[str]]:
+    """
+    One roster row as a card: selections checked against the catalog, answers turned
+    into option indices, missing *MAX derived from them, then the catalog text filled
+    in as the GUI does. Raises ValueError for rows that cannot become a valid card.
+    """
+    warnings = []
+    data = {k: v for k, v in values.items() if v and k != REALITY_TYPE}
+    if not data.get("姓名"):
+        raise ValueError("缺少姓名")
+    anomaly = data.get("异常体", "")
+    if not anomaly:
+        raise ValueError("缺少异常体")
+    if anomaly not in catalog["anomaly"]:
+        raise ValueError(f"未知的异常体：{anomaly}")
+    role = data.get("职能", "")
+    if role and role not in catalog["competency"]:
+        raise ValueError(f"未知的职能：{role}")
+
+    reality = data.get("现实", "")
+    if reality:
+        name, _, kind = reality.partition("-")
+        kind = kind or values.get(REALITY_TYPE, "")
+        if name not in catalog["reality"]:
+            raise ValueError(f"未知的现实：{name}")
+        types = catalog["reality"][name]["types"]
+        if kind and types and kind not in types:
+            raise ValueError(f"现实 {name} 没有类型：{kind}（可选：{'、'.join(types)}）")
+        data["现实"] = f"{name}-{kind or (types[0] if types else '')}"
+
+    for i in range(3):
+        stat = data.get(f"能力{i+1}资质")
+        if stat and stat not in stat_rules.STAT_NAMES:
+            warnings.append(f"能力{i+1}资质“{stat}”不是资质名")
+
+    questions = {
+        "competency": catalog["competency"][role]["interactions"] if role else [],
+        "anomaly": catalog["anomaly"][anomaly],
+    }
+    for answer_field, given in answers.items():
+        kind = ANSWER_FIELDS[answer_field]
+        chosen = [None] * len(questions[kind])
+        for index, value in given.items():
+            if index >= len(chosen):
+                if value:
+                    raise ValueError(f"{answer_field}只有 {len(chosen)} 题，第 {index + 1} 题无处填写")
+                continue
+            try:
+                chosen[index] = resolve_option(value, questions[kind][index]["options"])
+            except ValueError as e:
+                raise ValueError(f"{answer_field}第 {index + 1} 题：{e}")
+        if any(c is not None for c in chosen):
+            data[answer_field] = chosen
+
+    if stat_rules.has_answers(data):
+        for field, value in stat_rules.derived_stat_fields(data, rules).items():
+            data.setdefault(field, value)
+        warnings += [f"{field} 填写 {entered} / 问答推导 {derived}" for field, entered, derived in stat_rules.audit_card(data, rules)]
+    return arc_catalog.fill_derived(data, catalog), warnings
+
+
+def split_row(cells: list[str], columns: list) -> tuple[dict, dict]:
+    """Card field values and {answer field: {question index: value}} of one row."""
+    values: dict[str, str] = {}
+    answers: dict[str, dict[int, str]] = {}
+    for column, cell in zip(columns, cells):
+        if column is None:
+            continue
+        if isinstance(column, tuple):
+            answers.setdefault(column[0], {})[column[1]] = cell
+        elif column in ANSWER_FIELDS:
+            if cell:
+                answers.setdefault(column, {}).update(enumerate(_ANSWER_SPLIT_RE.split(cell)))
+        elif cell:
+            values[column] = cell
+    return values, answers
+
+
+def import_roster(path: str, out_dir: str, catalog: dict, overwrite: bool = False, encoding: str = "utf-8-sig", sheet=None):
+    """
+    Yield one result per data row as soon as its card is written:
+    {"row", "name", "path", "warnings"}, {"row", "name", "skipped"} or {"row", "error"}.
+    Only the current row is held in memory. A 姓名 already written by an earlier row of
+    the same roster is an error rather than a silent overwrite of that row's card.
+    """
+    rules = stat_rules.rules_for(catalog)
+    fields = set(card_columns())
+    columns = None
+    written: dict[str, int] = {}  # card folder name -> row that wrote it
+    for number, header, cells in iter_rows(path, encoding, sheet):
+        if columns is None:
+            columns = [map_column(h, fields) for h in header]
+            unknown = [h for h, c in zip(header, columns) if h and c is None]
+            if unknown:
+                print(f"忽略无法对应到角色卡字段的列：{', '.join(unknown)}")
+        if not any(cells):
+            continue
+        values, answers = split_row(cells, columns)
+        try:
+            with span("roster_row") as sp:
+                data, warnings = row_card(values, answers, catalog, rules)
+                text = json.dumps(data, ensure_ascii=False, indent=2)
+                sp["bytes"] = text
+        except ValueError as e:
+            yield {"row": number, "error": str(e)}
+            continue
+        name = arc_catalog.safe_filename_part(data["姓名"], f"row{number}")
+        if name in written:
+            yield {"row": number, "error": f"姓名 {name} 与第 {written[name]} 行重复"}
+            continue
+        card_dir = os.path.join(out_dir, name)
+        json_path = os.path.join(card_dir, name + ".json")
+        if os.path.exists(json_path) and not overwrite:
+            yield {"row": number, "name": name, "skipped": json_path}
+            continue
+        os.makedirs(card_dir, exist_ok=True)
+        with span("json_write", bytes=text):
+            with open(json_path, "w", encoding="utf-8") as f:
+                f.write(text)
+        written[name] = number
+        yield {"row": number, "name": name, "path": json_path, "warnings": warnings}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("roster", help="花名册 CSV 或 .xlsx 文件")
+    parser.add_argument("--out", default=CARDS_DIR, help="角色卡输出目录(<姓名>/<姓名>.json)")
+    parser.add_argument("--encoding", default="utf-8-sig", help="CSV 编码（Excel 另存的中文 CSV 多为 gbk）")
+    parser.add_argument("--sheet", default=None, help="xlsx 的工作表名（默认第一个）")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的角色卡")
+    parser.add_argument("--build", action="store_true", help="边导入边生成 HTML（多进程，共用一份 ARC 数据快照）")
+    parser.add_argument("--pdf", action="store_true", help="与 --build 同用：同时打印 PDF")
+    parser.add_argument("--optimize-pdf", action="store_true", help="与 --pdf 同用：压缩打印出的 PDF")
+    parser.add_argument("--template", default=json_to_html.DEFAULT_TEMPLATE, help="Path to HTML template")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="生成时的并行进程数")
+    pipeline_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    pipeline_trace.enable_from_args(args)
+
+    catalog = arc_catalog.load_catalog()
+    pool = catalog_share.process_pool(args.jobs) if args.build else None
+    pending = deque()
+    counts = {"written": 0, "skipped": 0, "failed": 0, "built": 0, "build_failed": 0}
+
+    def finish(result, future):
+        try:
+            future.result()
+        except Exception as e:
+            counts["build_failed"] += 1
+            print(f"[生成失败] 第 {result['row']} 行 {result['name']}: {e}")
+        else:
+            counts["built"] += 1
+
+    started = time.perf_counter()
+    try:
+        for result in import_roster(args.roster, args.out, catalog, args.overwrite, args.encoding, args.sheet):
+            if "error" in result:
+                counts["failed"] += 1
+                print(f"[跳过] 第 {result['row']} 行: {result['error']}")
+                continue
+            if "skipped" in result:
+                counts["skipped"] += 1
+                print(f"第 {result['row']} 行: 角色卡已存在，未覆盖 {result['skipped']}")
+                continue
+            counts["written"] += 1
+            print(f"第 {result['row']} 行 → {result['path']}" + (f"（{'；'.join(result['warnings'])}）" if result["warnings"] else ""))
+            if pool:
+                future = pool.submit(
+                    watch_mode.build_card, result["path"], (), args.template, arc_catalog.SETTING_DIR, args.pdf, args.optimize_pdf
+                )
+                pending.append((result, future))
+                while len(pending) >= PENDING_PER_JOB * max(1, args.jobs):
+                    finish(*pending.popleft())
+        while pending:
+            finish(*pending.popleft())
+    except UnicodeDecodeError:
+        raise SystemExit(f"无法以 {args.encoding} 读取 {args.roster}，请用 --encoding 指定编码（如 gbk）。")
+    finally:
+        if pool:
+            pool.shutdown(wait=True)
+
+    summary = f"导入 {counts['written']} 张角色卡，已存在 {counts['skipped']}，出错 {counts['failed']}"
+    if args.build:
+        summary += f"；生成 {counts['built']} 份" + (f"，失败 {counts['build_failed']}" if counts["build_failed"] else "")
+    print(f"\n{summary}，用时 {time.perf_counter() - started:.2f}s")
+    sys.exit(1 if counts["failed"] or counts["build_failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+import dice_odds
+from dice_odds import POOL_SIZE, DIE_SIDES
+from stat_rules import STAT_NAMES
+
+CARDS_DIR = os.path.join(arc_catalog.PROJECT_ROOT, "output")
+
+# Missions are simulated in fixed-size chunks, each with its own spawned seed,
+# so results only depend on the seed and not on how many workers were used.
+CHUNK_MISSIONS = 200_000
+
+_THREES_LUT = None
+
+
+def threes_lut():
+    """
+    Number of 3s for every 2*POOL_SIZE-bit integer, reading each 2-bit group as one d4.
+    Indexing this with uniform random integers is much cheaper than rng.binomial.
+    """
+    global _THREES_LUT
+    if _THREES_LUT is None:
+        import numpy as np
+
+        bits = np.arange(DIE_SIDES ** POOL_SIZE)
+        faces = [(bits // DIE_SIDES ** i) % DIE_SIDES for i in range(POOL_SIZE)]
+        _THREES_LUT = sum((face == 2) for face in faces).astype(np.int8)
+    return _THREES_LUT
+
+
+def agent_spec(data: dict) -> dict:
+    """The parts of a card the simulator needs, as plain picklable values."""
+    qa = [dice_odds.stat_value(data, stat) for stat in STAT_NAMES]
+    abilities = []
+    for i, ab in enumerate(data.get("abilities", [])):
+        stat = ab.get("stat") or data.get(f"能力{i+1}资质") or dice_odds.parse_roll_stat(ab.get("trigger", ""))
+        kind, param = dice_odds.parse_special(ab.get("special", ""))
+        abilities.append({
+            "title": ab.get("title", f"能力{i+1}"),
+            "stat": stat if stat in STAT_NAMES else None,
+            "stat_index": STAT_NAMES.index(stat) if stat in STAT_NAMES else -1,
+            "kind": kind,
+            "param": param,
+        })
+    return {"name": data.get("姓名", "unknown"), "qa": qa, "abilities": abilities}
+
+
+def load_party(paths) -> list[dict]:
+    party = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        spec = agent_spec(data)
+        if not spec["abilities"]:
+            print(f"跳过 {path}：角色卡中没有能力")
+            continue
+        party.append(spec)
+    return party
+
+
+def simulate(party: list[dict], missions: int, rolls: int, seed, spend_qa: bool = True, qa_per_roll: int = 0) -> list[dict]:
+    """
+    Roll `rolls` times per agent in each of `missions` missions, all rolls at once.
+    Each roll uses one of the agent's abilities at random. QA follows the model of
+    dice_odds.qa_table (every point spent adds one 3, capped at the pool size) and
+    draws on the quality's budget for the mission. With qa_per_roll, every roll
+    spends that many points up front while the budget lasts, as the card odds
+    assume; otherwise, with spend_qa, a roll with no 3 is rescued with one point.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    counts = np.arange(POOL_SIZE + 1)
+    out = []
+    for agent in party:
+        abilities = agent["abilities"]
+        n_ab = len(abilities)
+        stat_index = np.array([ab["stat_index"] for ab in abilities])
+        trig = np.stack([dice_odds.special_triggers(ab["kind"], ab["param"], counts) for ab in abilities])
+
+        # (rolls, missions): one row per roll of the mission, in order
+        ab = rng.integers(n_ab, size=(rolls, missions), dtype=np.intp)
+        threes = threes_lut()[rng.integers(DIE_SIDES ** POOL_SIZE, size=(rolls, missions), dtype=np.uint16)]
+        points = np.zeros((rolls, missions), dtype=np.int32)
+        if qa_per_roll > 0 or spend_qa:
+            # Rolls on the same quality draw on one shared budget, in roll order
+            stat = stat_index[ab]
+            for s in set(stat_index.tolist()) - {-1}:
+                budget = agent["qa"][s]
+                if budget <= 0:
+                    continue
+                if qa_per_roll > 0:
+                    on_s = stat == s
+                    before = (np.cumsum(on_s, axis=0, dtype=np.int32) - 1) * qa_per_roll
+                    points += np.clip(budget - before, 0, qa_per_roll) * on_s
+                else:
+                    # The k-th failure of a mission is rescued while k <= QA of that quality
+                    fail_s = (threes == 0) & (stat == s)
+                    points += fail_s & (np.cumsum(fail_s, axis=0, dtype=np.int32) <= budget)
+            threes = dice_odds.add_qa(threes, points).astype(np.int8)
+        spent = points.sum(axis=0, dtype=np.int32)
+
+        ok = threes > 0
+        sp = np.take(trig.ravel(), ab * (POOL_SIZE + 1) + threes)
+        flat_ab = ab.ravel()
+        successes = ok.sum(axis=0, dtype=np.int32)
+        out.append({
+            "successes": successes,
+            "specials": sp.sum(axis=0),
+            "failures": rolls - successes,
+            "qa_spent": spent,
+            "ability_rolls": np.bincount(flat_ab, minlength=n_ab),
+            "ability_successes": np.bincount(flat_ab, weights=ok.ravel(), minlength=n_ab).astype(np.int64),
+            "ability_specials": np.bincount(flat_ab, weights=sp.ravel(), minlength=n_ab),
+        })
+    return out
+
+
+def _merge(parts: list[list[dict]]) -> list[dict]:
+    import numpy as np
+
+    merged = []
+    for agent_parts in zip(*parts):
+        merged.append({
+            key: (np.concatenate if key in ("successes", "specials", "failures", "qa_spent") else sum)(
+                [p[key] for p in agent_parts]
+            )
+            for key in agent_parts[0]
+        })
+    return merged
+
+
+def run(party: list[dict], missions: int, rolls: int, seed: int = 0, jobs: int = 1, spend_qa: bool = True,
+        qa_per_roll: int = 0) -> list[dict]:
+    import numpy as np
+
+    sizes = [CHUNK_MISSIONS] * (missions // CHUNK_MISSIONS)
+    if missions % CHUNK_MISSIONS:
+        sizes.append(missions % CHUNK_MISSIONS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if jobs > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(simulate, party, n, rolls, s, spend_qa, qa_per_roll) for n, s in zip(sizes, seeds)]
+            parts = [f.result() for f in futures]
+    else:
+        parts = [simulate(party, n, rolls, s, spend_qa, qa_per_roll) for n, s in zip(sizes, seeds)]
+    return _merge(parts)
+
+
+def _distribution(values) -> dict:
+    import numpy as np
+
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "p10": float(np.percentile(values, 10)),
+        "p50": float(np.percentile(values, 50)),
+        "p90": float(np.percentile(values, 90)),
+    }
+
+
+def summarize(party: list[dict], results: list[dict], rolls: int) -> list[dict]:
+    import numpy as np
+
+    report = []
+    for agent, res in zip(party, results):
+        failures = res["failures"]
+        report.append({
+            "name": agent["name"],
+            "successes": _distribution(res["successes"]),
+            "specials": _distribution(res["specials"]),
+            "failures": _distribution(failures),
+            "qa_spent": _distribution(res["qa_spent"]),
+            # failure_histogram[k] = share of missions with exactly k failures
+            "failure_histogram": (np.bincount(failures, minlength=rolls + 1) / len(failures)).tolist(),
+            "abilities": [
+                {
+                    "title": ab["title"],
+                    "stat": ab["stat"],
+                    "special_rule": ab["kind"],
+                    "rolls": int(n),
+                    "success_rate": float(s / n) if n else 0.0,
+                    "failure_rate": float(1 - s / n) if n else 0.0,
+                    "specials_per_roll": float(sp / n) if n else 0.0,
+                }
+                for ab, n, s, sp in zip(
+                    agent["abilities"], res["ability_rolls"], res["ability_successes"], res["ability_specials"]
+                )
+            ],
+        })
+    return report
+
+
+def print_report(report: list[dict], missions: int, rolls: int):
+    print(f"{missions} 次任务 × 每人 {rolls} 次掷骰")
+    for agent in report:
+        s, sp, f, q = agent["successes"], agent["specials"], agent["failures"], agent["qa_spent"]
+        print(f"\n[{agent['name']}]")
+        print(f"  成功 {s['mean']:.2f} (p10 {s['p10']:.0f} / p90 {s['p90']:.0f})  "
+              f"特殊 {sp['mean']:.2f}  失败 {f['mean']:.2f} (p90 {f['p90']:.0f})  花费资质 {q['mean']:.2f}")
+        for ab in agent["abilities"]:
+            print(f"  - {ab['title']:<12} 掷{ab['stat'] or '?'}  成功率 {ab['success_rate']:.1%}  "
+                  f"失败率 {ab['failure_rate']:.1%}  每次特殊 {ab['specials_per_roll']:.3f}")
+
+
+def check_odds(missions: int = 200_000, rolls: int = 12, seed: int = 0, max_qa: int = 3, tolerance: float = 0.005) -> list[str]:
+    """
+    Simulate one ability of every special rule with 0..max_qa QA spent per roll and
+    compare the success and special rates with dice_odds.special_odds.
+    Returns one line per mismatch (empty when the simulator agrees).
+    """
+    rules = [(None, 0)] + sorted({(kind, param) for _, kind, param in dice_odds.SPECIAL_RULES})
+    problems = []
+    for kind, param in rules:
+        odds = dice_odds.special_odds(kind, param)
+        agent = {
+            "name": f"{kind}-{param}",
+            "qa": [rolls * max_qa] * len(STAT_NAMES),
+            "abilities": [{"title": str(kind), "stat": STAT_NAMES[0], "stat_index": 0, "kind": kind, "param": param}],
+        }
+        for qa in range(max_qa + 1):
+            res = run([agent], missions, rolls, seed, spend_qa=False, qa_per_roll=qa)[0]
+            n = res["ability_rolls"][0]
+            pairs = [
+                ("成功率", res["ability_successes"][0] / n, odds["success"][qa]),
+                ("每次特殊", res["ability_specials"][0] / n, odds["special_expected"][qa]),
+            ]
+            for label, simulated, exact in pairs:
+                line = f"{kind or '无特殊'}({param}) 资质 {qa}：{label} 模拟 {simulated:.4f} / 精确 {exact:.4f}"
+                if abs(simulated - exact) > tolerance:
+                    problems.append(line)
+    return problems
+
+
+def card_paths(cards_dir: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(cards_dir, "*", "*.json")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cards", nargs="*", help="Card JSON files (default: every card in --cards-dir)")
+    parser.add_argument("--cards-dir", default=CARDS_DIR, help="Directory holding <name>/<name>.json cards")
+    parser.add_argument("--missions", type=int, default=1_000_000, help="Number of simulated missions")
+    parser.add_argument("--rolls", type=int, default=12, help="Rolls per agent per mission")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes")
+    parser.add_argument("--no-spend", action="store_true", help="Never spend QA to rescue a failed roll")
+    parser.add_argument("--qa-per-roll", type=int, default=0,
+                        help="Spend this much QA on every roll while it lasts, instead of rescuing failures")
+    parser.add_argument("--check", action="store_true", help="Cross-check the simulator against dice_odds and exit")
+    parser.add_argument("--json", default=None, help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    if not dice_odds.numpy_available():
+        sys.exit("需要 NumPy：pip install numpy")
+    if args.check:
+        problems = check_odds(seed=args.seed)
+        for line in problems:
+            print(line)
+        print("与 dice_odds 不一致。" if problems else "模拟结果与 dice_odds 一致。")
+        sys.exit(1 if problems else 0)
+    party = load_party(args.cards or card_paths(args.cards_dir))
+    if not party:
+        sys.exit("没有可模拟的角色卡。")
+
+    started = time.perf_counter()
+    results = run(party, args.missions, args.rolls, args.seed, args.jobs, not args.no_spend, args.qa_per_roll)
+    report = summarize(party, results, args.rolls)
+    print_report(report, args.missions, args.rolls)
+    print(f"\n用时 {time.perf_counter() - started:.2f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"missions": args.missions, "rolls": args.rolls, "agents": report}, f, ensure_ascii=False, indent=2)
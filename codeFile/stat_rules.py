@@ -0,0 +1,192 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+STAT_NAMES = ["专注", "欺瞒", "活力", "共情", "主动", "坚毅", "气场", "专业", "诡秘"]
+STAT_FIELDS = [f"{stat}MAX" for stat in STAT_NAMES]
+
+# Opcodes. A compiled option is a tuple of (op, stat_index, amount) instructions.
+OP_ADD = 0  # "+3 共情": add amount to a stat
+OP_TAG = 1  # "T2": a reference code with no effect on stats
+
+_ADD_RE = re.compile(r"([+-])\s*(\d+)\s*(" + "|".join(STAT_NAMES) + ")")
+
+# Which card field holds the selection, and which holds the chosen option per question
+SOURCES = {
+    "competency": ("职能", "职能问答"),
+    "anomaly": ("异常体", "异常问答"),
+}
+
+
+def compile_code(code: str) -> tuple:
+    """Compile one option code. Several stat terms may appear in one code ("+3 共情 +1 专注")."""
+    ops = []
+    for sign, amount, stat in _ADD_RE.findall(code or ""):
+        ops.append((OP_ADD, STAT_NAMES.index(stat), int(amount) * (-1 if sign == "-" else 1)))
+    if not ops:
+        ops.append((OP_TAG, -1, 0))
+    return tuple(ops)
+
+
+class RuleTable:
+    """Every question of every competency and anomaly, compiled once per catalog load."""
+
+    def __init__(self, catalog: dict):
+        self.tables = {
+            "competency": {
+                name: [[compile_code(opt["code"]) for opt in q["options"]] for q in role["interactions"]]
+                for name, role in catalog["competency"].items()
+            },
+            "anomaly": {
+                name: [[compile_code(opt["code"]) for opt in ab["options"]] for ab in abilities]
+                for name, abilities in catalog["anomaly"].items()
+            },
+        }
+
+    def questions(self, kind: str, key: str) -> list[list[tuple]]:
+        return self.tables[kind].get(key, [])
+
+    def ops(self, kind: str, key: str, question: int, option) -> tuple:
+        if option is None or option < 0:
+            return ()
+        questions = self.questions(kind, key)
+        if question >= len(questions) or option >= len(questions[question]):
+            return ()
+        return questions[question][option]
+
+
+def rules_for(catalog: dict) -> RuleTable:
+    """The catalog's rule table. It is stored on the catalog, so a reload recompiles it."""
+    table = catalog.get("rules")
+    if table is None:
+        table = catalog.setdefault("rules", RuleTable(catalog))
+    return table
+
+
+class StatState:
+    """
+    The nine stat totals, updated one answer at a time. Changing an answer
+    undoes the old option's instructions and applies the new ones.
+    """
+
+    def __init__(self, rules: RuleTable):
+        self.rules = rules
+        self.totals = [0] * len(STAT_NAMES)
+        self.keys: dict[str, str] = {}
+        self.chosen: dict[tuple[str, int], tuple] = {}
+
+    def _run(self, ops, sign: int):
+        for op, index, amount in ops:
+            if op == OP_ADD:
+                self.totals[index] += sign * amount
+
+    def reset(self, kind: str, key: str):
+        """A new competency / anomaly was selected: drop all answers of that kind."""
+        for slot in [s for s in self.chosen if s[0] == kind]:
+            self._run(self.chosen.pop(slot), -1)
+        self.keys[kind] = key
+
+    def select(self, kind: str, question: int, option):
+        self._run(self.chosen.pop((kind, question), ()), -1)
+        ops = self.rules.ops(kind, self.keys.get(kind, ""), question, option)
+        if ops:
+            self.chosen[(kind, question)] = ops
+            self._run(ops, 1)
+
+    def load(self, data: dict):
+        for kind, (key_field, answer_field) in SOURCES.items():
+            self.reset(kind, str(data.get(key_field, "")))
+            for question, option in enumerate(data.get(answer_field) or []):
+                self.select(kind, question, option)
+
+    def fields(self) -> dict[str, str]:
+        return {field: str(value) for field, value in zip(STAT_FIELDS, self.totals)}
+
+
+def has_answers(data: dict) -> bool:
+    return any(data.get(answer_field) for _, answer_field in SOURCES.values())
+
+
+def derive_stats(data: dict, rules: RuleTable) -> list[int]:
+    state = StatState(rules)
+    state.load(data)
+    return state.totals
+
+
+def derived_stat_fields(data: dict, rules: RuleTable) -> dict[str, str]:
+    """The nine *MAX fields as the recorded answers imply them."""
+    state = StatState(rules)
+    state.load(data)
+    return state.fields()
+
+
+def entered_stat(data: dict, field: str):
+    try:
+        return int(str(data.get(field, "0")).strip() or 0)
+    except ValueError:
+        return None
+
+
+def audit_card(data: dict, rules: RuleTable) -> list[tuple[str, object, int]]:
+    """(field, entered, derived) for every *MAX value that disagrees with the recorded answers."""
+    if not has_answers(data):
+        return []
+    derived = derive_stats(data, rules)
+    return [
+        (field, entered_stat(data, field), value)
+        for field, value in zip(STAT_FIELDS, derived)
+        if entered_stat(data, field) != value
+    ]
+
+
+def card_paths(targets) -> list[str]:
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths += sorted(glob.glob(os.path.join(target, "*", "*.json")))
+        else:
+            paths.append(target)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audit", nargs="*", metavar="PATH",
+                        help="Card JSON files or card directories (default: output/)")
+    parser.add_argument("--fix", action="store_true", help="Overwrite mismatching *MAX values with the derived ones")
+    args = parser.parse_args()
+
+    rules = rules_for(arc_catalog.load_catalog())
+    paths = card_paths(args.audit or [os.path.join(arc_catalog.PROJECT_ROOT, "output")])
+    mismatched = unanswered = 0
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"无法读取 {path}: {e}")
+            continue
+        if not has_answers(data):
+            unanswered += 1
+            continue
+        problems = audit_card(data, rules)
+        if not problems:
+            continue
+        mismatched += 1
+        print(f"{path}: " + ", ".join(f"{field} 填写 {entered} / 推导 {derived}" for field, entered, derived in problems))
+        if args.fix:
+            data.update(derived_stat_fields(data, rules))
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+    print(f"共 {len(paths)} 张角色卡：{mismatched} 张资质与问答不一致，{unanswered} 张未记录问答")
+    sys.exit(1 if mismatched and not args.fix else 0)
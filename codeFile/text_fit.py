@@ -0,0 +1,383 @@
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import unicodedata
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+# Text boxes of template.html, measured from its CSS.
+# width/height in mm, sizes in pt, line_height as the CSS unitless factor.
+# pre_wrap: the box keeps line breaks (page-2 answers); elsewhere they collapse to spaces.
+#
+# Page 2 boxes have a fixed height (h-1/2/3-line minus the 5px bottom padding), in the
+# 1fr column minus the 26pt answer indent or in the 75mm side panel.
+# The page-1 sections and the page-5 item block have no fixed height: they grow with their
+# text until the page (overflow: hidden) cuts them off. Their fields form a group that
+# shares one height budget, see GROUPS. min_height: a 许可行为 row is 18pt even when empty.
+_P1_TEXT = dict(width=88.5, size=10.5, min_size=7.5, line_height=1.625, pre_wrap=False, group="page1")
+_P1_ROW = dict(_P1_TEXT, width=82.2, line_height=1.43, min_height=6.35)
+_P2_MAIN = dict(width=83.8, size=11.0, min_size=8.0, line_height=1.6, pre_wrap=True)
+_P2_SIDE = dict(_P2_MAIN, width=75.0)
+_P5_TEXT = dict(width=180.0, size=10.0, min_size=8.0, line_height=1.6, pre_wrap=False, group="page5")
+
+SLOTS = {
+    "现实触发器": dict(_P1_TEXT),
+    "过载解除": dict(_P1_TEXT),
+    "首要指令": dict(_P1_TEXT),
+    "许可行为1": dict(_P1_ROW),
+    "许可行为2": dict(_P1_ROW),
+    "许可行为3": dict(_P1_ROW),
+    "许可行为4": dict(_P1_ROW),
+    "许可行为奖励": dict(_P1_TEXT, size=9.0, min_size=7.0, line_height=1.333),
+    "初始物品": dict(_P5_TEXT),
+    "职能格言": dict(_P5_TEXT, size=9.0, min_size=7.5, line_height=1.5),
+    "问题0A": dict(_P2_MAIN, height=22.4),
+    "问题0B": dict(_P2_MAIN, height=22.4),
+    "问题1": dict(_P2_MAIN, height=22.4),
+    "问题2": dict(_P2_MAIN, height=22.4),
+    "问题3": dict(_P2_MAIN, height=14.4),
+    "问题4": dict(_P2_MAIN, height=6.4),
+    "问题5": dict(_P2_MAIN, height=14.4),
+    "问题6": dict(_P2_SIDE, height=6.4),
+    "问题7": dict(_P2_SIDE, height=14.4),
+    "补充说明": dict(_P2_SIDE, height=14.4),
+}
+
+SIZE_STEP = 0.5
+PT_MM = 25.4 / 72
+ELLIPSIS = "…"
+
+# Height in mm the texts of a group may take together: from where the group starts to
+# 3mm above the page edge, minus the headings, gaps and intro lines around the texts.
+# Calibrated on an Edge print of the shipped template (output/ewqeq): the text wraps as
+# line_spans() predicts, the page-1 sections start 307.2pt down the 841.9pt page and the
+# last 许可行为 row ends at 825pt: 207pt of headings, gaps and intro lines plus the rows
+# and text lines. The 许可行为奖励 line added since brings the fixed part to 213pt.
+# On page 5 the card grid started 133.5pt down and is 557.3pt tall; the item block above
+# it moves it down by the block's own height.
+_BOTTOM_PT = 841.9 - 3 / PT_MM
+GROUPS = {
+    "page1": (_BOTTOM_PT - 307.2 - 213.0) * PT_MM,
+    "page5": (_BOTTOM_PT - 133.5 - 557.3 - 23.1) * PT_MM,
+}
+
+# The template puts {{字号:<field>}} in the style attribute of each box
+STYLE_PREFIX = "字号:"
+STYLE_FIELDS = [STYLE_PREFIX + field for field in SLOTS]
+
+# Advance widths in em of the Latin part of Noto Sans SC; CJK glyphs are a full em.
+_LATIN_WIDTHS = {}
+for _chars, _width in (
+    (" il.,:;'|!", 0.25),
+    ("fjtrI()[]{}-/\\\"`", 0.33),
+    ("0123456789", 0.55),
+    ("mwMW@%", 0.85),
+):
+    for _ch in _chars:
+        _LATIN_WIDTHS[_ch] = _width
+
+# Punctuation that may not start a line; it stays with the text before it
+_NO_LINE_START = set("，。、；：？！）》」』”’…,.;:?!)]}%")
+_TOKEN_RE = re.compile(r"\n|[ \t]+|[A-Za-z0-9_'\-]+|.", re.S)
+
+_font_widths: dict[str, float] | None = None
+
+
+def use_font(path: str | None):
+    """
+    Measure with the advance widths of a real font file instead of the built-in table.
+    Needs fontTools (pip install fonttools); None goes back to the table.
+    """
+    global _font_widths
+    if path is None:
+        _font_widths = None
+    else:
+        from fontTools.ttLib import TTFont
+
+        font = TTFont(path, fontNumber=0, lazy=True)
+        scale = 1.0 / font["head"].unitsPerEm
+        hmtx = font["hmtx"]
+        _font_widths = {chr(cp): hmtx[name][0] * scale for cp, name in font.getBestCmap().items()}
+    char_width.cache_clear()
+    fit_text.cache_clear()
+
+
+@functools.lru_cache(maxsize=8192)
+def char_width(ch: str) -> float:
+    """Advance width of one character in em."""
+    if _font_widths is not None and ch in _font_widths:
+        return _font_widths[ch]
+    if ch == "\t":
+        return 2 * _LATIN_WIDTHS[" "]
+    if unicodedata.category(ch) in ("Mn", "Me", "Cf"):
+        return 0.0
+    if unicodedata.east_asian_width(ch) in ("W", "F", "A"):
+        return 1.0
+    if ch in _LATIN_WIDTHS:
+        return _LATIN_WIDTHS[ch]
+    if ch.isupper():
+        return 0.62
+    if ch.islower():
+        return 0.52
+    return 0.55
+
+
+def text_width(text: str) -> float:
+    return sum(char_width(ch) for ch in text)
+
+
+def normalize(text: str, pre_wrap: bool) -> str:
+    """The text as the browser lays it out: collapsed whitespace unless the box keeps it."""
+    text = str(text or "").replace("\r\n", "\n")
+    if pre_wrap:
+        return text.rstrip()
+    return " ".join(text.split())
+
+
+def _tokens(text: str):
+    """(start, end) of the unbreakable runs of text, closing punctuation glued to the run before it."""
+    spans = []
+    for m in _TOKEN_RE.finditer(text):
+        start, end = m.span()
+        if spans and text[start] in _NO_LINE_START and not text[spans[-1][0]].isspace():
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def line_spans(text: str, width_em: float) -> list[tuple[int, int]]:
+    """(start, end) offsets of every line of `text` wrapped at width_em."""
+    lines = []
+    start, used = 0, 0.0
+    for tok_start, tok_end in _tokens(text):
+        token = text[tok_start:tok_end]
+        if token == "\n":
+            lines.append((start, tok_start))
+            start, used = tok_end, 0.0
+            continue
+        if token.isspace():
+            if used + text_width(token) > width_em:
+                # Spaces at a break are dropped
+                lines.append((start, tok_start))
+                start, used = tok_end, 0.0
+            else:
+                used += text_width(token)
+            continue
+        width = text_width(token)
+        if used + width > width_em and tok_start > start:
+            lines.append((start, tok_start))
+            start, used = tok_start, 0.0
+        if width <= width_em:
+            used += width
+            continue
+        # Longer than a whole line: break inside it
+        for i in range(tok_start, tok_end):
+            w = char_width(text[i])
+            if used + w > width_em and i > start:
+                lines.append((start, i))
+                start, used = i, 0.0
+            used += w
+    lines.append((start, len(text)))
+    return lines
+
+
+def max_lines(slot: dict, size: float) -> int:
+    return max(1, int(slot["height"] / line_mm(slot, size) + 1e-6))
+
+
+def line_mm(slot: dict, size: float) -> float:
+    return size * PT_MM * slot["line_height"]
+
+
+def _sizes(slot: dict):
+    size = slot["size"]
+    while size >= slot["min_size"] - 1e-6:
+        yield round(size, 2)
+        size -= SIZE_STEP
+
+
+def _wrap(slot: dict, text: str, size: float) -> list[tuple[int, int]]:
+    return line_spans(text, slot["width"] / (size * PT_MM)) if text else []
+
+
+def _result(field: str, text: str, size: float, lines: list, keep: int, truncate: bool) -> dict:
+    """
+    Fit result of one field laid out in len(lines) lines of which `keep` are visible.
+    The text is only cut (ending with an ellipsis) when `truncate` is set.
+    """
+    slot = SLOTS[field]
+    overflow = len(lines) > keep
+    dropped = 0
+    if overflow:
+        start, end = lines[keep - 1] if keep else (0, 0)
+        width_em = slot["width"] / (size * PT_MM)
+        cut = end
+        while cut > start and text_width(text[start:cut] + ELLIPSIS) > width_em:
+            cut -= 1
+        dropped = len(text) - cut
+        if truncate:
+            text = text[:cut].rstrip() + ELLIPSIS
+    return {
+        "field": field, "size": size, "base_size": slot["size"],
+        "lines": len(lines), "max_lines": keep,
+        "overflow": overflow, "truncated": overflow and truncate, "dropped": dropped, "text": text,
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def fit_text(field: str, text: str, truncate: bool = False) -> dict | None:
+    """
+    The largest font size (down to the slot minimum) at which `text` fits its fixed-size
+    box. None for fields without a box or whose box is part of a group (see fit_group).
+    """
+    slot = SLOTS.get(field)
+    if slot is None or "group" in slot:
+        return None
+    text = normalize(text, slot["pre_wrap"])
+    for size in _sizes(slot):
+        lines = _wrap(slot, text, size)
+        limit = max_lines(slot, size)
+        if len(lines) <= limit:
+            break
+    return _result(field, text, size, lines, min(len(lines), limit), truncate)
+
+
+def _height(slot: dict, size: float, lines: int) -> float:
+    return max(slot.get("min_height", 0.0), lines * line_mm(slot, size))
+
+
+@functools.lru_cache(maxsize=1024)
+def _fit_group(group: str, texts: tuple, truncate: bool) -> dict[str, dict]:
+    slots = {field: SLOTS[field] for field, _ in texts}
+    texts = {field: normalize(text, slots[field]["pre_wrap"]) for field, text in texts}
+    budget = GROUPS[group]
+    # Shrink every text of the group one step at a time until they fit together
+    step = 0
+    while True:
+        sizes = {f: max(s["min_size"], round(s["size"] - step * SIZE_STEP, 2)) for f, s in slots.items()}
+        wraps = {f: _wrap(slots[f], texts[f], sizes[f]) for f in slots}
+        excess = sum(_height(slots[f], sizes[f], len(wraps[f])) for f in slots) - budget
+        if excess <= 1e-6 or all(sizes[f] <= s["min_size"] for f, s in slots.items()):
+            break
+        step += 1
+
+    # Still too tall at the minimum sizes: the lines past the budget, taken from the longest texts
+    keep = {f: len(wraps[f]) for f in slots}
+    while excess > 1e-6:
+        longest = max(keep, key=lambda f: (keep[f] > 1, keep[f] * line_mm(slots[f], sizes[f])))
+        if not keep[longest]:
+            break
+        before = _height(slots[longest], sizes[longest], keep[longest])
+        keep[longest] -= 1
+        excess -= before - _height(slots[longest], sizes[longest], keep[longest])
+    return {
+        f: _result(f, texts[f], sizes[f], wraps[f], keep[f], truncate)
+        for f in slots if texts[f]
+    }
+
+
+def fit_group(group: str, data: dict, truncate: bool = False) -> dict[str, dict]:
+    """
+    Fit results of the fields of a group that have text. The group's texts are shrunk
+    together until they fit its shared height; if they still do not at the minimum sizes
+    the lines that would fall off the page are reported and, with `truncate`, cut.
+    """
+    texts = tuple(
+        (field, str(data.get(field, "") or ""))
+        for field, slot in SLOTS.items() if slot.get("group") == group
+    )
+    return _fit_group(group, texts, truncate)
+
+
+def fit_card(data: dict, truncate: bool = False) -> dict[str, dict]:
+    """Fit results of every fitted field that has text."""
+    grouped = {}
+    for group in GROUPS:
+        grouped.update(fit_group(group, data, truncate))
+    fits = {}
+    for field in SLOTS:
+        value = data.get(field, "")
+        if field in grouped:
+            fits[field] = grouped[field]
+        elif str(value or "").strip() and "group" not in SLOTS[field]:
+            fits[field] = fit_text(field, str(value), truncate)
+    return fits
+
+
+def style(fit: dict) -> str:
+    """Inline CSS for a shrunken box, empty if the text fits at the template's size."""
+    if fit["size"] >= fit["base_size"]:
+        return ""
+    return f"font-size:{fit['size']:g}pt;line-height:{SLOTS[fit['field']]['line_height']:g};"
+
+
+def render_fields(fits: dict[str, dict]) -> dict[str, str]:
+    """Field overrides for rendering: the style of each box, and the texts cut when truncating."""
+    out = {STYLE_PREFIX + field: style(fit) for field, fit in fits.items()}
+    for field, fit in fits.items():
+        if fit["truncated"]:
+            out[field] = fit["text"]
+    return out
+
+
+def describe(fit: dict | None) -> str:
+    """Short warning for the GUI and the console, empty if the text fits as is."""
+    if not fit:
+        return ""
+    if fit["truncated"]:
+        return f"⚠ 超出约 {fit['dropped']} 字，已截断"
+    if fit["overflow"]:
+        return f"⚠ 最小字号仍超出约 {fit['dropped']} 字，打印时会被裁掉"
+    if fit["size"] < fit["base_size"]:
+        return f"字号 {fit['base_size']:g} → {fit['size']:g}pt"
+    return ""
+
+
+def warnings(fits: dict[str, dict]) -> list[str]:
+    return [f"{field}: {describe(fit)}" for field, fit in fits.items() if describe(fit)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cards", nargs="*", help="Card JSON files (default: every Reality × Competency pairing of the ARC texts)")
+    parser.add_argument("--font", default=None, help="Measure with this TTF/OTF/TTC font (needs fontTools)")
+    parser.add_argument("--truncate", action="store_true", help="Show the texts cut to fit instead of only the overflow")
+    parser.add_argument("--json", action="store_true", help="Print the fit results as JSON")
+    args = parser.parse_args()
+
+    if args.font:
+        use_font(args.font)
+
+    if args.cards:
+        targets = []
+        for path in args.cards:
+            with open(path, "r", encoding="utf-8") as f:
+                targets.append((path, json.load(f)))
+    else:
+        # What the GUI fills in automatically has to fit too; reality and role share page 1
+        catalog = arc_catalog.load_catalog()
+        targets = [
+            (
+                f"{reality} + {role}",
+                dict(role_cfg["fields"], 现实触发器=cfg.get("triggers_text", ""), 过载解除=cfg.get("overload_text", "")),
+            )
+            for reality, cfg in catalog["reality"].items()
+            for role, role_cfg in catalog["competency"].items()
+        ]
+
+    results = {name: fit_card(data, args.truncate) for name, data in targets}
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for name, fits in results.items():
+            problems = warnings(fits)
+            print(f"{name}: " + ("；".join(problems) if problems else "全部放得下"))
+    sys.exit(1 if any(fit["overflow"] for fits in results.values() for fit in fits.values()) else 0)
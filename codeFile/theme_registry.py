@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    import json_to_html
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import json_to_html
+
+from pipeline_trace import span
+
+# A theme is a folder under themes/ with a theme.json:
+#   {"label": "精简", "base": "default", "pages": ["page-1", "page-2"],
+#    "partials": {"page-2": "page2.html"}, "css": "theme.css"}
+# Every key is optional. Partials not overridden come from the base theme; the
+# built-in "default" theme is template.html split into head / page-N / tail.
+THEMES_DIR = os.path.join(os.path.dirname(json_to_html.DEFAULT_TEMPLATE), "themes")
+MANIFEST_NAME = "theme.json"
+DEFAULT_THEME = "default"
+THEME_FIELD = "主题"
+
+_PAGE_RE = re.compile(r'<div class="page-wrapper (page-\d+)\b')
+
+
+def _block_start(text: str, pos: int) -> int:
+    """
+    Move back from `pos` over the comment lines that introduce it ("<!-- 第三页 … -->").
+    A blank line or a closing marker (<!-- ABILITY_PAGE_END -->) belongs to the block before.
+    """
+    start = text.rfind("\n", 0, pos) + 1
+    while start > 0:
+        prev = text.rfind("\n", 0, start - 1) + 1
+        line = text[prev:start].strip()
+        if not (line.startswith("<!--") and line.endswith("-->")) or "_END" in line:
+            break
+        start = prev
+    return start
+
+
+def split_partials(template: str) -> dict[str, str]:
+    """head, page-1 … page-N and tail of a single-file template, in document order."""
+    pages = [(m.group(1), _block_start(template, m.start())) for m in _PAGE_RE.finditer(template)]
+    if not pages:
+        return {"head": template, "tail": ""}
+    body_end = template.rfind("</body>")
+    if body_end == -1:
+        body_end = len(template)
+    script = template.rfind("<script", pages[-1][1], body_end)
+    tail_start = _block_start(template, script if script != -1 else body_end)
+    partials = {"head": template[:pages[0][1]]}
+    for (name, start), nxt in zip(pages, [p[1] for p in pages[1:]] + [tail_start]):
+        partials[name] = template[start:nxt]
+    partials["tail"] = template[tail_start:]
+    return partials
+
+
+class ThemeRegistry:
+    """
+    Discovers themes, composes them from partials and keeps every theme compiled.
+    warm() compiles all of them in a background thread, so picking a theme for a
+    card later is a dictionary lookup.
+    """
+
+    def __init__(self, themes_dir: str = THEMES_DIR, default_template: str = json_to_html.DEFAULT_TEMPLATE):
+        self.themes_dir = themes_dir
+        self.default_template = default_template
+        self._lock = threading.Lock()
+        self._compiled: dict[str, tuple[tuple, object]] = {}
+        self._warm_thread: threading.Thread | None = None
+        self._warned: set[str] = set()
+        self._manifests: tuple[tuple, list[str], dict] | None = None
+
+    # --- Discovery ---
+
+    def _dir_stamp(self, names: list[str]) -> tuple:
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return None
+        return (mtime(self.themes_dir),) + tuple(mtime(os.path.join(self.themes_dir, n, MANIFEST_NAME)) for n in names)
+
+    def manifests(self) -> dict[str, dict]:
+        """theme id -> manifest, the built-in default first. Only re-read when a theme.json changes."""
+        cached = self._manifests
+        if cached and self._dir_stamp(cached[1]) == cached[0]:
+            return cached[2]
+        found = {DEFAULT_THEME: {"label": "默认", "dir": os.path.dirname(self.default_template)}}
+        try:
+            names = sorted(n for n in os.listdir(self.themes_dir) if os.path.isdir(os.path.join(self.themes_dir, n)))
+        except OSError:
+            names = []
+        stamp = self._dir_stamp(names)
+        for name in names:
+            path = os.path.join(self.themes_dir, name, MANIFEST_NAME)
+            if name == DEFAULT_THEME or not os.path.isfile(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"主题 {name} 的 {MANIFEST_NAME} 无法读取: {e}")
+                continue
+            manifest["dir"] = os.path.dirname(path)
+            manifest.setdefault("label", name)
+            found[name] = manifest
+        self._manifests = (stamp, names, found)
+        return found
+
+    def labels(self) -> list[tuple[str, str]]:
+        return [(theme_id, m["label"]) for theme_id, m in self.manifests().items()]
+
+    def resolve(self, data: dict | None = None, theme: str | None = None) -> str:
+        """The theme to use: an explicit choice, else the card's 主题 field, else the default."""
+        theme_id = theme or (data or {}).get(THEME_FIELD) or DEFAULT_THEME
+        if theme_id not in self.manifests():
+            if theme_id not in self._warned:
+                self._warned.add(theme_id)
+                print(f"未找到主题 {theme_id}，使用默认主题")
+            return DEFAULT_THEME
+        return theme_id
+
+    # --- Composition ---
+
+    def _chain(self, theme_id: str, manifests: dict) -> list[str]:
+        """The theme and its bases, most derived first."""
+        chain = []
+        while theme_id not in chain:
+            chain.append(theme_id)
+            if theme_id == DEFAULT_THEME:
+                break
+            theme_id = manifests[theme_id].get("base", DEFAULT_THEME)
+            if theme_id not in manifests:
+                raise ValueError(f"主题 {chain[-1]} 的基础主题 {theme_id} 不存在")
+        return chain
+
+    def sources(self, theme_id: str) -> list[str]:
+        """Every file the theme is built from."""
+        manifests = self.manifests()
+        paths = [self.default_template]
+        for tid in self._chain(theme_id, manifests):
+            if tid == DEFAULT_THEME:
+                continue
+            m = manifests[tid]
+            paths.append(os.path.join(m["dir"], MANIFEST_NAME))
+            paths += [os.path.join(m["dir"], f) for f in m.get("partials", {}).values() if f]
+            if m.get("css"):
+                paths.append(os.path.join(m["dir"], m["css"]))
+        return paths
+
+    def compose(self, theme_id: str) -> str:
+        """The full template text of a theme."""
+        manifests = self.manifests()
+        with open(self.default_template, "r", encoding="utf-8") as f:
+            partials = split_partials(f.read())
+        pages = [name for name in partials if name.startswith("page-")]
+        css = []
+        # Apply the bases first so the most derived theme wins
+        for tid in reversed(self._chain(theme_id, manifests)):
+            if tid == DEFAULT_THEME:
+                continue
+            m = manifests[tid]
+            for name, filename in m.get("partials", {}).items():
+                if filename:
+                    with open(os.path.join(m["dir"], filename), "r", encoding="utf-8") as f:
+                        partials[name] = f.read()
+                else:
+                    partials[name] = ""
+            if "pages" in m:
+                pages = list(m["pages"])
+            if m.get("css"):
+                with open(os.path.join(m["dir"], m["css"]), "r", encoding="utf-8") as f:
+                    css.append(f.read())
+        head = partials["head"]
+        if css:
+            block = "    <style>\n" + "\n".join(css) + "\n    </style>\n"
+            at = head.rfind("</head>")
+            head = head[:at] + block + head[at:] if at != -1 else head + block
+        missing = [name for name in pages if name not in partials]
+        if missing:
+            raise ValueError(f"主题 {theme_id} 缺少分页: {', '.join(missing)}")
+        return head + "".join(partials[name] for name in pages) + partials["tail"]
+
+    def stamp(self, theme_id: str) -> tuple:
+        stamp = []
+        for path in self.sources(theme_id):
+            try:
+                stamp.append((path, os.path.getmtime(path)))
+            except OSError:
+                stamp.append((path, None))
+        return tuple(stamp)
+
+    def compiled(self, theme_id: str = DEFAULT_THEME):
+        """The compiled theme, recompiled only when one of its files changed."""
+        stamp = self.stamp(theme_id)
+        with self._lock:
+            cached = self._compiled.get(theme_id)
+            if cached and cached[0] == stamp:
+                return cached[1]
+        with span("template_load", theme=theme_id) as sp:
+            text = self.compose(theme_id)
+            compiled = json_to_html.compile_template(text)
+            sp["bytes"] = text
+        with self._lock:
+            self._compiled[theme_id] = (stamp, compiled)
+        return compiled
+
+    def compiled_for(self, data: dict | None = None, theme: str | None = None):
+        return self.compiled(self.resolve(data, theme))
+
+    # --- Warm-up ---
+
+    def warm_all(self) -> dict[str, float]:
+        """Compile every theme now; seconds spent per theme."""
+        times = {}
+        for theme_id in self.manifests():
+            started = time.perf_counter()
+            try:
+                self.compiled(theme_id)
+            except Exception as e:
+                print(f"主题 {theme_id} 编译失败: {e}")
+                continue
+            times[theme_id] = time.perf_counter() - started
+        return times
+
+    def warm(self) -> threading.Thread:
+        """Start compiling every theme in a daemon thread (once)."""
+        with self._lock:
+            if self._warm_thread is None:
+                self._warm_thread = threading.Thread(target=self.warm_all, name="theme-warm", daemon=True)
+                self._warm_thread.start()
+            return self._warm_thread
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+
+_registry: ThemeRegistry | None = None
+
+
+def default_registry() -> ThemeRegistry:
+    """The process-wide registry for themes/ next to template.html."""
+    global _registry
+    if _registry is None:
+        _registry = ThemeRegistry()
+    return _registry
+
+
+def compiled_for_card(data: dict | None, template_path: str | None = None, theme: str | None = None):
+    """A template file given explicitly wins; otherwise the card's theme (or `theme`) is used."""
+    if template_path and os.path.abspath(template_path) != os.path.abspath(json_to_html.DEFAULT_TEMPLATE):
+        return json_to_html.get_compiled_template(template_path)
+    return default_registry().compiled_for(data, theme)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--themes", default=THEMES_DIR, help="Directory holding <theme>/theme.json")
+    parser.add_argument("--compose", metavar="THEME", help="Print the full template of a theme")
+    args = parser.parse_args()
+
+    registry = ThemeRegistry(args.themes)
+    if args.compose:
+        print(registry.compose(args.compose))
+        sys.exit(0)
+    times = registry.warm_all()
+    for theme_id, label in registry.labels():
+        if theme_id not in times:
+            continue
+        started = time.perf_counter()
+        compiled = registry.compiled(theme_id)
+        lookup = time.perf_counter() - started
+        print(f"{theme_id:<12} {label}  编译 {times[theme_id] * 1000:.1f} ms，"
+              f"再次取用 {lookup * 1e6:.0f} µs，字段 {len(compiled) // 2}")
@@ -0,0 +1,262 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import arc_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import arc_catalog
+
+import json_to_html
+import pdf_export
+from arc_catalog import card_hash
+from pipeline_trace import span
+
+# First-page PNG previews of the cards under output/, keyed by the card's content hash
+# and kept under a total size budget (least recently shown evicted first). Rendered
+# from <name>.pdf with PyMuPDF, or from <name>.html with the headless browser.
+CARDS_DIR = os.path.join(arc_catalog.PROJECT_ROOT, "output")
+CACHE_DIR = os.path.join(CARDS_DIR, ".thumbnails")
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+THUMB_WIDTH = 180
+BUDGET_BYTES = 16 * 1024 * 1024
+
+
+def card_paths(cards_dir: str = CARDS_DIR) -> list[str]:
+    """Card JSON files saved the way the editor does (<name>/<name>.json), by name."""
+    paths = glob.glob(os.path.join(cards_dir, "*", "*.json"))
+    return sorted(p for p in paths if os.path.splitext(os.path.basename(p))[0] == os.path.basename(os.path.dirname(p)))
+
+
+def thumbnail_source(json_path: str) -> str | None:
+    """The rendered document a card's preview is taken from: its PDF, else its HTML (needs the browser)."""
+    base = os.path.splitext(json_path)[0]
+    if os.path.isfile(base + ".pdf"):
+        return base + ".pdf"
+    if pdf_export.BROWSER_PATH and os.path.isfile(base + ".html"):
+        return base + ".html"
+    return None
+
+
+def fitz_available() -> bool:
+    try:
+        import fitz  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def render_png(source: str, width: int = THUMB_WIDTH) -> bytes:
+    """PNG of the first page of a PDF or HTML file, `width` pixels wide."""
+    import fitz
+
+    if source.lower().endswith(".pdf"):
+        with fitz.open(source) as doc:
+            page = doc[0]
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return pix.tobytes("png")
+
+    with tempfile.TemporaryDirectory(prefix="ta_thumb_") as tmp:
+        shot = os.path.join(tmp, "page.png")
+        pdf_export.html_to_png(os.path.abspath(source), shot)
+        pix = fitz.Pixmap(shot)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    height = max(1, round(pix.height * width / pix.width))
+    return fitz.Pixmap(pix, width, height, None).tobytes("png")
+
+
+class ThumbnailCache:
+    """
+    Cached previews on disk. A thumbnail is reused while the card content and its
+    rendered document are unchanged; adding one evicts the least recently used
+    thumbnails until the cache fits the budget again.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, budget: int = BUDGET_BYTES, width: int = THUMB_WIDTH):
+        self.cache_dir = cache_dir
+        self.budget = budget
+        self.width = width
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] | None = None
+        self.stats = {"hits": 0, "built": 0, "evicted": 0, "failed": 0}
+
+    # --- Cache index ---
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_NAME)
+
+    def _load_index(self) -> dict[str, dict]:
+        if self._index is None:
+            try:
+                with open(self._index_path(), "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                self._index = saved.get("thumbnails", {}) if saved.get("version") == INDEX_VERSION else {}
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "thumbnails": self._index}, f, ensure_ascii=False)
+        os.replace(tmp, self._index_path())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def key(self, data: dict) -> str:
+        return f"{card_hash(data)[:24]}-{self.width}"
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(entry["bytes"] for entry in self._load_index().values())
+
+    # --- Thumbnails ---
+
+    def get(self, key: str, source_mtime: float) -> str | None:
+        with self._lock:
+            entry = self._load_index().get(key)
+            if not entry or entry["source_mtime"] != source_mtime or not os.path.isfile(self._path(key)):
+                return None
+            entry["used"] = time.time()
+            self.stats["hits"] += 1
+            return self._path(key)
+
+    def put(self, key: str, png: bytes, source_mtime: float) -> str:
+        with self._lock:
+            index = self._load_index()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(png)
+            os.replace(tmp, path)
+            index[key] = {"bytes": len(png), "used": time.time(), "source_mtime": source_mtime}
+            self._evict(keep=key)
+            self._save_index()
+            self.stats["built"] += 1
+            return path
+
+    def _evict(self, keep: str):
+        index = self._index
+        total = sum(entry["bytes"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["used"]):
+            if total <= self.budget:
+                break
+            if key == keep:
+                continue
+            total -= index.pop(key)["bytes"]
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.stats["evicted"] += 1
+
+    def thumbnail(self, json_path: str) -> str | None:
+        """Path of the card's preview PNG, rendered now if missing or stale; None when there is nothing to show."""
+        source = thumbnail_source(json_path)
+        if not source:
+            return None
+        data = json_to_html.load_json(json_path)
+        key = self.key(data)
+        mtime = os.path.getmtime(source)
+        cached = self.get(key, mtime)
+        if cached:
+            return cached
+        with span("thumbnail", source=os.path.splitext(source)[1]) as sp:
+            png = render_png(source, self.width)
+            sp["bytes"] = len(png)
+        return self.put(key, png, mtime)
+
+    def flush(self):
+        """Persist the last-used times gathered by cache hits."""
+        with self._lock:
+            if self._index is not None:
+                self._save_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._load_index()):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._index = {}
+            if os.path.isdir(self.cache_dir):
+                self._save_index()
+
+
+class ThumbnailWorker:
+    """
+    Produces thumbnails on background threads. request() returns at once; `done` is
+    called from the worker thread, so a Tk caller hands the result back with root.after.
+    """
+
+    def __init__(self, cache: ThumbnailCache | None = None, jobs: int = 2):
+        self.cache = cache or ThumbnailCache()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="thumbnail")
+        # Without PyMuPDF every request simply yields no preview
+        self.enabled = fitz_available()
+
+    def _run(self, json_path: str) -> str | None:
+        if not self.enabled:
+            return None
+        try:
+            return self.cache.thumbnail(json_path)
+        except Exception as e:
+            with self.cache._lock:
+                self.cache.stats["failed"] += 1
+            print(f"缩略图生成失败 {json_path}: {e}")
+            return None
+
+    def request(self, json_path: str, done=None) -> Future:
+        future = self.pool.submit(self._run, json_path)
+        if done:
+            future.add_done_callback(lambda f: None if f.cancelled() else done(json_path, f.result()))
+        return future
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.cache.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cards_dir", nargs="?", default=CARDS_DIR, help="Directory holding <name>/<name>.json")
+    parser.add_argument("--cache", default=CACHE_DIR, help="Thumbnail cache directory")
+    parser.add_argument("--budget-mb", type=float, default=BUDGET_BYTES / 1024 / 1024, help="Cache size budget in MB")
+    parser.add_argument("--width", type=int, default=THUMB_WIDTH, help="Thumbnail width in pixels")
+    parser.add_argument("--jobs", type=int, default=2, help="Worker threads")
+    parser.add_argument("--clear", action="store_true", help="Remove every cached thumbnail first")
+    args = parser.parse_args()
+
+    if not fitz_available():
+        sys.exit("需要 PyMuPDF：pip install pymupdf")
+    cache = ThumbnailCache(args.cache, int(args.budget_mb * 1024 * 1024), args.width)
+    if args.clear:
+        cache.clear()
+        print("已清除缩略图缓存")
+    paths = card_paths(args.cards_dir)
+    if not paths:
+        sys.exit("没有找到角色卡。")
+    worker = ThumbnailWorker(cache, args.jobs)
+    started = time.perf_counter()
+    futures = [(path, worker.request(path)) for path in paths]
+    for path, future in futures:
+        png = future.result()
+        print(f"{path}: {png or '没有 PDF / HTML，跳过'}")
+    worker.close()
+    s = cache.stats
+    print(f"共 {len(paths)} 张角色卡，缓存命中 {s['hits']}，新生成 {s['built']}，淘汰 {s['evicted']}，失败 {s['failed']}；"
+          f"缓存 {cache.size() / 1024:.0f} KB，用时 {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,280 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import json_to_html
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    import json_to_html
+
+import arc_catalog
+import catalog_share
+import pipeline_trace
+import pdf_export
+import theme_registry
+from pipeline_trace import span
+
+CARDS_DIR = os.path.join(arc_catalog.PROJECT_ROOT, "output")
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _entry_digests(catalog: dict) -> dict[tuple[str, str], str]:
+    """One fingerprint per raw ARC entry, so edits can be narrowed to a single key."""
+    digests = {}
+    for kind in arc_catalog.DERIVED_KINDS:
+        for key, entry in catalog["raw"][kind].items():
+            digests[(kind, str(key))] = json.dumps(entry, ensure_ascii=False, sort_keys=True)
+    return digests
+
+
+def build_card(
+    card_path: str, kinds, template_path: str, setting_dir: str, make_pdf: bool, optimize_pdf: bool, previous: dict | None = None
+) -> str:
+    """
+    Refresh the given derived kinds from the catalog, then re-render the card.
+    `previous` is the derived text of the catalog before the edit: fields that no longer
+    match it were changed by hand and are kept, in the JSON and the rendered card.
+    """
+    data = json_to_html.load_json(card_path)
+    if kinds:
+        catalog = arc_catalog.load_catalog(setting_dir)
+        refreshed = arc_catalog.refresh_derived(data, catalog, kinds, previous)
+        if previous:
+            kept = arc_catalog.hand_edited(data, previous)
+            if kept:
+                print(f"[watch] {card_path}: 保留手动修改的字段 {', '.join(kept)}")
+        if refreshed != data:
+            data = refreshed
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+            with span("json_write", bytes=text):
+                with open(card_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+    base_path = os.path.splitext(card_path)[0]
+    html_path = base_path + ".html"
+    compiled = theme_registry.compiled_for_card(data, template_path)
+    content = json_to_html.render_html(data, compiled)
+    with span("html_write", bytes=content):
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    if make_pdf:
+        pdf_export.html_to_pdf(os.path.abspath(html_path), os.path.abspath(base_path + ".pdf"), optimize=optimize_pdf)
+    return card_path
+
+
+class DependencyGraph:
+    """Maps each ARC entry (kind, key) to the card JSON files derived from it."""
+
+    def __init__(self):
+        self.cards: dict[str, list[tuple[str, str]]] = {}
+        self.users: dict[tuple[str, str], set[str]] = {}
+
+    def update(self, card_path: str, data: dict):
+        self.remove(card_path)
+        deps = arc_catalog.card_dependencies(data)
+        self.cards[card_path] = deps
+        for dep in deps:
+            self.users.setdefault(dep, set()).add(card_path)
+
+    def remove(self, card_path: str):
+        for dep in self.cards.pop(card_path, []):
+            users = self.users.get(dep)
+            if users:
+                users.discard(card_path)
+                if not users:
+                    del self.users[dep]
+
+    def affected(self, entries) -> dict[str, set[str]]:
+        """card path -> kinds that need refreshing, for a set of changed entries."""
+        out: dict[str, set[str]] = {}
+        for kind, key in entries:
+            for card_path in self.users.get((kind, key), ()):
+                out.setdefault(card_path, set()).add(kind)
+        return out
+
+
+class Watcher:
+    def __init__(
+        self,
+        cards_dir: str = CARDS_DIR,
+        template_path: str = json_to_html.DEFAULT_TEMPLATE,
+        setting_dir: str = arc_catalog.SETTING_DIR,
+        jobs: int = 4,
+        make_pdf: bool = False,
+        optimize_pdf: bool = False,
+        processes: bool = False,
+    ):
+        self.cards_dir = cards_dir
+        self.template_path = template_path
+        self.setting_dir = setting_dir
+        self.make_pdf = make_pdf
+        self.optimize_pdf = optimize_pdf
+        self.jobs = max(1, jobs)
+        self.processes = processes
+        self.pool = self._start_pool()
+        self.graph = DependencyGraph()
+        self.card_mtimes: dict[str, float] = {}
+        self.card_themes: dict[str, str] = {}
+        self.themes = theme_registry.default_registry()
+        self.themes.warm()
+        self.theme_stamps = self._theme_stamps()
+        self.catalog_stamp = arc_catalog.catalog_stamp(setting_dir)
+        # The catalog the cards were last refreshed from, to tell catalog text from hand edits
+        self.catalog = arc_catalog.load_catalog(setting_dir)
+        self.previous_catalog = self.catalog
+        self.digests = _entry_digests(self.catalog)
+
+    def card_paths(self) -> list[str]:
+        return glob.glob(os.path.join(self.cards_dir, "*", "*.json"))
+
+    def _start_pool(self):
+        if self.processes:
+            # Workers attach to one snapshot of the catalog instead of each parsing ARC_setting
+            return catalog_share.process_pool(self.jobs, self.setting_dir)
+        return ThreadPoolExecutor(max_workers=self.jobs)
+
+    def rebuild(self, jobs: dict[str, set[str]]):
+        if not jobs:
+            return
+        started = time.perf_counter()
+        futures = {}
+        for path, kinds in jobs.items():
+            previous = None
+            if kinds:
+                try:
+                    previous = arc_catalog.derived_fields(json_to_html.load_json(path), self.previous_catalog, kinds)
+                except Exception:
+                    pass  # The build reports the unreadable card
+            futures[self.pool.submit(
+                build_card, path, tuple(kinds), self.template_path, self.setting_dir, self.make_pdf, self.optimize_pdf, previous
+            )] = path
+        failed = 0
+        for fut, path in futures.items():
+            try:
+                fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"[watch] 重建失败 {path}: {e}")
+            else:
+                # Our own JSON rewrite must not count as a user edit
+                self.card_mtimes[path] = _mtime(path)
+        elapsed = time.perf_counter() - started
+        print(f"[watch] 已重建 {len(jobs) - failed}/{len(jobs)} 张角色卡 ({elapsed:.2f}s)")
+
+    def scan_cards(self) -> dict[str, set[str]]:
+        jobs = {}
+        seen = set()
+        for path in self.card_paths():
+            seen.add(path)
+            mtime = _mtime(path)
+            if self.card_mtimes.get(path) == mtime:
+                continue
+            self.card_mtimes[path] = mtime
+            try:
+                data = json_to_html.load_json(path)
+                self.graph.update(path, data)
+            except Exception as e:
+                print(f"[watch] 无法读取 {path}: {e}")
+                continue
+            self.card_themes[path] = str(data.get(theme_registry.THEME_FIELD) or theme_registry.DEFAULT_THEME)
+            jobs[path] = set()
+        for path in list(self.card_mtimes):
+            if path not in seen:
+                del self.card_mtimes[path]
+                self.card_themes.pop(path, None)
+                self.graph.remove(path)
+        return jobs
+
+    def scan_catalog(self) -> dict[str, set[str]]:
+        stamp = arc_catalog.catalog_stamp(self.setting_dir)
+        if stamp == self.catalog_stamp:
+            return {}
+        self.catalog_stamp = stamp
+        if self.processes:
+            # New workers for the new snapshot; the old ones would each re-read the files
+            self.pool.shutdown(wait=True)
+            self.pool = self._start_pool()
+        self.previous_catalog = self.catalog
+        self.catalog = arc_catalog.load_catalog(self.setting_dir)
+        digests = _entry_digests(self.catalog)
+        changed = {k for k in digests.keys() | self.digests.keys() if digests.get(k) != self.digests.get(k)}
+        self.digests = digests
+        if changed:
+            names = ", ".join(f"{kind}:{key}" for kind, key in sorted(changed))
+            print(f"[watch] ARC 条目已修改: {names}")
+        return self.graph.affected(changed)
+
+    def _theme_stamps(self) -> dict[str, tuple]:
+        if os.path.abspath(self.template_path) != os.path.abspath(json_to_html.DEFAULT_TEMPLATE):
+            # A template file given on the command line is used for every card
+            return {None: (_mtime(self.template_path),)}
+        return {theme_id: self.themes.stamp(theme_id) for theme_id in self.themes.manifests()}
+
+    def scan_template(self) -> list[str]:
+        """Cards whose template or theme files changed."""
+        stamps = self._theme_stamps()
+        changed = {t for t in stamps.keys() | self.theme_stamps.keys() if stamps.get(t) != self.theme_stamps.get(t)}
+        self.theme_stamps = stamps
+        if not changed:
+            return []
+        if None in changed:
+            print("[watch] 模板已修改，重建全部角色卡")
+            return list(self.graph.cards)
+        print(f"[watch] 主题已修改: {', '.join(sorted(changed))}")
+        # A removed theme also rebuilds its cards, which now fall back to the default
+        return [
+            path for path in self.graph.cards
+            if self.card_themes.get(path) in changed or self.themes.resolve(theme=self.card_themes.get(path)) in changed
+        ]
+
+    def poll(self, initial: bool = False):
+        jobs = self.scan_cards()
+        if initial:
+            # Cards already on disk only need indexing, not rebuilding
+            jobs = {}
+        for path, kinds in self.scan_catalog().items():
+            jobs.setdefault(path, set()).update(kinds)
+        for path in self.scan_template():
+            jobs.setdefault(path, set())
+        self.rebuild(jobs)
+
+    def run(self, interval: float = 1.0):
+        self.poll(initial=True)
+        print(f"[watch] 正在监视 {len(self.graph.cards)} 张角色卡、模板与 ARC 数据 (Ctrl+C 退出)")
+        try:
+            while True:
+                time.sleep(interval)
+                self.poll()
+        finally:
+            self.pool.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", default=CARDS_DIR, help="Directory holding <name>/<name>.json cards")
+    parser.add_argument("--template", default=json_to_html.DEFAULT_TEMPLATE, help="Path to HTML template")
+    parser.add_argument("--jobs", type=int, default=4, help="Maximum cards rebuilt in parallel")
+    parser.add_argument("--processes", action="store_true", help="Rebuild in worker processes sharing one catalog snapshot instead of threads")
+    parser.add_argument("--interval", type=float, default=1.0, help="Polling interval in seconds")
+    parser.add_argument("--pdf", action="store_true", help="Also print PDF for rebuilt cards")
+    parser.add_argument("--optimize-pdf", action="store_true", help="With --pdf: compress streams, merge duplicates and downsample images")
+    pipeline_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    pipeline_trace.enable_from_args(args)
+
+    watcher = Watcher(args.cards, args.template, jobs=args.jobs, make_pdf=args.pdf,
+                      optimize_pdf=args.optimize_pdf, processes=args.processes)
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        print("\n[watch] 已停止。")